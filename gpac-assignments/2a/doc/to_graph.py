@@ -1,8 +1,11 @@
 import os
-import matplotlib.pyplot as plt
+import matplotlib
 import re
+import report_cache
 
-from matplotlib.pyplot import plot
+# graphs are only saved, so use a backend that works in pool workers without a display
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # pylint: disable=wrong-import-position
 
 
 def graph_best_run(filename):
@@ -69,11 +72,13 @@ def plot_graph(filename, suffix, evaluationes_list, fitnesses_list, title):
     plt.title(title)
     plt.ylim(0, 2000)
 
-    savefile = os.path.splitext(os.path.basename(filename))[0]
+    plt.savefig(graph_path(filename, suffix))
+    plt.close()
+
 
-    plt.savefig(f"./doc/{savefile}{suffix}.png")
-    plt.show()
-    plt.clf()
+def graph_path(filename, suffix):
+    savefile = os.path.splitext(os.path.basename(filename))[0]
+    return f"./doc/{savefile}{suffix}.png"
 
 
 def graph(filename):
@@ -81,6 +86,12 @@ def graph(filename):
     graph_best_run(filename)
 
 
-graph('./logs/g1/config1.log')
-graph('./logs/g1/config2.log')
-graph('./logs/g1/config3.log')
+def main():
+    report_cache.render(__file__, [
+        report_cache.Job([graph_path(filename, '_all_runs'), graph_path(filename, '_best_run')],
+                         [filename], graph, (filename,))
+        for filename in ('./logs/g1/config1.log', './logs/g1/config2.log', './logs/g1/config3.log')])
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,12 @@
 """ Module that implements map parsing and game logic """
 
 import os
+import bisect
 import random
+import collections
 import copy
 import math
+import numpy
 
 # global constants
 
@@ -34,11 +37,82 @@ FRUIT_COLLISION = 20
 PILL_COLLISION = 30
 NO_COLLISION = 40
 
+# cell codes used by the array backed engine, units are stored on the board as well
+EMPTY_CODE = 0
+WALL_CODE = 1
+PILL_CODE = 2
+FRUIT_CODE = 3
+PACMAN_CODE = 4
+GHOST_CODES = (5, 6, 7)
+CELL_TYPES = (EMPTY_CELL, WALL, PILL, FRUIT, PACMAN, *GHOST)
+CELL_CODES = {cell: code for code, cell in enumerate(CELL_TYPES)}
+
+# row and column offsets for each direction
+OFFSETS = {UP: (-1, 0), DOWN: (1, 0), LEFT: (0, -1), RIGHT: (0, 1), HOLD: (0, 0)}
+
 
 class MyException(Exception):
     """ custom exception to raise on issues """
 
 
+class PillIndex:
+    """ Bucket grid of pill locations used to find the closest pill to a cell.
+
+    Pills are bucketed by row and each row keeps its columns sorted, so a query
+    only visits rows that could hold a pill closer than the best one found so far.
+    A cell under a ghost can be given more than one pill, so the pills of every cell
+    are counted and a cell leaves the index with its last pill.
+    """
+
+    def __init__(self, height):
+        self.rows = [[] for _ in range(height)]
+        self.pills = collections.Counter()
+        self.count = 0
+
+    def add(self, location):
+        """ Adds a pill to the index. """
+        cell = (location[0], location[1])
+        self.pills[cell] += 1
+        if self.pills[cell] == 1:
+            bisect.insort(self.rows[cell[0]], cell[1])
+            self.count += 1
+
+    def remove(self, location):
+        """ Removes a pill from the index if it is present. """
+        cell = (location[0], location[1])
+        if not self.pills[cell]:
+            return
+        self.pills[cell] -= 1
+        if not self.pills[cell]:
+            del self.pills[cell]
+            columns = self.rows[cell[0]]
+            del columns[bisect.bisect_left(columns, cell[1])]
+            self.count -= 1
+
+    def nearest(self, cell):
+        """ Returns manhattan distance from cell to the closest pill, 0 if there are no pills. """
+
+        if not self.count:
+            return 0
+
+        row, column = cell[0], cell[1]
+        best = None
+        for offset in range(len(self.rows)):
+            # rows further away than the best distance cannot hold a closer pill
+            if best is not None and offset >= best:
+                break
+            for current_row in {row - offset, row + offset}:
+                if not 0 <= current_row < len(self.rows) or not self.rows[current_row]:
+                    continue
+                columns = self.rows[current_row]
+                index = bisect.bisect_left(columns, column)
+                for neighbour in columns[max(index - 1, 0):index + 1]:
+                    distance = offset + abs(neighbour - column)
+                    if best is None or distance < best:
+                        best = distance
+        return best
+
+
 class GPac():
     """ GPac class. Defines functionality for the Pac-Man Game logic."""
 
@@ -51,10 +125,10 @@ class GPac():
     def __init__(self, filename, pill_chance, fruit_chance, fruit_score, time_multiplier):
         # pylint: disable=too-many-arguments
         width, height, board = self._parse_map(filename)
-        self.world_contents = f'{width}\n{height}\n'
+        self.world_contents = self._create_world_log(width, height)
         self.width = width    # x
         self.height = height  # y
-        self.board = board
+        self.board = self._create_board(board)
 
         self.chances = {}
         self.chances['pill'] = pill_chance
@@ -66,6 +140,7 @@ class GPac():
         self.locations[PACMAN] = self._place_pacman()
         self.locations = {**self.locations, **self._place_ghosts()}
         self.locations[WALL] = self._read_walls()
+        self.pill_index = PillIndex(height)
         self.locations[PILL] = self._place_pills()
         self.locations[FRUIT] = self._place_fruit()
 
@@ -103,6 +178,16 @@ class GPac():
                     # redundant but allows walls to be logged
         return walls
 
+    @staticmethod
+    def _create_board(board):
+        """ Returns the storage used for the game board. """
+        return board
+
+    @staticmethod
+    def _create_world_log(width, height):
+        """ Returns the buffer the world file is logged into. """
+        return f'{width}\n{height}\n'
+
     def turn(self):
         """ Handles a "turn". Pac-Man and Ghosts move.
         If Pac-Man collides with ghosts game ends.
@@ -187,6 +272,7 @@ class GPac():
                         if rng <= self.chances['pill']:
                             self._place([row_count, column_count], PILL)
                             pills.append([row_count, column_count])
+                            self.pill_index.add([row_count, column_count])
                             pill_count += 1
 
         # has to have at least one pill
@@ -202,6 +288,7 @@ class GPac():
 
                     self._place([rand_row, rand_column], PILL)
                     pills.append([rand_row, rand_column])
+                    self.pill_index.add([rand_row, rand_column])
                     break
 
         return pills
@@ -321,6 +408,7 @@ class GPac():
             if loc == pill:
                 self.consumed['pill'] += 1
                 self.locations[PILL].remove(loc)
+                self.pill_index.remove(loc)
                 return PILL_COLLISION
 
         # collides with fruit
@@ -406,6 +494,14 @@ class GPac():
     #########################   Utilities    ##########################
     ###################################################################
 
+    def cell_at(self, location):
+        """ Returns the unit type stored on the board at location. """
+        return self.board[location[0]][location[1]]
+
+    def get_rows(self):
+        """ Returns the board as a tuple of rows so that it can be hashed. """
+        return tuple(tuple(row) for row in self.board)
+
     @staticmethod
     def neg_index_to_positive(value, max_val):
         """ Converts negative index value to positive"""
@@ -489,7 +585,7 @@ class GPac():
         os.system('clear')
         print(f"GPac by Jordan Sosnowski \t{self.time - self.time_elapsed}")
         print('-' * (self.width + 1))
-        for row in self.board:
+        for row in self.get_rows():
             row_str = ''.join(row)
             row_str = row_str.replace('~', ' ')
             row_str = row_str.replace('1', '▼')
@@ -525,3 +621,551 @@ class GPac():
         current_score = self._calculate_score()
         self._log_world('t', self.time - self.time_elapsed, current_score)
         self.time_elapsed += 1
+
+
+class WorldLog:
+    """ Append only buffer for world file contents.
+
+    Lines are kept in a list and only joined when the contents are requested,
+    so logging stays linear in the length of the game.
+    """
+
+    def __init__(self, header=''):
+        self.lines = [header]
+
+    def append(self, line):
+        """ Adds a line to the end of the log. """
+        self.lines.append(line)
+
+    def __str__(self):
+        if len(self.lines) > 1:
+            self.lines = [''.join(self.lines)]
+        return self.lines[0]
+
+
+class ArrayGPac(GPac):
+    """ GPac engine backed by a flat bytearray of cell codes.
+
+    Unit locations are stored as tuples and the world file is logged into a WorldLog.
+    Pills stay in a list, as GPac can place the same pill twice under a ghost. Game
+    rules are inherited from GPac, so both engines play the exact same game for the
+    same random seed.
+    """
+
+    ###################################################################
+    #######################     Core    ###############################
+    ###################################################################
+
+    @staticmethod
+    def _create_board(board):
+        """ Encodes the parsed board row by row into a bytearray. """
+        return bytearray(CELL_CODES[cell] for row in board for cell in row)
+
+    @staticmethod
+    def _create_world_log(width, height):
+        """ Returns a WorldLog so that logging does not copy the world contents. """
+        return WorldLog(f'{width}\n{height}\n')
+
+    def _read_walls(self):
+        """ Adds walls to log file """
+
+        walls = []
+        for index, code in enumerate(self.board):
+            if code == WALL_CODE:
+                location = divmod(index, self.width)
+                walls.append(location)
+                self._place(location, WALL)
+        return walls
+
+    ###################################################################
+    #####################     Placement    ############################
+    ###################################################################
+
+    def _place_pacman(self):
+        """ Places pacman. Returns location to be added to location dict"""
+
+        self._place((0, 0), PACMAN)
+        return (0, 0)
+
+    def _place_ghosts(self):
+        """ Place ghosts on board. Returns dict to be merged with locations """
+
+        locations = {}
+        for ghost in GHOST:
+            location = (self.height - 1, self.width - 1)
+            locations[ghost] = location
+            self._place(location, ghost)
+        return locations
+
+    def _place_pills(self):
+        """ Places pills in empty cells based on pill_chance value.
+
+        Random numbers are drawn in the same order as GPac._place_pills.
+        """
+        if self.chances['pill'] > 1:
+            raise MyException(
+                "Error: Fruit Chance should be in the range [0,1]")
+
+        pills = []
+        walls = self.board.count(WALL_CODE)
+        total_pills = math.floor(self.chances['pill'] * (len(self.board) - 1 - walls))
+
+        pill_count = 0
+        while pill_count != total_pills:
+            for index, code in enumerate(self.board):
+                if pill_count == total_pills:
+                    break
+                # index 0 is Pac-Man's starting cell
+                if code != WALL_CODE and code != PILL_CODE and index:
+                    rng = random.random()
+                    if rng <= self.chances['pill']:
+                        location = divmod(index, self.width)
+                        self._place(location, PILL)
+                        pills.append(location)
+                        self.pill_index.add(location)
+                        pill_count += 1
+
+        # has to have at least one pill
+        while not pills:
+            rand_row = random.randint(0, self.height - 1)
+            rand_column = random.randint(0, self.width - 1)
+
+            if self.board[rand_row * self.width + rand_column] == EMPTY_CODE and \
+                    not (rand_row == 0 and rand_column == 0):
+                self._place((rand_row, rand_column), PILL)
+                pills.append((rand_row, rand_column))
+                self.pill_index.add((rand_row, rand_column))
+
+        return pills
+
+    def _place_fruit(self):
+        """ Place fruit on board based on chance value. If fruit already
+        exists do not place anything as only one fruit can be on the board at a time. """
+
+        if self.chances['fruit'] > 1:
+            raise MyException(
+                "Error: Fruit Chance should be in the range [0,1]")
+
+        # check if board has fruit
+        if self.locations.get(FRUIT, None):
+            return self.locations.get(FRUIT)
+
+        rng = random.random()
+        if rng <= self.chances['fruit']:
+            # loop until a location that is free is found
+            while True:
+                rand_row = random.randint(0, self.height - 1)
+                rand_column = random.randint(0, self.width - 1)
+
+                code = self.board[rand_row * self.width + rand_column]
+                if code == EMPTY_CODE or code in GHOST_CODES:
+                    self._place((rand_row, rand_column), FRUIT)
+                    return (rand_row, rand_column)
+        return None
+
+    def _redraw_pills_fruits(self):
+        """ Redraws items that may have been covered up by a ghost.
+
+        Don't log redrawing of fruits and pills to world file
+        """
+
+        for pill in self.locations[PILL]:
+            if self.board[pill[0] * self.width + pill[1]] == EMPTY_CODE:
+                self._place(pill, PILL, False)
+
+        fruit_loc = self.locations[FRUIT]
+        if fruit_loc and self.board[fruit_loc[0] * self.width + fruit_loc[1]] == EMPTY_CODE:
+            self._place(fruit_loc, FRUIT, False)
+
+    ###################################################################
+    #####################   Unit Interaction    #######################
+    ###################################################################
+
+    def _remove(self, location):
+        """ Removes a unit from the board. """
+        self.board[location[0] * self.width + location[1]] = EMPTY_CODE
+
+    def _place(self, location, unit_type, log=True):
+        """ Places unit on board and log to file.
+
+        location - unit's location
+        unit_type - unit type (i.e. for pacman it would be 'p'
+        """
+        index = location[0] * self.width + location[1]
+        # ensure pills aren't placed on top of ghosts
+        if unit_type == PILL or unit_type == FRUIT:
+            if self.board[index] not in GHOST_CODES:
+                self.board[index] = CELL_CODES[unit_type]
+        else:
+            self.board[index] = CELL_CODES[unit_type]
+
+        if log:
+            x_loc, y_loc = self._convert_coordinates(location)
+            self._log_world(unit_type, x_loc, y_loc)
+
+    def _pacman_collision(self):
+        """ handles pacman collisions """
+
+        loc = self.locations[PACMAN]
+        for ghost in GHOST:
+            if loc == self.locations[ghost]:
+                return GHOST_COLLISION  # GAMEOVER
+
+        # collides with pill
+        if loc in self.locations[PILL]:
+            self.consumed['pill'] += 1
+            self.locations[PILL].remove(loc)
+            self.pill_index.remove(loc)
+            return PILL_COLLISION
+
+        # collides with fruit
+        if self.locations[FRUIT] == loc:
+            self.consumed['fruit'] += 1
+            self.locations[FRUIT] = ()
+            return FRUIT_COLLISION
+
+        return NO_COLLISION
+
+    def get_all_spots_around_cell(self, cell):
+        """ Gets all spots around the passed cell.
+
+        Does not look at any game logic just gets the raw cells around a cell.
+        """
+
+        row, column = cell
+        possible_spots = ((row + 1, column), (row, column + 1),
+                          (row - 1, column), (row, column - 1), (row, column))
+        return [spot for spot in possible_spots
+                if 0 <= spot[0] < self.height and 0 <= spot[1] < self.width]
+
+    def get_spots_around_unit(self, unit_type):
+        """ Gets all legal spots around the passed cell.
+
+        For instance ghosts cannot move through ghosts so there is
+        special logic for that unit.
+        """
+
+        cell = self.locations[unit_type]
+        final_spots = []
+        for spot in self.get_all_spots_around_cell(cell):
+            if unit_type in GHOST and cell == spot:
+                continue
+            if self.board[spot[0] * self.width + spot[1]] == WALL_CODE:
+                continue
+            final_spots.append(spot)
+
+        return final_spots
+
+    ###################################################################
+    #########################   Utilities    ##########################
+    ###################################################################
+
+    def cell_at(self, location):
+        """ Returns the unit type stored on the board at location. """
+        return CELL_TYPES[self.board[location[0] * self.width + location[1]]]
+
+    def get_rows(self):
+        """ Returns the board as a tuple of rows so that it can be hashed. """
+        return tuple(tuple(CELL_TYPES[code] for code in self.board[row:row + self.width])
+                     for row in range(0, len(self.board), self.width))
+
+    def cardinal_to_location(self, direction, current_position, unit_type):
+        """ Translates cardinal direction to location
+
+        Locations wrap around the board the same way GPac's logging does.
+
+        direction - cardinal direction
+        current_position - current location of unit
+        unit_type - type of unit in question
+        """
+        # pylint: disable=unused-argument,arguments-differ
+
+        row_offset, column_offset = OFFSETS.get(direction, (0, 0))
+        return ((current_position[0] + row_offset) % self.height,
+                (current_position[1] + column_offset) % self.width)
+
+    def _convert_coordinates(self, coordinates):
+        """ Converts input coordinates as if the origin of the board was bottom left """
+        return coordinates[1], self.height - coordinates[0] - 1
+
+    ###################################################################
+    ##########################   Log    ###############################
+    ###################################################################
+
+    def _log_world(self, log_type, *args):
+        """ Logs info to buffer with the following format:
+        log_type args[0] args[1] ... args[n]
+
+        log_type: type of unit being logged
+        args: list of args to log related to the log_type
+        """
+
+        log_type = log_type.replace('#', 'w')
+        self.world_contents.append(' '.join([log_type, *map(str, args), '\n']))
+
+
+class BatchGPac:
+    """ Plays n_games games on the same map in lockstep with numpy arrays. Pac-Man is
+    controlled by a weight vector per game and ghosts move randomly, as in random search.
+
+    Cells are numbered row * width + column. Pills are a (games, cells) mask and units
+    are cell numbers, so every step of a turn is done for all games at once. Games follow
+    the rules of GPac but draw their random numbers from rng.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    # order of Pac-Man's candidate cells, matches get_all_spots_around_cell
+    MOVES = ((1, 0), (0, 1), (-1, 0), (0, -1), (0, 0))
+    NO_FRUIT = 500
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, filename, n_games, pill_chance, fruit_chance, fruit_score,
+                 time_multiplier, rng):
+        if pill_chance > 1:
+            raise MyException("Error: Fruit Chance should be in the range [0,1]")
+        if fruit_chance > 1:
+            raise MyException("Error: Fruit Chance should be in the range [0,1]")
+
+        width, height, board = GPac._parse_map(filename)  # pylint: disable=protected-access
+        self.width = width
+        self.height = height
+        self.rows = len(board)
+        self.n_games = n_games
+        self.fruit_chance = fruit_chance
+        self.fruit_score = fruit_score
+        self.rng = rng
+        self._build_tables(board)
+
+        cells = width * height
+        open_cells = numpy.flatnonzero(~self.walls[1:]) + 1
+        total_pills = math.floor(pill_chance * (cells - 1 - int(self.walls.sum())))
+        # has to have at least one pill
+        self.total_pills = min(max(total_pills, 1), len(open_cells))
+        chosen = numpy.argsort(rng.random((n_games, len(open_cells))), axis=1)
+        self.pills = numpy.zeros((n_games, cells), dtype=bool)
+        self.pills[numpy.arange(n_games)[:, None], open_cells[chosen[:, :self.total_pills]]] = True
+        self.initial_pills = self.pills.copy()
+        # distance from every cell to its closest pill, rebuilt when a game eats a pill
+        self.pill_distances = numpy.zeros((n_games, cells), dtype=numpy.int64)
+        self._update_pill_distances(numpy.arange(n_games))
+
+        self.pacman = numpy.zeros(n_games, dtype=numpy.int64)
+        self.ghosts = numpy.full((n_games, len(GHOST)), cells - 1, dtype=numpy.int64)
+        self.fruit = numpy.full(n_games, -1, dtype=numpy.int64)
+        self.consumed_pills = numpy.zeros(n_games, dtype=numpy.int64)
+        self.consumed_fruit = numpy.zeros(n_games, dtype=numpy.int64)
+        self.time = width * height * time_multiplier
+        # the first turn is logged when a game is created
+        self.time_elapsed = numpy.ones(n_games, dtype=numpy.int64)
+        self.is_gameover = numpy.zeros(n_games, dtype=bool)
+
+        # what happened every turn, enough to write the world file of any game
+        self.history = []
+        self.ended = numpy.full(n_games, -1, dtype=numpy.int64)
+        self.end_stage = numpy.zeros(n_games, dtype=numpy.int64)
+        self.initial_fruit = self._place_fruit(numpy.arange(n_games))
+
+    def _build_tables(self, board):
+        """ Precomputes walls, moves and distances of every cell. """
+
+        cells = self.width * self.height
+        rows, columns = numpy.divmod(numpy.arange(cells), self.width)
+        self.walls = numpy.array([board[row][column] == WALL
+                                  for row, column in zip(rows, columns)], dtype=bool)
+        # the ghost and fruit sensors add up the coordinates of a cell
+        self.coordinate_sums = rows + columns
+
+        self.pacman_moves = numpy.full((cells, len(self.MOVES)), -1, dtype=numpy.int64)
+        self.ghost_moves = numpy.zeros((cells, len(self.MOVES) - 1), dtype=numpy.int64)
+        self.ghost_move_count = numpy.zeros(cells, dtype=numpy.int64)
+        self.adjacent_walls = numpy.zeros(cells, dtype=numpy.int64)
+        for cell, (row, column) in enumerate(zip(rows, columns)):
+            for index, (row_offset, column_offset) in enumerate(self.MOVES):
+                new_row, new_column = row + row_offset, column + column_offset
+                if not (0 <= new_row < self.height and 0 <= new_column < self.width):
+                    continue
+                new_cell = new_row * self.width + new_column
+                if self.walls[new_cell]:
+                    self.adjacent_walls[cell] += 1
+                    continue
+                self.pacman_moves[cell, index] = new_cell
+                # ghosts have to move
+                if new_cell != cell:
+                    self.ghost_moves[cell, self.ghost_move_count[cell]] = new_cell
+                    self.ghost_move_count[cell] += 1
+
+    def _update_pill_distances(self, games):
+        """ Rebuilds the closest pill distances of games. Manhattan distance is split into
+        the distance to the closest pill within a row followed by the distance between rows.
+        """
+
+        if not len(games):
+            return
+        far = self.width * self.height
+        pills = self.pills[games].reshape(len(games), self.height, self.width)
+        columns = numpy.arange(self.width)
+        left = numpy.maximum.accumulate(numpy.where(pills, columns, -far), axis=2)
+        right = numpy.minimum.accumulate(numpy.where(pills, columns, 2 * far)[:, :, ::-1],
+                                         axis=2)[:, :, ::-1]
+        row_distances = numpy.minimum(columns - left, right - columns)
+
+        rows = numpy.arange(self.height)
+        row_offsets = numpy.abs(rows[:, None] - rows[None, :])
+        distances = (row_offsets[None, :, :, None] + row_distances[:, None, :, :]).min(axis=2)
+        # no pills left
+        distances[distances >= far] = 0
+        self.pill_distances[games] = distances.reshape(len(games), -1)
+
+    def play(self, weights):
+        """ Plays every game to the end. Game i picks Pac-Man's moves with weights[i].
+
+        weights - (games, 4) matrix of ghost, pill, wall and fruit sensor weights
+        Returns the final scores.
+        """
+
+        weights = numpy.asarray(weights, dtype=float)
+        while not self.is_gameover.all():
+            self._turn(weights)
+        return self.scores()
+
+    def scores(self):
+        """ Returns the current score of every game. """
+
+        score = numpy.floor(self.consumed_pills / self.total_pills * 100).astype(numpy.int64)
+        score += self.consumed_fruit * self.fruit_score
+        bonus = numpy.floor((self.time - self.time_elapsed) / self.time * 100).astype(numpy.int64)
+        return score + numpy.where(self.consumed_pills == self.total_pills, bonus, 0)
+
+    def _sensor_inputs(self, games, candidates):
+        """ Sensor inputs of every candidate cell, shaped (games, candidates, 4). """
+
+        sums = self.coordinate_sums[candidates]
+        ghost = numpy.abs(sums[:, :, None] -
+                          self.coordinate_sums[self.ghosts[games]][:, None, :]).min(axis=2)
+
+        pill = self.pill_distances[games[:, None], candidates]
+
+        fruit = self.fruit[games]
+        fruit_distances = numpy.abs(sums - self.coordinate_sums[fruit][:, None])
+        fruit = numpy.where((fruit >= 0)[:, None], fruit_distances, self.NO_FRUIT)
+
+        return numpy.stack([ghost, pill, self.adjacent_walls[candidates], fruit], axis=2)
+
+    def _turn(self, weights):
+        """ Moves Pac-Man and the ghosts of every game that is not over. """
+
+        games = numpy.flatnonzero(~self.is_gameover)
+        turn = len(self.history)
+
+        # Pac-Man takes the first of its best moves
+        candidates = self.pacman_moves[self.pacman[games]]
+        valid = candidates >= 0
+        candidates = numpy.where(valid, candidates, 0)
+        move_scores = numpy.einsum('gcs,gs->gc', self._sensor_inputs(games, candidates),
+                                   weights[games])
+        move_scores[~valid] = -numpy.inf
+        pacman = candidates[numpy.arange(len(games)), move_scores.argmax(axis=1)]
+        self.pacman[games] = pacman
+
+        caught = (self.ghosts[games] == pacman[:, None]).any(axis=1)
+        self._end(games[caught], turn, 0)
+        games, pacman = games[~caught], pacman[~caught]
+
+        ate_pill = self.pills[games, pacman]
+        self.pills[games[ate_pill], pacman[ate_pill]] = False
+        self.consumed_pills[games[ate_pill]] += 1
+        self._update_pill_distances(games[ate_pill])
+        ate_fruit = self.fruit[games] == pacman
+        self.consumed_fruit[games[ate_fruit]] += 1
+        self.fruit[games[ate_fruit]] = -1
+
+        # ghosts move one after another to a random neighbouring cell
+        for ghost in range(len(GHOST)):
+            cells = self.ghosts[games, ghost]
+            counts = self.ghost_move_count[cells]
+            choices = (self.rng.random(len(games)) * counts).astype(numpy.int64)
+            moved = self.ghost_moves[cells, numpy.minimum(choices, len(self.MOVES) - 2)]
+            self.ghosts[games, ghost] = numpy.where(counts > 0, moved, cells)
+
+            caught = self.ghosts[games, ghost] == self.pacman[games]
+            self._end(games[caught], turn, ghost + 1)
+            games = games[~caught]
+
+        turn_scores = self.scores()
+        self.time_elapsed[games] += 1
+        finished = (self.time_elapsed[games] == self.time) | \
+            (self.consumed_pills[games] == self.total_pills)
+        self._end(games[finished], turn, len(GHOST) + 1)
+
+        spawned = self._place_fruit(games[~finished])
+        self.history.append((self.pacman.copy(), self.ghosts.copy(), spawned, turn_scores))
+
+    def _end(self, games, turn, stage):
+        """ Ends games during turn. stage is the number of units that moved plus one
+        if the turn was completed.
+        """
+
+        self.is_gameover[games] = True
+        self.ended[games] = turn
+        self.end_stage[games] = stage
+
+    def _place_fruit(self, games):
+        """ Places fruit in games that have none, based on the fruit chance. Fruit is
+        placed on a random cell without a wall, pill or Pac-Man.
+
+        Returns the cell fruit was placed on in every game, -1 if none was placed.
+        """
+
+        spawned = numpy.full(self.n_games, -1, dtype=numpy.int64)
+        games = games[self.fruit[games] < 0]
+        games = games[self.rng.random(len(games)) <= self.fruit_chance]
+        if not len(games):
+            return spawned
+
+        free = ~self.walls[None, :] & ~self.pills[games]
+        free[numpy.arange(len(games)), self.pacman[games]] = False
+        keys = numpy.where(free, self.rng.random(free.shape), -1)
+        cells = keys.argmax(axis=1)
+        self.fruit[games] = cells
+        spawned[games] = cells
+        return spawned
+
+    def _location(self, cell):
+        """ Converts a cell number to the world file's x and y. """
+
+        row, column = divmod(int(cell), self.width)
+        return f'{column} {self.rows - row - 1}'
+
+    def world_contents(self, game):
+        """ Returns the world file of a game in the same format as GPac. """
+
+        lines = [f'{PACMAN} {self._location(0)} ']
+        lines += [f'{ghost} {self._location(self.width * self.height - 1)} ' for ghost in GHOST]
+        lines += [f'w {self._location(cell)} ' for cell in numpy.flatnonzero(self.walls)]
+        lines += [f'{PILL} {self._location(cell)} '
+                  for cell in numpy.flatnonzero(self.initial_pills[game])]
+        if self.initial_fruit[game] >= 0:
+            lines.append(f'{FRUIT} {self._location(self.initial_fruit[game])} ')
+        lines.append(f't {self.time} 0 ')
+
+        last_turn = self.ended[game] if self.ended[game] >= 0 else len(self.history) - 1
+        for turn in range(last_turn + 1):
+            pacman, ghosts, spawned, turn_scores = self.history[turn]
+            end_stage = self.end_stage[game] if turn == self.ended[game] else None
+            lines.append(f'{PACMAN} {self._location(pacman[game])} ')
+            for stage, ghost in enumerate(GHOST, 1):
+                if end_stage is not None and end_stage < stage:
+                    break
+                lines.append(f'{ghost} {self._location(ghosts[game, stage - 1])} ')
+            if end_stage is not None and end_stage <= len(GHOST):
+                break
+            lines.append(f't {self.time - turn - 1} {turn_scores[game]} ')
+            if spawned[game] >= 0:
+                lines.append(f'{FRUIT} {self._location(spawned[game])} ')
+
+        return f'{self.width}\n{self.height}\n' + ''.join(line + '\n' for line in lines)
+
+
+# game engines selectable from the solver config
+ENGINES = {'list': GPac, 'array': ArrayGPac}
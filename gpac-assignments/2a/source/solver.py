@@ -5,11 +5,32 @@ import os
 import collections
 from pathlib import Path
 import random
+import hashlib
+import multiprocessing
+import numpy
 import gpac
 import tqdm
 
 
-Solution = collections.namedtuple('solution', 'fitness contents weights')
+# typename matches the module attribute so that solutions can be pickled
+Solution = collections.namedtuple('Solution', 'fitness contents weights')
+
+# solver used by run workers, set once per worker by _init_worker
+_worker_solver = None
+
+
+def _init_worker(solver):
+    """ Pool initializer. Stores the solver so tasks only need to carry the run number. """
+
+    global _worker_solver  # pylint: disable=global-statement
+    _worker_solver = solver
+
+
+def _search_run(task):
+    """ Plays a whole run with the worker's solver. Runs inside pool workers. """
+
+    map_filepath, run = task
+    return _worker_solver.search_run(map_filepath, run)
 
 
 class Solver():
@@ -45,8 +66,14 @@ class Solver():
             self.max_evaluations = config.get('max_evaluations')
 
             self.algorithm = config.get('algorithm')
+            self.engine = config.get('engine', 'list')
             self.game_instance = None
 
+            # number of processes whole runs are spread over
+            self.run_workers = config.get('run_workers', 1)
+            # number of games played in lockstep by gpac.BatchGPac, 1 plays games one by one
+            self.batch_size = config.get('batch_size', 1)
+
     def run(self, map_filepath):
         """ Runs solver against a specific map. """
         self._set_seed()
@@ -63,57 +90,117 @@ class Solver():
 
         highest_solution_overall = Solution(0, '', [])
 
-        if self.show_progress_bar:
-            run_range = tqdm.tqdm(range(self.max_runs), "Run", position=0)
+        if self.run_workers > 1:
+            pool = multiprocessing.Pool(self.run_workers, initializer=_init_worker,
+                                        initargs=(self,))
+            results = pool.imap(_search_run, [(map_filepath, run)
+                                              for run in range(self.max_runs)])
         else:
-            run_range = range(self.max_runs)
-
-        for _ in run_range:
-
-            # play game
-            highest_solution_in_run = Solution(0, '', [])
-            highest_solution_overall = Solution(0, '', [])
-            current_solution = Solution(0, '', [])
-
-            evaluations = collections.OrderedDict()
-            if self.show_progress_bar:
-                eval_range = tqdm.tqdm(range(self.max_evaluations),
-                                       "Evaluation", position=1, leave=False)
-            else:
-                eval_range = range(self.max_evaluations)
-
-            for evaluation in eval_range:
-                self._create_game(map_filepath)
-                pac_weights = self._generate_pacman_weights()
-                while not self.game_instance.is_gameover:
-                    if self.show_board:
-                        self.game_instance.print_board()
-                        time.sleep(0.10)
-                    current_score, contents = self._turn(pac_weights)
-                    current_solution = Solution(current_score, contents, pac_weights)
-
-                if current_solution.fitness > highest_solution_in_run.fitness:
-                    highest_solution_in_run = current_solution
-                    evaluations[evaluation] = current_solution
+            pool = None
+            results = (self.search_run(map_filepath, run) for run in range(self.max_runs))
+
+        if self.show_progress_bar:
+            results = tqdm.tqdm(results, "Run", total=self.max_runs, position=0)
 
+        for evaluations, highest_solution_in_run in results:
             runs.append(evaluations)
 
             if highest_solution_in_run.fitness > highest_solution_overall.fitness:
                 highest_solution_overall = highest_solution_in_run
 
+        if pool:
+            pool.close()
+            pool.join()
+
         self._log_results(runs, map_filepath)
         self._log_world(highest_solution_overall.contents)
         self._log_solution(highest_solution_overall.weights)
 
+    def search_run(self, map_filepath, run):
+        """ Plays a single run of random search. The run is seeded with a seed derived from
+        the config seed, so it plays the same games no matter which process runs it.
+
+        Returns the run's evaluations and its highest solution.
+        """
+
+        if self.batch_size > 1:
+            return self._search_run_batched(map_filepath, run)
+
+        random.seed(self._derive_seed(run))
+
+        # play game
+        highest_solution_in_run = Solution(0, '', [])
+
+        evaluations = collections.OrderedDict()
+        if self.show_progress_bar and self.run_workers <= 1:
+            eval_range = tqdm.tqdm(range(self.max_evaluations),
+                                   "Evaluation", position=1, leave=False)
+        else:
+            eval_range = range(self.max_evaluations)
+
+        for evaluation in eval_range:
+            self._create_game(map_filepath)
+            pac_weights = self._generate_pacman_weights()
+            current_score = 0
+            contents = ''
+            while not self.game_instance.is_gameover:
+                if self.show_board:
+                    self.game_instance.print_board()
+                    time.sleep(0.10)
+                current_score, contents = self._turn(pac_weights)
+            # array engine hands back a WorldLog buffer
+            current_solution = Solution(current_score, str(contents), pac_weights)
+
+            if current_solution.fitness > highest_solution_in_run.fitness:
+                highest_solution_in_run = current_solution
+                evaluations[evaluation] = current_solution
+
+        return evaluations, highest_solution_in_run
+
+    def _search_run_batched(self, map_filepath, run):
+        """ Plays a single run of random search batch_size games at a time with
+        gpac.BatchGPac. Only the world file of the run's highest solution is built.
+
+        Returns the run's evaluations and its highest solution.
+        """
+
+        rng = numpy.random.default_rng(self._derive_seed(run))
+
+        highest_fitness = 0
+        highest_weights = []
+        highest_game = None
+        evaluations = collections.OrderedDict()
+        batch_range = range(0, self.max_evaluations, self.batch_size)
+        if self.show_progress_bar and self.run_workers <= 1:
+            batch_range = tqdm.tqdm(batch_range, "Batch", position=1, leave=False)
+
+        for start in batch_range:
+            n_games = min(self.batch_size, self.max_evaluations - start)
+            weights = rng.uniform(-1, 1, size=(n_games, 4))
+            game = gpac.BatchGPac(map_filepath, n_games, self.pill_density,
+                                  self.fruit_spawn_probability, self.fruit_score,
+                                  self.time_multiplier, rng)
+            scores = game.play(weights)
+
+            for index, score in enumerate(scores):
+                if score > highest_fitness:
+                    highest_fitness = int(score)
+                    highest_weights = weights[index].tolist()
+                    highest_game = (game, index)
+                    evaluations[start + index] = Solution(highest_fitness, '', highest_weights)
+
+        contents = highest_game[0].world_contents(highest_game[1]) if highest_game else ''
+        return evaluations, Solution(highest_fitness, contents, highest_weights)
+
     def _create_game(self, world_filepath):
         """ Loads class variable with game instance.
 
         Game instance should be created per run.
         """
 
-        self.game_instance = gpac.GPac(world_filepath, self.pill_density,
-                                       self.fruit_spawn_probability, self.fruit_score,
-                                       self.time_multiplier)
+        self.game_instance = gpac.ENGINES[self.engine](world_filepath, self.pill_density,
+                                                       self.fruit_spawn_probability,
+                                                       self.fruit_score, self.time_multiplier)
 
     ###################################################################
     ###############     Distance Calculation    #######################
@@ -132,16 +219,7 @@ class Solver():
 
     def _closest_pill(self, cell):
         """ Calculate manhattan distance for closest pill to Pac-Man. """
-        pill_locations = self.game_instance.locations[gpac.PILL]
-
-        min_distance = self._calculate_manhattan_distance(cell, pill_locations[0])
-
-        for pill_loc in pill_locations[1:]:
-            current_distance = self._calculate_manhattan_distance(cell, pill_loc)
-            if min_distance > current_distance:
-                min_distance = current_distance
-
-        return min_distance
+        return self.game_instance.pill_index.nearest(cell)
 
     def _closest_fruit(self, cell):
         """ Calculate manhattan distance for closest fruit to pacman.
@@ -161,7 +239,7 @@ class Solver():
         num_of_walls = 0
 
         for loc in locs:
-            if self.game_instance.board[loc[0]][loc[1]] == '#':
+            if self.game_instance.cell_at(loc) == gpac.WALL:
                 num_of_walls += 1
 
         return num_of_walls
@@ -276,6 +354,8 @@ class Solver():
         outputs += f'\tSolution File Path: {self.solution_file}\n'
         outputs += f'\tSeed: {self.seed}\n'
         outputs += f'\tNumber of runs: {self.max_runs}\n'
+        outputs += f'\tRun workers: {self.run_workers}\n'
+        outputs += f'\tBatch size: {self.batch_size}\n'
         outputs += f'\tNumber of evaluation: {self.max_evaluations}\n'
         outputs += f'\tPill density: {self.pill_density}\n'
         outputs += f'\tFruit spawn chance: {self.fruit_spawn_probability}\n'
@@ -306,6 +386,12 @@ class Solver():
     ####################     Utilities    #############################
     ###################################################################
 
+    def _derive_seed(self, *labels):
+        """ Derives a seed from the config seed and labels such as a run number. """
+
+        digest = hashlib.sha1(':'.join(map(str, (self.seed, *labels))).encode()).hexdigest()
+        return int(digest[:8], 16)
+
     def _set_seed(self):
         """Sets random seed value based on object seed variable."""
 
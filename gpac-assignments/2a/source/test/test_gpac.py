@@ -1,5 +1,6 @@
 """ Module for test code for gpac module. """
 import copy
+import numpy
 import pytest
 import gpac
 import random
@@ -239,3 +240,100 @@ def test_score_calculation_all_pills_no_time():
     instance.consumed['pill'] = 142
     instance.time_elapsed = instance.time
     assert instance._calculate_score() == 100
+
+
+def test_pill_index_matches_pills():
+    instance = gpac.GPac('maps/map0.txt', .5, 0, 0, 10)
+    pills = instance.locations[gpac.PILL]
+    assert instance.pill_index.count == len(pills)
+
+    for cell in [[0, 0], [19, 34], [10, 17]]:
+        expected = min(abs(cell[0] - pill[0]) + abs(cell[1] - pill[1]) for pill in pills)
+        assert instance.pill_index.nearest(cell) == expected
+
+
+def test_pill_index_counts_stacked_pills():
+    instance = gpac.GPac('maps/map0.txt', .5, 0, 0, 10)
+    pill = instance.locations[gpac.PILL][0]
+    # a pill placed again under a ghost
+    instance.locations[gpac.PILL].append(list(pill))
+    instance.pill_index.add(pill)
+
+    instance.locations[gpac.PACMAN] = pill
+    assert instance._pacman_collision() == gpac.PILL_COLLISION
+    assert pill in instance.locations[gpac.PILL]
+    assert instance.pill_index.nearest(pill) == 0
+
+    assert instance._pacman_collision() == gpac.PILL_COLLISION
+    assert pill not in instance.locations[gpac.PILL]
+    assert instance.pill_index.nearest(pill) > 0
+    assert instance.pill_index.count == len(instance.locations[gpac.PILL])
+
+
+def test_array_engine_parse_board():
+    instance = gpac.ArrayGPac('maps/map0.txt', .5, 0, 0, 2)
+    _, _, board = gpac.GPac._parse_map('maps/map0.txt')
+    assert len(instance.board) == 35 * 20
+    assert instance.cell_at((1, 1)) == gpac.WALL
+    assert instance.cell_at((0, 0)) == gpac.PACMAN
+    assert instance.cell_at((19, 34)) == gpac.GHOST[2]
+    rows = [[gpac.EMPTY_CELL if cell in (gpac.PILL, gpac.PACMAN, *gpac.GHOST) else cell
+             for cell in row] for row in instance.get_rows()]
+    assert rows == board
+
+
+def test_array_engine_matches_list_engine():
+    games = []
+    for engine in (gpac.GPac, gpac.ArrayGPac):
+        random.seed(7)
+        instance = engine('maps/map0.txt', .5, .1, 10, 2)
+        while not instance.is_gameover:
+            for unit in [gpac.PACMAN, *gpac.GHOST]:
+                instance.move(random.choice(instance.get_moves_for_unit(unit)), unit)
+            score, contents = instance.turn()
+        games.append((score, str(contents), instance.consumed, instance.get_rows()))
+    assert games[0] == games[1]
+
+
+def test_array_engine_pill_collision():
+    instance = gpac.ArrayGPac('maps/map0.txt', 0, 0, 0, 10)
+    instance._place((1, 0), gpac.PILL)
+    instance.locations[gpac.PILL].append((1, 0))
+
+    instance.move(gpac.DOWN, gpac.PACMAN)
+    assert instance.consumed['pill'] == 1
+    assert (1, 0) not in instance.locations[gpac.PILL]
+    assert instance.cell_at((1, 0)) == gpac.PACMAN
+    assert instance.cell_at((0, 0)) == gpac.EMPTY_CELL
+
+
+def test_batch_pill_distances():
+    batch = gpac.BatchGPac('maps/map0.txt', 3, .1, 0, 10, 2, numpy.random.default_rng(1))
+    assert (batch.pills.sum(axis=1) == batch.total_pills).all()
+    assert not batch.pills[:, 0].any()
+
+    for game in range(3):
+        pills = [divmod(int(cell), batch.width) for cell in numpy.flatnonzero(batch.pills[game])]
+        for cell in (0, 57, batch.width * batch.height - 1):
+            row, column = divmod(cell, batch.width)
+            expected = min(abs(row - pill[0]) + abs(column - pill[1]) for pill in pills)
+            assert batch.pill_distances[game, cell] == expected
+
+
+def test_batch_play():
+    batch = gpac.BatchGPac('maps/map0.txt', 8, .5, .1, 10, 2, numpy.random.default_rng(2))
+    weights = numpy.random.default_rng(3).uniform(-1, 1, size=(8, 4))
+    scores = batch.play(weights)
+
+    assert batch.is_gameover.all()
+    assert (batch.consumed_pills <= batch.total_pills).all()
+    for game, score in enumerate(scores):
+        lines = batch.world_contents(game).splitlines()
+        assert lines[:2] == ['35', '20']
+        assert lines[2] == 'm 0 19 '
+        turns = [line for line in lines if line.startswith('t ')]
+        # the first turn is logged on creation, the last only if every unit moved
+        assert len(turns) == batch.ended[game] + 1 + (batch.end_stage[game] > len(gpac.GHOST))
+        if batch.consumed_pills[game] < batch.total_pills:
+            # the time bonus shrinks after the last turn is logged
+            assert int(turns[-1].split()[2]) <= score
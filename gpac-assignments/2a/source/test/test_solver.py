@@ -1,3 +1,5 @@
+import numpy
+import gpac
 import solver
 
 
@@ -125,3 +127,89 @@ def test_select_best_move():
 # def test_random():
 #     instance = solver.Solver('config/test_config.json')
 #     instance.run('maps/map0.txt')
+
+
+def test_parallel_runs_match_serial(tmp_path):
+    logs = []
+    for run_workers in (1, 2):
+        instance = solver.Solver('config/test_config.json')
+        instance.seed = 4
+        instance.max_runs = 3
+        instance.max_evaluations = 3
+        instance.run_workers = run_workers
+        instance.log_file = str(tmp_path / f'{run_workers}.log')
+        instance.solution_file = str(tmp_path / 'solution.txt')
+        instance.highest_score_file = str(tmp_path / 'world.txt')
+        instance.run('maps/map0.txt')
+
+        with open(instance.log_file) as file:
+            logs.append(file.read().split('Run 1\n')[1])
+    assert logs[0] == logs[1]
+    assert logs[0].count('Run ') == 2
+
+
+def test_batch_sensor_inputs_match_solver():
+    batch = gpac.BatchGPac('maps/map0.txt', 1, .5, 1, 10, 2, numpy.random.default_rng(3))
+    instance = solver.Solver('config/test_config.json')
+    instance._create_game('maps/map0.txt')
+    game = instance.game_instance
+    game.pill_index = gpac.PillIndex(game.height)
+    for cell in numpy.flatnonzero(batch.pills[0]):
+        game.pill_index.add(list(divmod(int(cell), batch.width)))
+    game.locations[gpac.FRUIT] = list(divmod(int(batch.fruit[0]), batch.width))
+
+    candidates = batch.pacman_moves[0][batch.pacman_moves[0] >= 0]
+    sensors = batch._sensor_inputs(numpy.array([0]), candidates[None, :])[0]
+    expected = [instance._generate_sensor_inputs(list(divmod(int(cell), batch.width)))
+                for cell in candidates]
+    assert sensors.tolist() == expected
+
+
+def test_batched_search_run():
+    instance = solver.Solver('config/test_config.json')
+    instance.seed = 4
+    instance.max_evaluations = 10
+    instance.batch_size = 4
+    instance.pill_density = 0.5
+    instance.fruit_spawn_probability = 0.01
+
+    evaluations, highest = instance.search_run('maps/map0.txt', 0)
+    assert evaluations and all(evaluation < 10 for evaluation in evaluations)
+    assert next(reversed(evaluations.values())).fitness == highest.fitness
+    assert highest.contents.startswith('35\n20\n')
+    assert len(highest.weights) == 4
+
+    again, _ = instance.search_run('maps/map0.txt', 0)
+    assert list(again.items()) == list(evaluations.items())
+
+
+def test_search_run_array_engine():
+    results = []
+    for engine in ('list', 'array'):
+        instance = solver.Solver('config/test_config.json')
+        instance.engine = engine
+        instance.seed = 4
+        instance.max_evaluations = 3
+        instance.pill_density = 0.5
+        instance.time_multiplier = 1
+
+        evaluations, highest = instance.search_run('maps/map0.txt', 0)
+        results.append((list(evaluations.items()), highest))
+    assert results[0] == results[1]
+    assert isinstance(results[1][1].contents, str)
+
+
+def test_search_run_game_over_at_start():
+    instance = solver.Solver('config/test_config.json')
+    instance.seed = 4
+    instance.max_evaluations = 2
+    create_game = instance._create_game
+
+    def finished_game(map_filepath):
+        create_game(map_filepath)
+        instance.game_instance.is_gameover = True
+
+    instance._create_game = finished_game
+    evaluations, highest = instance.search_run('maps/map0.txt', 0)
+    assert not evaluations
+    assert highest.fitness == 0
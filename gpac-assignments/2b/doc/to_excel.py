@@ -1,9 +1,15 @@
+import os
 import glob
 import xlsxwriter
 import re
+import report_cache
 
 
 def get_contents(filename):
+    history = report_cache.load_history(f'./logs/{filename}')
+    if history is not None:
+        return history['best'][report_cache.last_rows(history)].astype(int).tolist()
+
     runs = []
     with open(f'./logs/{filename}') as file:
         contents = file.read()
@@ -18,8 +24,28 @@ def get_contents(filename):
 
 
 def main():
+    report_cache.render(__file__, [
+        report_cache.Job(['./doc/g3/green3.xlsx'],
+                         log_inputs('g2/config1.log', 'g2/config2.log', 'g2/config3.log'),
+                         write_green, ('./doc/g3/green3.xlsx',)),
+        report_cache.Job(['./doc/y1/yellow1.xlsx'],
+                         log_inputs('g2/config1.log', 'y1/config1_low.log', 'y1/config1_medium.log',
+                                    'y1/config2_low.log', 'y1/config2_medium.log',
+                                    'y1/config2_high.log'),
+                         write_yellow, ('./doc/y1/yellow1.xlsx',)),
+    ])
+
+
+def log_inputs(*logs):
+    """ Files the workbook columns of the logs are made from, a log and its history. """
 
-    workbook = xlsxwriter.Workbook(f'./doc/g3/green3.xlsx')
+    return [path for log in logs
+            for path in (f'./logs/{log}', f'./logs/{os.path.splitext(log)[0]}.npy')]
+
+
+def write_green(path):
+    # rows are written in order, so they can be streamed to disk
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
 
     # Config1 v Config2
     worksheet = workbook.add_worksheet("Config1 v Config2")
@@ -41,7 +67,9 @@ def main():
 
     workbook.close()
 
-    workbook = xlsxwriter.Workbook(f'./doc/y1/yellow1.xlsx')
+
+def write_yellow(path):
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
 
     # low v medium
     worksheet = workbook.add_worksheet("Total Nodes L-M")
@@ -112,4 +140,5 @@ def write_data(worksheet, column1_header, column2_header, column1_data, column2_
     # row += 1
 
 
-main()
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,24 @@
 from pathlib import Path
 import os
-import matplotlib.pyplot as plt
+import matplotlib
+import numpy
 import re
+import report_cache
+
+# graphs are only saved, so use a backend that works in pool workers without a display
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # pylint: disable=wrong-import-position
 
 
 def get_best_run(filename):
+    history = report_cache.load_history(filename)
+    if history is not None:
+        finals = report_cache.last_rows(history)
+        best_run = history['run'][finals[numpy.argmax(history['best'][finals])]]
+        rows = history['run'] == best_run
+        return (history['evals'][rows].tolist(), history['best'][rows].tolist(),
+                history['average'][rows].tolist())
+
     eval_counts = []
     best_fitnesses = []
     avg_fitnesses = []
@@ -59,21 +73,38 @@ def plot_graph(name, filenames, suffix, evaluationes_list, fitnesses_list, title
     plt.ylim(0)
     plt.legend(loc="best")
 
+    Path(os.path.dirname(graph_path(name, suffix, filenames))).mkdir(parents=True, exist_ok=True)
+    plt.savefig(graph_path(name, suffix, filenames))
+    plt.close()
+
+
+def graph_path(name, suffix, filenames):
+    """ Graphs go in the doc folder named after the folder of the first log. """
+
     dirname = os.path.dirname(filenames[0]).split('/')[-1]
+    return f"./doc/{dirname}/{name}{suffix}.png"
+
 
-    Path(f'./doc/{dirname}').mkdir(parents=True, exist_ok=True)
-    plt.savefig(f"./doc/{dirname}/{name}{suffix}.png")
-    plt.show()
-    plt.clf()
+def compare_job(name, *filenames):
+    inputs = [path for filename in filenames
+              for path in (filename, os.path.splitext(filename)[0] + '.npy')]
+    return report_cache.Job([graph_path(name, '_best', filenames), graph_path(name, '_avg', filenames)],
+                            inputs, graph_compare, (name, *filenames))
 
 
-graph_compare('parsimony_total_nodes', 'logs/y1/config1_low.log',
-              'logs/y1/config1_medium.log', 'logs/g2/config1.log')
-graph_compare('parsimony_tree_height', 'logs/y1/config2_low.log',
-              'logs/y1/config2_medium.log', 'logs/y1/config2_high.log')
-graph_compare('parsimony_height_total', 'logs/y1/config1_medium.log', 'logs/y1/config1_low.log',
-              'logs/g2/config1.log', 'logs/y1/config2_low.log', 'logs/y1/config2_medium.log',
-              'logs/y1/config2_high.log')
+def main():
+    report_cache.render(__file__, [
+        compare_job('parsimony_total_nodes', 'logs/y1/config1_low.log',
+                    'logs/y1/config1_medium.log', 'logs/g2/config1.log'),
+        compare_job('parsimony_tree_height', 'logs/y1/config2_low.log',
+                    'logs/y1/config2_medium.log', 'logs/y1/config2_high.log'),
+        compare_job('parsimony_height_total', 'logs/y1/config1_medium.log', 'logs/y1/config1_low.log',
+                    'logs/g2/config1.log', 'logs/y1/config2_low.log', 'logs/y1/config2_medium.log',
+                    'logs/y1/config2_high.log'),
+        compare_job('config_compare', 'logs/g2/config1.log', 'logs/g2/config2.log',
+                    'logs/g2/config3.log'),
+    ])
 
 
-graph_compare('config_compare', 'logs/g2/config1.log', 'logs/g2/config2.log', 'logs/g2/config3.log')
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 """ Module that implements map parsing and game logic """
 
 import os
+import bisect
+import contextlib
 import random
 import copy
 import math
@@ -35,6 +37,68 @@ FRUIT_COLLISION = 20
 PILL_COLLISION = 30
 NO_COLLISION = 40
 
+# cell codes used by the array backed engine
+EMPTY_CODE = 0
+WALL_CODE = 1
+PILL_CODE = 2
+FRUIT_CODE = 3
+CELL_CODES = {EMPTY_CELL: EMPTY_CODE, WALL: WALL_CODE, PILL: PILL_CODE, FRUIT: FRUIT_CODE}
+CELL_TYPES = (EMPTY_CELL, WALL, PILL, FRUIT)
+
+# row and column offsets for each direction
+OFFSETS = {UP: (-1, 0), DOWN: (1, 0), LEFT: (0, -1), RIGHT: (0, 1), HOLD: (0, 0)}
+
+
+class PillIndex:
+    """ Bucket grid of pill locations used to find the closest pill to a cell.
+
+    Pills are bucketed by row and each row keeps its columns sorted, so a query
+    only visits rows that could hold a pill closer than the best one found so far.
+    """
+
+    def __init__(self, height):
+        self.rows = [[] for _ in range(height)]
+        self.count = 0
+
+    def add(self, location):
+        """ Adds a pill to the index. """
+        columns = self.rows[location[0]]
+        index = bisect.bisect_left(columns, location[1])
+        if index == len(columns) or columns[index] != location[1]:
+            columns.insert(index, location[1])
+            self.count += 1
+
+    def remove(self, location):
+        """ Removes a pill from the index if it is present. """
+        columns = self.rows[location[0]]
+        index = bisect.bisect_left(columns, location[1])
+        if index < len(columns) and columns[index] == location[1]:
+            del columns[index]
+            self.count -= 1
+
+    def nearest(self, cell):
+        """ Returns manhattan distance from cell to the closest pill, 0 if there are no pills. """
+
+        if not self.count:
+            return 0
+
+        row, column = cell[0], cell[1]
+        best = None
+        for offset in range(len(self.rows)):
+            # rows further away than the best distance cannot hold a closer pill
+            if best is not None and offset >= best:
+                break
+            for current_row in {row - offset, row + offset}:
+                if not 0 <= current_row < len(self.rows) or not self.rows[current_row]:
+                    continue
+                columns = self.rows[current_row]
+                index = bisect.bisect_left(columns, column)
+                for neighbour in columns[max(index - 1, 0):index + 1]:
+                    distance = offset + abs(neighbour - column)
+                    if best is None or distance < best:
+                        best = distance
+        return best
+
 
 class GPac():
     """ GPac class. Defines functionality for the Pac-Man Game logic."""
@@ -48,10 +112,10 @@ class GPac():
     def __init__(self, filename, pill_chance, fruit_chance, fruit_score, time_multiplier):
         # pylint: disable=too-many-arguments
         width, height, board = self._parse_map(filename)
-        self.world_contents = f'{width}\n{height}\n'
+        self.world_contents = self._create_world_log(width, height)
         self.width = width    # x
         self.height = height  # y
-        self.board = board
+        self.board = self._create_board(board)
 
         self.chances = {}
         self.chances['pill'] = pill_chance
@@ -63,6 +127,7 @@ class GPac():
         self.locations[PACMAN] = self._place_pacman()
         self.locations = {**self.locations, **self._place_ghosts()}
         self.locations[WALL] = self._read_walls()
+        self.pill_index = PillIndex(height)
         self.locations[PILL] = self._place_pills()
         self.locations[FRUIT] = self._place_fruit()
 
@@ -100,6 +165,16 @@ class GPac():
                     # redundant but allows walls to be logged
         return walls
 
+    @staticmethod
+    def _create_board(board):
+        """ Returns the storage used for the game board. """
+        return board
+
+    @staticmethod
+    def _create_world_log(width, height):
+        """ Returns the buffer the world file is logged into. """
+        return f'{width}\n{height}\n'
+
     def turn(self):
         """ Handles a "turn". Pac-Man and Ghosts move.
         If Pac-Man collides with ghosts game ends.
@@ -181,6 +256,7 @@ class GPac():
                         if rng <= self.chances['pill']:
                             self._place([row_count, column_count], PILL)
                             pills.append([row_count, column_count])
+                            self.pill_index.add([row_count, column_count])
                             pill_count += 1
 
         # has to have at least one pill
@@ -196,6 +272,7 @@ class GPac():
 
                     self._place([rand_row, rand_column], PILL)
                     pills.append([rand_row, rand_column])
+                    self.pill_index.add([rand_row, rand_column])
                     break
 
         return pills
@@ -295,6 +372,7 @@ class GPac():
         if self.board[loc[0]][loc[1]] == PILL:
             self.consumed['pill'] += 1
             self.locations[PILL].remove(loc)
+            self.pill_index.remove(loc)
             self._remove(loc)
             return PILL_COLLISION
 
@@ -382,6 +460,14 @@ class GPac():
     #########################   Utilities    ##########################
     ###################################################################
 
+    def cell_at(self, location):
+        """ Returns the unit type stored on the board at location. """
+        return self.board[location[0]][location[1]]
+
+    def get_rows(self):
+        """ Returns the board as a tuple of rows so that it can be hashed. """
+        return tuple(tuple(row) for row in self.board)
+
     @staticmethod
     def neg_index_to_positive(value, max_val):
         """ Converts negative index value to positive"""
@@ -466,7 +552,7 @@ class GPac():
         print(f"GPac by Jordan Sosnowski \t{self.time - self.time_elapsed}")
         print('-' * (self.width + 1))
 
-        board = copy.deepcopy(self.board)
+        board = [list(row) for row in self.get_rows()]
         pacman_loc = self.locations[PACMAN]
         board[pacman_loc[0]][pacman_loc[1]] = PACMAN
 
@@ -509,3 +595,285 @@ class GPac():
         current_score = self._calculate_score()
         self._log_world('t', str(self.time - self.time_elapsed), str(current_score))
         self.time_elapsed += 1
+
+
+class WorldLog:
+    """ Append only buffer for world file contents.
+
+    Lines are kept in a list and only joined when the contents are requested,
+    so logging stays linear in the length of the game.
+    """
+
+    def __init__(self, header=''):
+        self.lines = [header]
+
+    def append(self, line):
+        """ Adds a line to the end of the log. """
+        self.lines.append(line)
+
+    def __str__(self):
+        if len(self.lines) > 1:
+            self.lines = [''.join(self.lines)]
+        return self.lines[0]
+
+
+class ArrayGPac(GPac):
+    """ GPac engine backed by a flat bytearray of cell codes.
+
+    Unit locations are stored as tuples, pills are stored in a set and the world
+    file is logged into a WorldLog. Game rules are inherited from GPac, so both
+    engines play the exact same game for the same random seed.
+    """
+
+    ###################################################################
+    #######################     Core    ###############################
+    ###################################################################
+
+    @staticmethod
+    def _create_board(board):
+        """ Encodes the parsed board row by row into a bytearray. """
+        return bytearray(CELL_CODES[cell] for row in board for cell in row)
+
+    @staticmethod
+    def _create_world_log(width, height):
+        """ Returns a WorldLog so that logging does not copy the world contents. """
+        return WorldLog(f'{width}\n{height}\n')
+
+    def _read_walls(self):
+        """ Adds walls to log file """
+
+        walls = []
+        for index, code in enumerate(self.board):
+            if code == WALL_CODE:
+                location = divmod(index, self.width)
+                walls.append(location)
+                self._place(location, WALL)
+        return walls
+
+    ###################################################################
+    #####################     Placement    ############################
+    ###################################################################
+
+    def _place_pacman(self):
+        """ Places pacman. Returns location to be added to location dict"""
+
+        self._place((0, 0), PACMAN)
+        return (0, 0)
+
+    def _place_ghosts(self):
+        """ Place ghosts on board. Returns dict to be merged with locations """
+
+        locations = {}
+        for ghost in GHOST:
+            location = (self.height - 1, self.width - 1)
+            locations[ghost] = location
+            self._place(location, ghost)
+        return locations
+
+    def _place_pills(self):
+        """ Places pills in empty cells based on pill_chance value.
+
+        Random numbers are drawn in the same order as GPac._place_pills.
+        """
+        if self.chances['pill'] > 1:
+            raise MyException(
+                "Error: Pill Chance should be in the range [0,1]")
+
+        pills = set()
+        walls = self.board.count(WALL_CODE)
+        total_pills = math.floor(self.chances['pill'] * (len(self.board) - 1 - walls))
+
+        pill_count = 0
+        while pill_count != total_pills:
+            for index, code in enumerate(self.board):
+                if pill_count == total_pills:
+                    break
+                # index 0 is Pac-Man's starting cell
+                if code != WALL_CODE and code != PILL_CODE and index:
+                    rng = random.random()
+                    if rng <= self.chances['pill']:
+                        location = divmod(index, self.width)
+                        self._place(location, PILL)
+                        pills.add(location)
+                        self.pill_index.add(location)
+                        pill_count += 1
+
+        # has to have at least one pill
+        while not pills:
+            rand_row = random.randint(0, self.height - 1)
+            rand_column = random.randint(0, self.width - 1)
+
+            if self.board[rand_row * self.width + rand_column] == EMPTY_CODE and \
+                    not (rand_row == 0 and rand_column == 0):
+                self._place((rand_row, rand_column), PILL)
+                pills.add((rand_row, rand_column))
+                self.pill_index.add((rand_row, rand_column))
+
+        return pills
+
+    def _place_fruit(self):
+        """ Place fruit on board based on chance value. If fruit already
+        exists do not place anything as only one fruit can be on the board at a time. """
+
+        if self.chances['fruit'] > 1:
+            raise MyException(
+                "Error: Fruit Chance should be in the range [0,1]")
+
+        # check if board has fruit
+        if self.locations.get(FRUIT, None):
+            return self.locations.get(FRUIT)
+
+        rng = random.random()
+        if rng <= self.chances['fruit']:
+            # loop until a location that is free is found
+            while True:
+                rand_row = random.randint(0, self.height - 1)
+                rand_column = random.randint(0, self.width - 1)
+
+                if self.board[rand_row * self.width + rand_column] == EMPTY_CODE:
+                    self._place((rand_row, rand_column), FRUIT)
+                    return (rand_row, rand_column)
+        return None
+
+    ###################################################################
+    #####################   Unit Interaction    #######################
+    ###################################################################
+
+    def _remove(self, location):
+        """ Removes a unit from the board. """
+        self.board[location[0] * self.width + location[1]] = EMPTY_CODE
+
+    def _place(self, location, unit_type, log=True):
+        """ Places unit on board and log to file.
+
+        location - unit's location
+        unit_type - unit type (i.e. for pacman it would be 'p'
+        """
+        if unit_type == PILL or unit_type == FRUIT:
+            self.board[location[0] * self.width + location[1]] = CELL_CODES[unit_type]
+
+        if log:
+            x_loc, y_loc = self._convert_coordinates(location)
+            self._log_world(unit_type, str(x_loc), str(y_loc))
+
+    def _pacman_collision(self):
+        """ handles pacman collisions """
+
+        loc = self.locations[PACMAN]
+        for ghost in GHOST:
+            if loc == self.locations[ghost]:
+                return GHOST_COLLISION  # GAMEOVER
+
+        # collides with pill
+        if self.board[loc[0] * self.width + loc[1]] == PILL_CODE:
+            self.consumed['pill'] += 1
+            self.locations[PILL].discard(loc)
+            self.pill_index.remove(loc)
+            self._remove(loc)
+            return PILL_COLLISION
+
+        # collides with fruit
+        if self.locations[FRUIT] == loc:
+            self.consumed['fruit'] += 1
+            self.locations[FRUIT] = ()
+            self._remove(loc)
+            return FRUIT_COLLISION
+
+        return NO_COLLISION
+
+    def get_all_spots_around_cell(self, cell):
+        """ Gets all spots around the passed cell.
+
+        Does not look at any game logic just gets the raw cells around a cell.
+        """
+
+        row, column = cell
+        possible_spots = ((row + 1, column), (row, column + 1),
+                          (row - 1, column), (row, column - 1), (row, column))
+        return [spot for spot in possible_spots
+                if 0 <= spot[0] < self.height and 0 <= spot[1] < self.width]
+
+    def get_spots_around_unit(self, unit_type):
+        """ Gets all legal spots around the passed cell.
+
+        For instance ghosts cannot move through ghosts so there is
+        special logic for that unit.
+        """
+
+        cell = self.locations[unit_type]
+        final_spots = []
+        for spot in self.get_all_spots_around_cell(cell):
+            if unit_type in GHOST and cell == spot:
+                continue
+            if self.board[spot[0] * self.width + spot[1]] == WALL_CODE:
+                continue
+            final_spots.append(spot)
+
+        return final_spots
+
+    ###################################################################
+    #########################   Utilities    ##########################
+    ###################################################################
+
+    def cell_at(self, location):
+        """ Returns the unit type stored on the board at location. """
+        return CELL_TYPES[self.board[location[0] * self.width + location[1]]]
+
+    def get_rows(self):
+        """ Returns the board as a tuple of rows so that it can be hashed. """
+        return tuple(tuple(CELL_TYPES[code] for code in self.board[row:row + self.width])
+                     for row in range(0, len(self.board), self.width))
+
+    def cardinal_to_location(self, direction, current_position, unit_type):
+        """ Translates cardinal direction to location
+
+        Locations wrap around the board the same way GPac's logging does.
+
+        direction - cardinal direction
+        current_position - current location of unit
+        unit_type - type of unit in question
+        """
+        # pylint: disable=unused-argument,arguments-differ
+
+        row_offset, column_offset = OFFSETS.get(direction, (0, 0))
+        return ((current_position[0] + row_offset) % self.height,
+                (current_position[1] + column_offset) % self.width)
+
+    def _convert_coordinates(self, coordinates):
+        """ Converts input coordinates as if the origin of the board was bottom left """
+        return coordinates[1], self.height - coordinates[0] - 1
+
+    ###################################################################
+    ##########################   Log    ###############################
+    ###################################################################
+
+    def _log_world(self, log_type, *args):
+        """ Logs info to buffer with the following format:
+        log_type args[0] args[1] ... args[n]
+
+        log_type: type of unit being logged
+        args: list of args to log related to the log_type
+        """
+
+        log_type = log_type.replace('#', 'w')
+        self.world_contents.append(' '.join([log_type, *args, '\n']))
+
+
+
+@contextlib.contextmanager
+def seeded_random(seed):
+    """ Seeds the random generator games draw from with seed for the body of a with
+    statement. Its previous state is restored afterwards, so playing a game doesn't
+    change the random stream of the caller.
+    """
+
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+
+# game engines selectable from the solver config
+ENGINES = {'list': GPac, 'array': ArrayGPac}
@@ -7,13 +7,34 @@ from pathlib import Path
 import random
 import glob
 import copy
+import hashlib
 import tqdm
 import gpac
 import node
 import individual
+import run_history
 import multiprocessing
 
-Solution = collections.namedtuple('solution', 'fitness contents weights')
+# typename matches the module attribute so that solutions can be pickled
+Solution = collections.namedtuple('Solution', 'fitness contents weights')
+
+# solver used by run workers, set once per worker by _init_worker
+_worker_solver = None
+
+
+def _init_worker(solver):
+    """ Pool initializer. Stores the solver so tasks only need to carry the run number. """
+
+    global _worker_solver  # pylint: disable=global-statement
+    _worker_solver = solver
+    # pool workers cannot start pools of their own
+    _worker_solver.parallel_evaluation = False
+
+
+def _evolve_run(run):
+    """ Evolves a whole run with the worker's solver. Runs inside pool workers. """
+
+    return _worker_solver.evolve_run(run)
 
 
 class Solver():
@@ -62,6 +83,8 @@ class Solver():
             self.seed = config.get('seed')
 
             self.log_file = config.get('log_file')
+            # optional columnar .npy file with the statistics of every logged generation
+            self.history_file = config.get('history_file')
             self.solution_file = config.get('solution_file')
             self.highest_score_file = config.get('highest_score_file')
 
@@ -69,11 +92,16 @@ class Solver():
             self.max_evaluations = config.get('max_evaluations')
 
             self.algorithm = config.get('algorithm')
+            self.engine = config.get('engine', 'list')
             self.game_instance = None
 
             self.top_x_percent = config.get('top_x_percent')
             self.maps = None
             self.run_times = []
+
+            # number of processes whole runs are spread over
+            self.run_workers = config.get('run_workers', 1)
+            self.parallel_evaluation = True
             if self.algorithm != 'random':
                 # GP
                 self.children = config.get('children')  # λ
@@ -112,76 +140,94 @@ class Solver():
     def _genetic_programming(self):
 
         runs = []
-
         max_individual_of_experiment = None
-        past_evals_with_no_change = 0
+
+        if self.run_workers > 1:
+            pool = multiprocessing.Pool(self.run_workers, initializer=_init_worker,
+                                        initargs=(self,))
+            results = pool.imap(_evolve_run, range(self.max_runs))
+        else:
+            pool = None
+            results = (self.evolve_run(run) for run in range(self.max_runs))
 
         # setup progress bar for runs if correct parameter is passed
         if self.show_progress_bar:
-            run_range = tqdm.tqdm(range(self.max_runs), "Run", position=0)
-        else:
-            run_range = range(self.max_runs)
+            results = tqdm.tqdm(results, "Run", total=self.max_runs, position=0)
 
-        for _ in run_range:
+        for evaluations, max_individual_of_run, run_time in results:
+            runs.append(evaluations)
+            self.run_times.append(run_time)
 
-            start_time = time.time()
-            population = self._create_initial_population()
-            eval_counter = len(population)
-            max_individual_of_generation = max(population)
-            if max_individual_of_experiment is None:
-                max_individual_of_experiment = max_individual_of_generation
+            if max_individual_of_experiment is None or \
+                    max_individual_of_run > max_individual_of_experiment:
+                max_individual_of_experiment = max_individual_of_run
 
-            max_individual_of_run = max_individual_of_generation
+        if pool:
+            pool.close()
+            pool.join()
 
-            keep_going = True
-            evaluations = collections.OrderedDict()
-            evaluations[eval_counter] = population
+        self._log_results(runs)
+        if self.history_file:
+            self._log_history(runs)
+        self._log_world(max_individual_of_experiment.contents)
+        self._log_solution(max_individual_of_experiment.head_node.parse_tree())
 
-            # setup progress bar for evaluations if correct parameter is passed
-            if self.show_progress_bar:
-                eval_range = tqdm.tqdm(range(0, self.max_evaluations, self.children),
-                                       "Evaluations", position=1, leave=False)
-            else:
-                eval_range = range(0, self.max_evaluations, self.children)
+    def evolve_run(self, run):
+        """ Evolves a single run. The run is seeded with a seed derived from the config
+        seed, so it evolves the same way no matter which process runs it.
 
-            for _ in eval_range:
-                if keep_going is False:
-                    break
+        Returns a run_history.Generation row for every logged population, the run's best
+        individual and its run time.
+        """
 
-                # parent selection
-                parents = self.parent_selection(population)
+        random.seed(self._derive_seed(run))
+        past_evals_with_no_change = 0
 
-                # recombination and mutation
-                children = self.child_selection(parents)
-                eval_counter += len(children)
+        start_time = time.time()
+        population = self._create_initial_population()
+        eval_counter = len(population)
+        max_individual_of_run = max(population)
 
-                population += children
+        keep_going = True
+        evaluations = [run_history.summarize(eval_counter, population)]
 
-                # survival
-                population = self.survival_selection(population)
+        # setup progress bar for evaluations if correct parameter is passed
+        if self.show_progress_bar and self.run_workers <= 1:
+            eval_range = tqdm.tqdm(range(0, self.max_evaluations, self.children),
+                                   "Evaluations", position=1, leave=False)
+        else:
+            eval_range = range(0, self.max_evaluations, self.children)
 
-                # update max individual of generation
-                evaluations[eval_counter] = population
+        for _ in eval_range:
+            if keep_going is False:
+                break
 
-                max_population = max(population)
-                if max_population > max_individual_of_run:
-                    past_evals_with_no_change = 0
-                    max_individual_of_run = max_population
-                else:
-                    past_evals_with_no_change += len(children)
+            # parent selection
+            parents = self.parent_selection(population)
 
-                # check termination criteria
-                keep_going = self.termination_selection(eval_counter, past_evals_with_no_change)
+            # recombination and mutation
+            children = self.child_selection(parents)
+            eval_counter += len(children)
 
-            runs.append(evaluations)
-            self.run_times.append(time.time() - start_time)
+            population += children
 
-            if max_individual_of_run > max_individual_of_experiment:
-                max_individual_of_experiment = max_individual_of_run
+            # survival
+            population = self.survival_selection(population)
 
-        self._log_results(runs)
-        self._log_world(max_individual_of_experiment.contents)
-        self._log_solution(max_individual_of_experiment.head_node.parse_tree())
+            # update max individual of generation
+            evaluations.append(run_history.summarize(eval_counter, population))
+
+            max_population = max(population)
+            if max_population > max_individual_of_run:
+                past_evals_with_no_change = 0
+                max_individual_of_run = max_population
+            else:
+                past_evals_with_no_change += len(children)
+
+            # check termination criteria
+            keep_going = self.termination_selection(eval_counter, past_evals_with_no_change)
+
+        return evaluations, max_individual_of_run, time.time() - start_time
 
     def _create_game(self):
         """ Loads class variable with game instance.
@@ -189,9 +235,9 @@ class Solver():
         Game instance should be created per run.
         """
         map_filepath = random.choice(self.maps)
-        self.game_instance = gpac.GPac(map_filepath, self.pill_density,
-                                       self.fruit_spawn_probability, self.fruit_score,
-                                       self.time_multiplier)
+        self.game_instance = gpac.ENGINES[self.engine](map_filepath, self.pill_density,
+                                                       self.fruit_spawn_probability,
+                                                       self.fruit_score, self.time_multiplier)
 
     ###########################################################################
     #######################  Algorithm Selection ##############################
@@ -365,11 +411,25 @@ class Solver():
         return self.create_individuals(population)
 
     def create_individuals(self, population):
-        out = []
+        """ Plays a game for every tree of population. Returns the individuals in the
+        order of population.
+
+        Every game is seeded with a number drawn from the run's random stream, so the
+        individuals don't depend on which process plays a game or when it finishes.
+        """
+
+        tasks = [(head, random.getrandbits(32)) for head in population]
+        if not self.parallel_evaluation:
+            return [self._evaluate(task) for task in tasks]
         with multiprocessing.Pool() as pool:
-            for i, res in enumerate(pool.imap_unordered(self.calculate_fitness, population)):
-                out.append(res)
-        return out
+            return list(pool.imap(self._evaluate, tasks))
+
+    def _evaluate(self, task):
+        """ Plays a (tree, game seed) task without touching the caller's random stream. """
+
+        head, game_seed = task
+        with gpac.seeded_random(game_seed):
+            return self.calculate_fitness(head)
 
     def calculate_fitness(self, head):
         """ Creates a game instance with a random map picked from the maps variable.
@@ -381,6 +441,8 @@ class Solver():
         self._create_game()
         while not self.game_instance.is_gameover:
             current_score, contents = self._turn(head)
+        # array engine hands back a WorldLog buffer
+        contents = str(contents)
 
         if self.parsimony_type == "total":
             count = head.get_total_nodes()
@@ -448,25 +510,7 @@ class Solver():
 
     def _closest_pill(self, cell):
         """ Calculate manhattan distance for closest pill to Pac-Man. """
-        min_distance = 0
-        seen = [cell]
-        possible_locations = [cell]
-        found = False
-        while not found:
-            current = possible_locations.pop()
-
-            if self.game_instance.board[current[0]][current[1]] == gpac.PILL:
-                found = True
-                min_distance = self._calculate_manhattan_distance(cell, current)
-                break
-
-            locations = self.game_instance.get_all_spots_around_cell(current)
-            for location in locations:
-                if location not in seen:
-                    seen.append(location)
-                    possible_locations.append(location)
-
-        return min_distance
+        return self.game_instance.pill_index.nearest(cell)
 
     def _closest_fruit(self, cell):
         """ Calculate manhattan distance for closest fruit to pacman.
@@ -486,7 +530,7 @@ class Solver():
         num_of_walls = 0
 
         for loc in locs:
-            if self.game_instance.board[loc[0]][loc[1]] == '#':
+            if self.game_instance.cell_at(loc) == gpac.WALL:
                 num_of_walls += 1
 
         return num_of_walls
@@ -592,8 +636,11 @@ class Solver():
         total_time = sum(self.run_times)
         outputs = 'Configuration Information\n\n'
         outputs += f'\tSolution File Path: {self.solution_file}\n'
+        if self.history_file:
+            outputs += f'\tHistory file: {self.history_file}\n'
         outputs += f'\tSeed: {self.seed}\n'
         outputs += f'\tNumber of runs: {self.max_runs}\n'
+        outputs += f'\tRun workers: {self.run_workers}\n'
         outputs += f'\tNumber of evaluation: {self.max_evaluations}\n'
         outputs += f'\tPill density: {self.pill_density}\n'
         outputs += f'\tFruit spawn chance: {self.fruit_spawn_probability}\n'
@@ -617,18 +664,26 @@ class Solver():
             for count, run_info in enumerate(runs):
                 file.write(f"Run {count+1}\n")
 
-                for evals, population in run_info.items():
-                    best_individual = sorted(population, key=lambda x: x.score, reverse=True)[0]
-
-                    pop_sum = sum([pop.score for pop in population])
-                    avg_fitness = round(pop_sum / len(population), 2)
-                    file.write(f"\t{evals}\t{avg_fitness}\t{best_individual.score}\n")
+                for row in run_info:
+                    file.write(f"\t{row.evals}\t{run_history.average(row)}\t{row.best_score}\n")
                 file.write("\n")
 
+    def _log_history(self, runs):
+        """ Log the statistics of every logged population to the columnar history file. """
+
+        self._create_path(self.history_file)
+        run_history.save(self.history_file, runs)
+
     ###################################################################
     ####################     Utilities    #############################
     ###################################################################
 
+    def _derive_seed(self, *labels):
+        """ Derives a seed from the config seed and labels such as a run number. """
+
+        digest = hashlib.sha1(':'.join(map(str, (self.seed, *labels))).encode()).hexdigest()
+        return int(digest[:8], 16)
+
     def _set_seed(self):
         """Sets random seed value based on object seed variable."""
 
@@ -211,3 +211,50 @@ def test_score_calculation_all_pills_no_time():
     instance.consumed['pill'] = 142
     instance.time_elapsed = instance.time
     assert instance._calculate_score() == 100
+
+
+def test_pill_index_matches_pills():
+    instance = gpac.GPac('maps/map0.txt', .5, 0, 0, 10)
+    pills = instance.locations[gpac.PILL]
+    assert instance.pill_index.count == len(pills)
+
+    for cell in [[0, 0], [19, 34], [10, 17]]:
+        expected = min(abs(cell[0] - pill[0]) + abs(cell[1] - pill[1]) for pill in pills)
+        assert instance.pill_index.nearest(cell) == expected
+
+
+def test_array_engine_parse_board():
+    instance = gpac.ArrayGPac('maps/map0.txt', .5, 0, 0, 2)
+    _, _, board = gpac.GPac._parse_map('maps/map0.txt')
+    assert len(instance.board) == 35 * 20
+    assert instance.cell_at((1, 1)) == gpac.WALL
+    assert instance.cell_at((0, 0)) == gpac.EMPTY_CELL
+    rows = [[gpac.EMPTY_CELL if cell == gpac.PILL else cell for cell in row]
+            for row in instance.get_rows()]
+    assert rows == board
+
+
+def test_array_engine_matches_list_engine():
+    games = []
+    for engine in (gpac.GPac, gpac.ArrayGPac):
+        random.seed(7)
+        instance = engine('maps/map0.txt', .5, .1, 10, 2)
+        while not instance.is_gameover:
+            for unit in [gpac.PACMAN, *gpac.GHOST]:
+                instance.move(random.choice(instance.get_moves_for_unit(unit)), unit)
+            score, contents = instance.turn()
+        games.append((score, str(contents), instance.consumed))
+    assert games[0] == games[1]
+
+
+def test_array_engine_pill_collision():
+    instance = gpac.ArrayGPac('maps/map0.txt', 0, 0, 0, 10)
+    instance._place((1, 0), gpac.PILL)
+    instance.locations[gpac.PILL].add((1, 0))
+    instance.pill_index.add((1, 0))
+
+    instance.move(gpac.DOWN, gpac.PACMAN)
+    assert instance.consumed['pill'] == 1
+    assert (1, 0) not in instance.locations[gpac.PILL]
+    assert instance.cell_at((1, 0)) == gpac.EMPTY_CELL
+    assert instance.pill_index.nearest((1, 0)) != 0
@@ -0,0 +1,35 @@
+import numpy
+import individual
+import run_history
+
+
+def make_population(scores):
+    return [individual.Individual(score, score, None, None) for score in scores]
+
+
+def test_summarize():
+    row = run_history.summarize(10, make_population([1, 4, 7]))
+    assert row == run_history.Generation(10, 3, 12, 7)
+    assert run_history.average(row) == 4
+
+
+def test_save(tmp_path):
+    runs = [[run_history.Generation(4, 2, 3, 2), run_history.Generation(8, 2, 5, 4)],
+            [run_history.Generation(4, 2, 1, 1)]]
+    run_history.save(tmp_path / 'history.npy', runs)
+
+    history = run_history.load(tmp_path / 'history.npy')
+    assert isinstance(history, numpy.memmap)
+    assert history['evals'].flags['C_CONTIGUOUS']
+    assert list(history['run']) == [0, 0, 1]
+    assert list(history['evals']) == [4, 8, 4]
+    assert list(history['average']) == [1.5, 2.5, 0.5]
+    assert list(history['best']) == [2, 4, 1]
+
+
+def test_save_rounds_average(tmp_path):
+    row = run_history.Generation(4, 3, 10, 5)
+    run_history.save(tmp_path / 'history.npy', [[row]])
+
+    history = run_history.load(tmp_path / 'history.npy')
+    assert list(history['average']) == [run_history.average(row)] == [3.33]
@@ -2,6 +2,7 @@ import random
 import node
 import solver
 import gpac
+import run_history
 
 
 def test_solver_init():
@@ -216,3 +217,82 @@ def test_mutate():
     assert child.children[1].children[1].data == 'P'
     assert child.children[1].children[0].children[0].data == 1
     assert child.children[1].children[0].children[1].data == 2
+
+
+def test_parallel_runs_match_serial(tmp_path):
+    logs = []
+    for run_workers in (1, 2):
+        instance = solver.Solver('config/test_run_config.json')
+        instance.seed = 4
+        instance.max_runs = 3
+        instance.max_evaluations = 4
+        instance.children = 2
+        instance.parents = 4
+        instance.time_multiplier = 1
+        # one worker keeps the default pooled evaluation, run workers evaluate in process
+        instance.run_workers = run_workers
+        instance.log_file = str(tmp_path / f'{run_workers}.log')
+        instance.history_file = str(tmp_path / f'{run_workers}.npy')
+        instance.solution_file = str(tmp_path / 'solution.txt')
+        instance.highest_score_file = str(tmp_path / 'world.txt')
+        instance.run()
+
+        with open(instance.log_file) as file:
+            logs.append(file.read().split('Run 1\n')[1])
+    assert logs[0] == logs[1]
+    assert logs[0].count('Run ') == 2
+
+    history = run_history.load(instance.history_file)
+    assert list(history['run']) == [0, 0, 1, 1, 2, 2]
+    assert list(history['evals']) == [4, 6] * 3
+
+
+def test_evolve_run_summarizes_generations():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 4
+    instance.max_evaluations = 10
+    instance.children = 2
+    instance.parents = 4
+    instance.time_multiplier = 1
+    instance.parallel_evaluation = False
+    instance.maps = ['maps/map0.txt']
+
+    evaluations, best, _ = instance.evolve_run(0)
+
+    assert [row.evals for row in evaluations] == [4, 6, 8, 10]
+    # rows are taken before the next generation's children join the population
+    assert all(row.size == 4 for row in evaluations)
+    assert best.score == max(row.best_score for row in evaluations)
+
+
+def test_calculate_fitness_array_engine():
+    results = []
+    for engine in ('list', 'array'):
+        instance = solver.Solver('config/test_run_config.json')
+        instance.engine = engine
+        instance.time_multiplier = 1
+        instance.maps = ['maps/map0.txt']
+        random.seed(3)
+        head = node.Node(tree_type='full', max_depth=2)
+        head.grow()
+        solution = instance.calculate_fitness(head)
+        results.append((solution.score, solution.fitness, solution.contents))
+    assert results[0] == results[1]
+    assert isinstance(results[1][2], str)
+
+
+def test_pooled_evaluation_matches_in_process():
+    results = []
+    for parallel_evaluation in (True, False):
+        instance = solver.Solver('config/test_run_config.json')
+        instance.seed = 4
+        instance.max_evaluations = 8
+        instance.children = 2
+        instance.parents = 4
+        instance.time_multiplier = 1
+        instance.parallel_evaluation = parallel_evaluation
+        instance.maps = ['maps/map0.txt', 'maps/map1.txt']
+
+        evaluations, best, _ = instance.evolve_run(0)
+        results.append((evaluations, best.name, best.fitness, best.contents))
+    assert results[0] == results[1]
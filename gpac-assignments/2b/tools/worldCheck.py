@@ -2,7 +2,7 @@
 
 # author: Deacon Seals
 
-# use: python3 worldCheck.py worldFilePath0 worldFilePath1 ... worldFilePathN
+# use: python3 worldCheck.py [--jobs N] worldFilePath0 worldFilePath1 ... worldFilePathN
 # use note: Bash regex filename expressions supported
 
 '''
@@ -14,11 +14,18 @@ Basic checks performed:
 *starting location of pac-man and ghosts
 *collision detection
 *basic bounds checking
+
+Files are checked in a single pass while they are read, so long world logs are never held
+in memory. With --jobs N, N files are checked at once.
 '''
 
 import sys
+import argparse
+import multiprocessing
 
-softErrors = []
+validPieces = {"m","1","2","3","f","t","p","w"}
+objects = validPieces - {"t"}
+moving = objects - {"f","p","w"}
 
 class FormattingError(Exception):
 	def __init__(self, errors):
@@ -37,398 +44,385 @@ def printLines(lines):
 			message += ", "+repr(lines[i]+1)
 	return message
 
-'''
-desc:	Checks for any invalid characters in the document and squawks if it finds anything.
+def isInteger(text):
+	return text.isdigit() and '.' not in text
 
-pre:	Input `text` is a list of strings.
-'''
-def checkCharacters(text):
-	errors = []
-	errata = dict()
-	for line in range(len(text)):
-		for char in text[line]:
-			if char.casefold() not in "mpwft0123456789 ":
-				if char not in errata: # we found an illegal character
-					errata[char] = set()
-				errata[char].add(line)
-
-	# form error messages
-	if errata:
-		for char in errata:
-			lines = list(errata[char])
-			message = "invalid character "+repr(char)+" found on "
-			
-			if len(lines) > 1:
-				lines.sort()
-			message += printLines(lines)
-			errors.append(message)
+def manhattanDistance(location0, location1):
+	return abs(location0[0]-location1[0]) + abs(location0[1]-location1[1])
 
-	if errors: raise FormattingError(errors)
-	
-	return
 '''
-desc:	Checks for formatting issues including: proper space delineation, correct
-		number of elements per line, existance of height and width, correct per-line format.
+desc:	Checks a world file one line at a time. Characters, structure and content are checked
+		as each line is fed in and only the game state is kept. Errors are reported in the
+		order of the checks: characters, structure, dimensions and capitalization, starting
+		positions and then content. Only the first group of checks that failed is reported.
 
-pre:	Input `text` is a list of strings that has been ran through checkCharacters
-		to catch any invalid characters.
+pre:	Lines are fed in order with trailing whitespace removed.
 '''
-def checkStructure(text):
-	errors = []
-	width = 0
-	height = 0
-	global softErrors
-
-	# iterate over text and ignore tailing blank lines
-	# note: our initial rstrip formatting clears all space-only lines
-	for line in range(len(text)):
-		if text[-(line+1)]:
-			if line > 0:
-				text = text[:-line]
-			break
-	
-	if text:
-		# check width and height
-		if text[0].isdigit() and '.' not in text[0]:
-			width = int(text[0])
+class WorldChecker:
+	def __init__(self):
+		self.lines = 0
+		self.lastLine = -1 # last non-blank line, later blank lines are ignored
+		self.dimensions = []
+		self.width = 0
+		self.height = 0
+
+		# character and structure errors
+		self.characters = dict()
+		self.blankLines = []
+		self.pendingBlanks = []
+		self.noDelineation = []
+		self.tooManySpaces = []
+		self.tooFewElements = []
+		self.tooManyElements = []
+		self.wrongFormat = []
+
+		# content errors
+		self.capitals = []
+		self.startErrors = []
+		self.errors = []
+		self.errata = dict()
+		self.critical = False
+		self.criticalLine = None
+
+		# game state
+		self.declarations = True
+		self.walls = dict() # location: line of the declaration
+		self.pills = dict() # location: line of the declaration
+		self.fruit = set()
+		self.starts = dict()
+		self.movingLocations = {"m":[]} # support multiple pac-people
+		self.time = 0
+		self.score = 0
+
+	def feed(self, text):
+		line = self.lines
+		self.lines += 1
+
+		for char in text:
+			if char.casefold() not in "mpwft0123456789 ":
+				if char not in self.characters: # we found an illegal character
+					self.characters[char] = []
+				self.characters[char].append(line)
+
+		if text:
+			self.lastLine = line
+
+		# width and height are checked once tailing blank lines are known
+		if line < 2:
+			self.dimensions.append(text)
+			if isInteger(text):
+				if line == 0:
+					self.width = int(text)
+				else:
+					self.height = int(text)
+			return
+
+		if not text:
+			self.pendingBlanks.append(line)
+			return
+		self.blankLines += self.pendingBlanks
+		self.pendingBlanks = []
+
+		segmented = self.checkStructure(line, text)
+		if segmented and not self.characters:
+			self.checkContent(line, segmented[0], (int(segmented[1]), int(segmented[2])))
+
+	'''
+	desc:	Checks for proper space delineation, correct number of elements and the
+			'indicator integer integer' format. Returns the elements of a valid line.
+	'''
+	def checkStructure(self, line, text):
+		spaces = text.count(" ")
+		if spaces == 0:
+			self.noDelineation.append(line)
+			return None
+
+		# segment line and ignore blank elements caused by extra spaces
+		segmented = [element for element in text.split(" ") if element]
+		if len(segmented) > 3: # more elements than expected
+			self.tooManyElements.append(line)
+			return None
+		if spaces > 2:
+			self.tooManySpaces.append(line)
+		if len(segmented) < 3: # could be too few elements or line of just spaces
+			self.tooFewElements.append(line)
+		elif not isInteger(segmented[1]) or not isInteger(segmented[2]):
+			self.wrongFormat.append(line)
+		elif spaces <= 2:
+			return segmented
+		return None
+
+	def interrupt(self, line, message):
+		self.errors.append(message)
+		self.errors.append("PARSING INTERRUPTED due to critical error on line "+repr(line+1))
+		self.critical = True
+		self.criticalLine = line
+
+	'''
+	desc:	Checks the first appearance of pac-man or a ghost against its expected starting
+			location and against the walls and pills declared before it.
+	'''
+	def startPlayer(self, piece, location):
+		if piece == "m":
+			message = "pac-man"
+			expectedStart = (0, self.height-1)
+			self.movingLocations[piece].append(location)
 		else:
-			errors.append("invalid width")
-		if len(text) > 1:
-			if text[1].isdigit() and '.' not in text[1]:
-				height = int(text[1])
-			else:
-				errors.append("invalid height")
-
-		blankLines = []
-		noDelineation = set()
-		tooManySpaces = set()
-		tooFewElements = []
-		tooManyElements = []
-		wrongFormat = []
-
-		# iterate over all lines in the text after the height and width declarations
-		for line in range(2,len(text)):
-			if text[line]:
-				# check for correct number of space delineation characters
-				if text[line].count(" ") == 0:
-					noDelineation.add(line)
-				elif text[line].count(" ") > 2:
-					tooManySpaces.add(line)
-
-				# try to split string since spaces exist
-				if text[line].count(" ") > 0:
-					# segment line and ignore blank elements caused by extra spaces
-					segmented = [element for element in text[line].split(" ") if element]
-					
-					# check number of elements in segmented line
-					if len(segmented) < 3: # could be too few elements or line of just spaces
-						tooFewElements.append(line)
-					elif len(segmented) > 3: # more elements than expected
-						tooManyElements.append(line)
-						tooManySpaces.discard(line) # actually had too many elements instead of too many spaces
-					else:
-						# check for two integer values in elements 1 and 2
-						if not(segmented[1].isdigit() and '.' not in segmented[1]) or \
-						not(segmented[2].isdigit() and '.' not in segmented[2]):
-							wrongFormat.append(line) 
+			message = "ghost "+piece
+			expectedStart = (self.width-1, 0)
+			self.movingLocations[piece] = [location]
+		self.starts[piece] = location
+
+		if location != expectedStart: # unexpected starting location
+			self.startErrors.append("expected "+message+" starting location of "+repr(expectedStart)+" but got "+repr(location))
+
+		# walls and pills declared before a critical error were still checked
+		if location in self.walls and not self.critical: # a wall spawned on someone
+			wall = self.walls[location]
+			self.interrupt(wall, "wall spawned onto a player at location "+repr(location)+" on line "+repr(wall+1))
+		elif piece == "m" and location in self.pills and (not self.critical or self.pills[location] < self.criticalLine): # a pill spawned on pac-man
+			self.errors.append("pill spawned onto a player at location "+repr(location)+" on line "+repr(self.pills[location]+1))
+
+	'''
+	desc:	Checks collisions, invalid declarations after start of game, and out-of-bounds
+			movement and placement for one line.
+	'''
+	def checkContent(self, line, piece, location):
+		# check for errors relating to character capitalization
+		if piece not in validPieces and piece.casefold() in validPieces:
+			self.capitals.append(piece)
+
+		# starting positions are checked even after a critical error
+		if piece in moving and piece not in self.starts:
+			self.startPlayer(piece, location)
+
+		if self.critical or self.capitals:
+			return
+
+		# check the first element
+		if piece not in validPieces:
+			self.errors.append("invalid first element "+repr(piece)+" on line "+repr(line+1))
+			return
+
+		# check out of bounds placements or movements
+		if piece in objects: # physical objects
+			horizontal = location[0] >= 0 and location[0] < self.width
+			vertical = location[1] >= 0 and location[1] < self.height
+			if not horizontal or not vertical: # went out of bounds
+				message = piece+" went out of bounds "
+				if not horizontal and not vertical: # horizontally and vertically (alarming)
+					message += "horizontally and vertically"
+				elif not horizontal: # horizontally
+					message += "horizontally"
+				else: # vertically
+					message += "vertically"
+				self.interrupt(line, message+" at location "+repr(location)+" on line "+repr(line+1))
+				return
+
+		if piece == "w": # walls
+			if self.declarations and location not in self.walls: # new wall
+				self.walls[location] = line
+			elif not self.declarations and location not in self.walls: # late wall declaration
+				self.interrupt(line, "unexpected wall declaration after game start on line "+repr(line+1))
+				return
+			else: # duplicate wall declaration
+				self.errors.append("wall on line "+repr(line+1)+" is already defined")
+
+			if location in self.pills: # you spawned on a pill
+				self.errors.append("wall spawned onto a pill at location "+repr(location)+" on line "+repr(line+1))
+
+			if any(location in locations for locations in self.movingLocations.values()): # you spawned on someone
+				self.interrupt(line, "wall spawned onto a player at location "+repr(location)+" on line "+repr(line+1))
+
+		elif piece == "p": # pills
+			if self.declarations and location not in self.pills: # new pill
+				self.pills[location] = line
+			elif not self.declarations and location not in self.pills: # late pill declaration
+				self.interrupt(line, "unexpected pill declaration after game start on line "+repr(line+1))
+				return
+			else: # duplicate pill declaration
+				self.errors.append("pill on line "+repr(line+1)+" is already defined")
+
+			if location in self.walls: # you spawned in a wall
+				self.errors.append("pill spawned into a wall at location "+repr(location)+" on line "+repr(line+1))
+
+			if location in self.movingLocations["m"]: # you spawned on pac-man
+				self.errors.append("pill spawned onto a player at location "+repr(location)+" on line "+repr(line+1))
+
+		elif piece in moving: # pac-man and ghosts
+			if piece == "m":
+				message = "pac-man"
+				self.fruit.discard(location)
+				self.pills.pop(location, None)
+
+				# partial support for multiple pac-people
+				for person in range(len(self.movingLocations[piece])):
+					if manhattanDistance(location, self.movingLocations[piece][person]) <= 1: # this has a bug if pac-people are one apart and only one moves (wip)
+						self.movingLocations[piece][person] = location
+						break
+				else: # only executes if the for loop completes without breaking
+					self.interrupt(line, message+" made an invalid move into location "+repr(location)+" on line "+repr(line+1))
+					return
 			else:
-				blankLines.append(line)
+				message = "ghost "+piece
+				if manhattanDistance(location, self.movingLocations[piece][0]) == 1 or self.declarations: # all ghost moves should have a distance of 1
+					self.movingLocations[piece][0] = location
+				else:
+					self.interrupt(line, message+" made an invalid move into location "+repr(location)+" on line "+repr(line+1))
+					return
 
-		# blank lines don't actully break the visualizer, but you shouldn't have them
-		if blankLines:
-			softErrors.append("unexpected blank line found on "+printLines(blankLines))
-
-		# make error messages if we found anything in this portion
-		noDelineation = list(noDelineation)
-		tooManySpaces = list(tooManySpaces)
-
-		if len(noDelineation) > 1:
-			noDelineation.sort()
-		if len(tooManySpaces) > 1:
-			tooManySpaces.sort()
-
-		if noDelineation:
-			errors.append("there is no space delineation on "+printLines(noDelineation))
-		if tooManySpaces:
-			errors.append("there are too many spaces on "+printLines(tooManySpaces))
-		if tooFewElements:
-			errors.append("there are too few elements on "+printLines(tooFewElements))
-		if tooManyElements:
-			errors.append("there are too many elements on "+printLines(tooManyElements))
-		if wrongFormat:
-			errors.append("correct format of 'indicator integer integer' was not followed on "+printLines(wrongFormat))
-	else:
-		errors.append("file is empty")
+			if location in self.walls: # you ran into a wall
+				self.interrupt(line, message+" ran into a wall at location "+repr(location)+" on line "+repr(line+1))
 
-	if errors: raise FormattingError(errors)
+		elif piece == "f": # fruit
+			if location in self.walls: # you spawned in a wall
+				self.interrupt(line, "fruit spawned into a wall at location "+repr(location)+" on line "+repr(line+1))
+				return
 
-	return width, height
-'''
-desc:	Checks for valid dimensions, capitalization, starting positions, object collision,
-		invalid declarations after start of game, and out-of-bounds movement and placement.
+			if location in self.pills: # you spawned on a pill
+				self.errors.append("fruit spawned into a pill at location "+repr(location)+" on line "+repr(line+1))
 
-pre:	Input `text` is a list of strings; `width` and `height` are integer values. All inputs
-		have been used or generated by the checkStructure function to catch the errors considered
-		in that function.
-'''
-def checkContent(text, height, width):
-	
-	# utility functions
-	def getElements(line):
-		return line[0], (int(line[1]), int(line[2]))
-
-	def getStartLoc(piece, world):
-		for line in world:
-			if len(line) < 3:
-				continue
-			target, location = getElements(line)
-			if target == piece:
-				return location
-		return (-1,-1)
-
-	def inWidth(location, width):
-		return location[0] >= 0 and location[0] < width
-	def inHeight(location, height):
-		return location[1] >= 0 and location[1] < height
-	
-	def manhattanDistance(location0, location1):
-		return sum([abs(coord[0]-coord[1]) for coord in zip(list(location0),list(location1))]) # very extra
-	
-	errors = []
-	errata = dict()
-	
-	critical = False
-	declarations = True
-
-	walls = set()
-	pills = set()
-	validPieces = {"m","1","2","3","f","t","p","w"}
-	objects = validPieces - {"t"}
-	moving = objects - {"f","p","w"}
-	pacStart = (0, height-1)
-	ghostStart = (width-1, 0)
-	missing = (-1,-1)
-	expectedStart = missing # probably a C++ habit
-	message = "" # same ^^^
-	fruit = set()
-	movingLocations = {"m":[]} # support multiple pac-people
-	
-
-	# check for reasonable dimensions
-	if width < 2:
-		errors.append("width must be at least 2")
-	if height < 2:
-		errors.append("height must be at least 2")
-
-	# separate text into non-uniform 2D list
-	world = [[element for element in line.split(' ') if element] for line in text]
-
-	# check for errors relating to character capitalization
-	capitals = [line[0] for line in world[2:] if line and line[0] not in validPieces and line[0].casefold() in validPieces]
-	if capitals:
-		message = "detected incorrect use of capital letters for character(s) "
-		for letter in capitals:
-			message += " "+repr(letter)
-		errors.append(message)
-
-	if errors: raise FormattingError(errors)
-
-	# check starting position of pac-man and ghosts (moving pieces)
-	for player in moving:
-		location = getStartLoc(player,world)
-
-		if player == "m":
-			message = "pac-man"
-			expectedStart = pacStart
-			movingLocations[player].append(location)
-		else:
-			message = "ghost "+player
-			expectedStart = ghostStart
-			movingLocations[player] = [location]
-		
-		if location == missing: # missing piece
+			if location in self.fruit and location not in self.movingLocations["m"]: # duplicate fruit spawns
+				message = "duplicate fruit declarations at location "+repr(location)+" on "
+				if message not in self.errata:
+					self.errata[message] = []
+				self.errata[message].append(line)
+			else:
+				self.fruit.add(location)
+
+		elif piece == "t": # time
+			if self.declarations:
+				self.declarations = False
+				self.time = location[0]
+				if location[1] != 0:
+					self.errors.append("starting score is non-zero")
+			else:
+				if self.time - location[0] == 1:
+					self.time = location[0] # update time if correct
+				else: # incorrect time counting
+					self.errors.append("time didn't decrease by 1 as expected on line "+repr(line+1))
+
+				if location[1] - self.score < 0: # score erroneously decreased
+					self.errors.append("score decremented unexpectedly on line "+repr(line+1))
+			self.score = location[1]
+
+	'''
+	desc:	Called after the last line was fed in. Raises a FormattingError with the errors of
+			the first group of checks that failed, otherwise returns soft errors.
+	'''
+	def finish(self):
+		errors = []
+		for char in self.characters:
+			errors.append("invalid character "+repr(char)+" found on "+printLines(sorted(set(self.characters[char]))))
+		if errors: raise FormattingError(errors)
+
+		# check width and height, ignoring tailing blank lines unless every line is blank
+		lastLine = self.lastLine if self.lastLine >= 0 else self.lines-1
+		if not isInteger(self.dimensions[0]):
+			errors.append("invalid width")
+		if lastLine > 0 and not isInteger(self.dimensions[1]):
+			errors.append("invalid height")
+
+		if self.noDelineation:
+			errors.append("there is no space delineation on "+printLines(self.noDelineation))
+		if self.tooManySpaces:
+			errors.append("there are too many spaces on "+printLines(self.tooManySpaces))
+		if self.tooFewElements:
+			errors.append("there are too few elements on "+printLines(self.tooFewElements))
+		if self.tooManyElements:
+			errors.append("there are too many elements on "+printLines(self.tooManyElements))
+		if self.wrongFormat:
+			errors.append("correct format of 'indicator integer integer' was not followed on "+printLines(self.wrongFormat))
+		if errors: raise FormattingError(errors)
+
+		# check for reasonable dimensions
+		if self.width < 2:
+			errors.append("width must be at least 2")
+		if self.height < 2:
+			errors.append("height must be at least 2")
+		if self.capitals:
+			message = "detected incorrect use of capital letters for character(s) "
+			for letter in self.capitals:
+				message += " "+repr(letter)
+			errors.append(message)
+		if errors: raise FormattingError(errors)
+
+		# live to squawk another day unless players are missing
+		errors = list(self.startErrors)
+		missing = sorted(moving - set(self.starts))
+		for player in missing:
+			message = "pac-man" if player == "m" else "ghost "+player
 			errors.append("couldn't find expected "+message+" character "+repr(player))
-			critical = True
-		elif location != expectedStart: # unexpected starting location
-			errors.append("expected "+message+" starting location of "+repr(expectedStart)+" but got "+repr(location))
-
-	# live to squawk another day unless players are missing
-	if errors and critical:
-		errors.append("PARSING INTERRUPTED due to critical error")
-		raise FormattingError(errors)
-
-	# iterate over all lines in the text after the height and width declarations
-	for line in range(2,len(world)):
-		
-		# skip blank lines
-		if not world[line]:
-			continue
-
-		piece, location = getElements(world[line])
-		
-		# check the first element
-		if piece not in validPieces:
-			errors.append("invalid first element "+repr(piece)+" on line "+repr(line+1))
-		else:
-			# check out of bounds placements or movements
-			if piece in objects: # physical objects
-				horizontal = inWidth(location, width)
-				vertical = inHeight(location, height)
-				if not horizontal or not vertical: # went out of bounds
-					message = piece+" went out of bounds "
-					if not horizontal and not vertical: # horizontally and vertically (alarming)
-						message += "horizontally and vertically"
-					elif not horizontal: # horizontally
-						message += "horizontally"
-					else: # vertically
-						message += "vertically"
-					message += " at location "+repr(location)+" on line "+repr(line+1)
-					errors.append(message)
-					errors.append("PARSING INTERRUPTED due to critical error on line "+repr(line+1))
-					raise FormattingError(errors)
-
-			if piece == "w": # walls
-				if declarations and location not in walls: # new wall
-					walls.add(location)
-				elif not declarations and location not in walls: # late wall declaration
-					errors.append("unexpected wall declaration after game start on line "+repr(line+1))
-					errors.append("PARSING INTERRUPTED due to critical error on line "+repr(line+1))
-					raise FormattingError(errors)
-				else: # duplicate wall declaration
-					errors.append("wall on line "+repr(line+1)+" is already defined")
-				
-				if location in pills: # you spawned on a pill
-					errors.append("wall spawned onto a pill at location "+repr(location)+" on line "+repr(line+1))
-				
-				if location in [loc for player in movingLocations for loc in movingLocations[player]]: # you spawned on someone
-					errors.append("wall spawned onto a player at location "+repr(location)+" on line "+repr(line+1))
-					errors.append("PARSING INTERRUPTED due to critical error on line "+repr(line+1))
-					raise FormattingError(errors)
-			
-			elif piece == "p": # pills
-				if declarations and location not in pills: # new pill
-					pills.add(location)
-				elif not declarations and location not in pills: # late pill declaration
-					errors.append("unexpected pill declaration after game start on line "+repr(line+1))
-					errors.append("PARSING INTERRUPTED due to critical error on line "+repr(line+1))
-					raise FormattingError(errors)
-				else: # duplicate pill declaration
-					errors.append("pill on line "+repr(line+1)+" is already defined")
-				
-				if location in walls: # you spawned in a wall
-					errors.append("pill spawned into a wall at location "+repr(location)+" on line "+repr(line+1))
-				
-				if location in movingLocations["m"]: # you spawned on pac-man
-					errors.append("pill spawned onto a player at location "+repr(location)+" on line "+repr(line+1))
-			
-			elif piece in moving: # pac-man and ghosts
-				if piece == "m":
-					message = "pac-man"
-					fruit.discard(location)
-					pills.discard(location)
-					
-					# partial support for multiple pac-people
-					for person in range(len(movingLocations[piece])):
-						distance = manhattanDistance(location,movingLocations[piece][person])
-						if distance == 1 or (piece == "m" and distance == 0): # this has a bug if pac-people are one apart and only one moves (wip)
-							movingLocations[piece][person] = location
-							break
-					else: # only executes if the for loop completes without breaking
-						errors.append(message+" made an invalid move into location "+repr(location)+" on line "+repr(line+1))
-						errors.append("PARSING INTERRUPTED due to critical error on line "+repr(line+1))
-						raise FormattingError(errors)
-				else:
-					message = "ghost "+piece
-					if manhattanDistance(location, movingLocations[piece][0]) == 1 or declarations: # all ghost moves should have a distance of 1
-						movingLocations[piece][0] = location
-					else:
-						errors.append(message+" made an invalid move into location "+repr(location)+" on line "+repr(line+1))
-						errors.append("PARSING INTERRUPTED due to critical error on line "+repr(line+1))
-						raise FormattingError(errors)
-
-				if location in walls: # you ran into a wall
-					errors.append(message+" ran into a wall at location "+repr(location)+" on line "+repr(line+1))
-					errors.append("PARSING INTERRUPTED due to critical error on line "+repr(line+1))
-					raise FormattingError(errors)
-
-			elif piece == "f": # fruit
-				if location in walls: # you spawned in a wall
-					errors.append("fruit spawned into a wall at location "+repr(location)+" on line "+repr(line+1))
-					errors.append("PARSING INTERRUPTED due to critical error on line "+repr(line+1))
-					raise FormattingError(errors)
-				
-				if location in pills: # you spawned on a pill
-					errors.append("fruit spawned into a pill at location "+repr(location)+" on line "+repr(line+1))
-				
-				if location in fruit and location not in movingLocations["m"]: # duplicate fruit spawns 
-					message = "duplicate fruit declarations at location "+repr(location)+" on "
-					if message not in errata:
-						errata[message] = []
-					errata[message].append(line)
-				else:
-					fruit.add(location)
-			elif piece == "t": # time
-				if declarations:
-					if list(pills & walls):
-						message = "intersection between pills and walls at game location(s)"
-						for loc in list(pills & walls):
-							message += " "+repr(loc)
-					declarations = False
-					time = location[0]
-					score = location[1]
-					if score != 0:
-						errors.append("starting score is non-zero")
-				else:
-					if time - location[0] == 1:
-						time = location[0] # update time if correct
-					else: # incorrect time counting
-						errors.append("time didn't decrease by 1 as expected on line "+repr(line+1))
-					
-					if location[1] - score < 0: # score erroneously decreased
-						errors.append("score decremented unexpectedly on line "+repr(line+1))
-				score = location[1]
+		if missing:
+			errors.append("PARSING INTERRUPTED due to critical error")
+			raise FormattingError(errors)
 
+		errors += self.errors
+		if not self.critical:
+			for error in self.errata:
+				errors.append(error+printLines(self.errata[error]))
+		if errors: raise FormattingError(errors)
 
-	for error in errata:
-		errors.append(error+printLines(errata[error]))
+		# blank lines don't actully break the visualizer, but you shouldn't have them
+		if self.blankLines:
+			return ["unexpected blank line found on "+printLines(self.blankLines)]
+		return []
 
-	if errors: raise FormattingError(errors)
-	return
 '''
-desc:	High-level function that calls an performs all checks in the desired order. Presents
-		soft errors and comments if everything went well. For specific checks, see descriptions
-		for the functions it calls.
+desc:	High-level function that streams a file through a WorldChecker. Returns the lines to
+		report: errors, soft errors or a pass. Files without any lines are not reported.
 '''
 def checkWorld(filename):
-	worldText = []
-	global softErrors
-
-	with open(filename, 'r') as file:
-		worldText = [line.rstrip() for line in file]
+	checker = WorldChecker()
+	try:
+		with open(filename, 'r') as file:
+			for line in file:
+				checker.feed(line.rstrip())
+	except (OSError, UnicodeDecodeError) as e:
+		return [filename+": [ERROR] "+str(e)]
+
+	if not checker.lines:
+		return []
+	try:
+		softErrors = checker.finish()
+	except FormattingError as e:
+		return [filename+": [ERROR] "+error for error in e.errors]
+
+	if softErrors:
+		return [filename+": [warning] "+error for error in softErrors]
+	return [filename+": PASS"]
 
-	if worldText:
-		try:
-			checkCharacters(worldText)
-			width, height = checkStructure(worldText)
-			checkContent(worldText, height, width)
+'''
+desc:	Checks every file, in parallel with more than one job, and prints the reports in the
+		order of the files. Returns 1 if any file had errors.
+'''
+def main():
+	parser = argparse.ArgumentParser(description="Checks GPac world files")
+	parser.add_argument("files", nargs="*", help="world file paths")
+	parser.add_argument("-j", "--jobs", type=int, default=1, help="number of files checked at once")
+	args = parser.parse_args()
 
-			for error in softErrors:
-				print(filename+": [warning] "+error)
-			if not softErrors:
-				print(filename+": PASS")
-			softErrors.clear()
+	if not args.files:
+		print("Please pass in a world file")
+		return 0
 
-		except FormattingError as e:
-			for error in e.errors:
-				print(filename+": [ERROR] "+ error)
+	failed = False
+	if args.jobs > 1:
+		pool = multiprocessing.Pool(min(args.jobs, len(args.files)))
+		reports = pool.imap(checkWorld, args.files)
+	else:
+		pool = None
+		reports = map(checkWorld, args.files)
 
+	for report in reports:
+		for message in report:
+			print(message)
+			failed = failed or ": [ERROR] " in message
 
-def main():
-	if len(sys.argv) < 2:
-		print("Please pass in a world file")
-	else:
-		for arg in range(1,len(sys.argv)):
-			checkWorld(sys.argv[arg])
+	if pool:
+		pool.close()
+		pool.join()
+	return 1 if failed else 0
 
 if __name__ == '__main__':
-	main()
\ No newline at end of file
+	sys.exit(main())
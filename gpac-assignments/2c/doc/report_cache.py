@@ -0,0 +1,108 @@
+""" Incremental report generation for the scripts in this folder.
+
+A job writes one or more output files, such as graphs or workbooks, from a list of input
+logs. A job is skipped when its inputs, its arguments and the script that renders it are
+unchanged since its outputs were written. Fingerprints are kept in a <script>.cache.json
+file next to the script. The jobs that are left run in a process pool.
+
+The run histories the scripts read their logs from are loaded here as well.
+"""
+
+import os
+import json
+import hashlib
+import collections
+import multiprocessing
+import numpy
+
+# outputs and inputs are lists of paths, function(*args) writes the outputs
+Job = collections.namedtuple('Job', ['outputs', 'inputs', 'function', 'args'])
+
+
+def file_hash(path, known):
+    """ Returns the sha1 of a file's contents, or None if it doesn't exist. known maps paths
+    to [size, modification time, sha1] so files that haven't been touched aren't read.
+    """
+
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    entry = known.get(path)
+    if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return entry[2]
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    known[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return known[path][2]
+
+
+def _run(job):
+    job.function(*job.args)
+    return job
+
+
+def render(script, jobs, processes=None):
+    """ Runs the jobs of script whose fingerprint changed or whose outputs are missing, in
+    a pool of processes when there is more than one. Returns the number of jobs that ran.
+    """
+
+    cache_file = os.path.splitext(script)[0] + '.cache.json'
+    cache = {'files': {}, 'jobs': {}}
+    if os.path.exists(cache_file):
+        with open(cache_file) as file:
+            cache = json.load(file)
+    source = file_hash(os.path.abspath(script), cache['files'])
+
+    pending = {}
+    for job in jobs:
+        key = '|'.join(job.outputs)
+        inputs = [file_hash(path, cache['files']) for path in job.inputs]
+        fingerprint = hashlib.sha1(json.dumps(
+            [source, job.function.__name__, repr(job.args), job.inputs, inputs]).encode()).hexdigest()
+        entry = cache['jobs'].get(key)
+        if entry and entry[0] == fingerprint and all(os.path.exists(path) for path in entry[1]):
+            continue
+        pending[key] = (job, fingerprint)
+
+    def finish(job):
+        key = '|'.join(job.outputs)
+        # outputs a job didn't write, such as a graph of a log without runs, aren't expected
+        cache['jobs'][key] = [pending[key][1], [path for path in job.outputs if os.path.exists(path)]]
+
+    try:
+        if len(pending) > 1 and processes != 1:
+            with multiprocessing.Pool(min(processes or os.cpu_count(), len(pending))) as pool:
+                for job in pool.imap_unordered(_run, [job for job, _ in pending.values()]):
+                    finish(job)
+        else:
+            for job, _ in pending.values():
+                finish(_run(job))
+    finally:
+        with open(cache_file, 'w') as file:
+            json.dump(cache, file, indent=1)
+
+    skipped = len(jobs) - len(pending)
+    print(f'{os.path.basename(script)}: {len(pending)} rendered, {skipped} unchanged')
+    return len(pending)
+
+
+def load_history(filename):
+    """ Returns the columnar history saved next to a text log (the history_file config
+    option) as a memory map, or None if there is none or the log is newer.
+    """
+
+    history_file = os.path.splitext(filename)[0] + '.npy'
+    if not os.path.exists(history_file):
+        return None
+    if os.path.exists(filename) and os.path.getmtime(filename) > os.path.getmtime(history_file):
+        return None
+    return numpy.load(history_file, mmap_mode='r')
+
+
+def last_rows(history):
+    """ Index of the last row of every run, which holds the run's final best fitness. """
+
+    return numpy.flatnonzero(numpy.diff(history['run'], append=-1))
@@ -1,9 +1,15 @@
+import os
 import glob
 import xlsxwriter
 import re
+import report_cache
 
 
 def get_contents(filename):
+    history = report_cache.load_history(f'./logs/{filename}')
+    if history is not None:
+        return history['best'][report_cache.last_rows(history)].astype(int).tolist()
+
     runs = []
     with open(f'./logs/{filename}') as file:
         contents = file.read()
@@ -18,8 +24,24 @@ def get_contents(filename):
 
 
 def main():
+    report_cache.render(__file__, [
+        report_cache.Job(['./doc/g3/green3.xlsx'],
+                         log_inputs('g2/default_config.log', 'g2/high_config.log',
+                                    'g2/max_config.log'),
+                         write_workbook, ('./doc/g3/green3.xlsx',)),
+    ])
+
+
+def log_inputs(*logs):
+    """ Files the workbook columns of the logs are made from, a log and its history. """
+
+    return [path for log in logs
+            for path in (f'./logs/{log}', f'./logs/{os.path.splitext(log)[0]}.npy')]
+
 
-    workbook = xlsxwriter.Workbook(f'./doc/g3/green3.xlsx')
+def write_workbook(path):
+    # rows are written in order, so they can be streamed to disk
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
 
     # Config1 v Config2
     worksheet = workbook.add_worksheet("Default v High")
@@ -72,4 +94,5 @@ def write_data(worksheet, column1_header, column2_header, column1_data, column2_
     # row += 1
 
 
-main()
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,26 @@
 from pathlib import Path
 import os
-import matplotlib.pyplot as plt
+import matplotlib
+import numpy
 import re
+import report_cache
+
+# graphs are only saved, so use a backend that works in pool workers without a display
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # pylint: disable=wrong-import-position
+
+GRAPH_DIR = 'g3/graphs'
 
 
 def get_best_run(filename):
+    history = report_cache.load_history(filename)
+    if history is not None:
+        finals = report_cache.last_rows(history)
+        best_run = history['run'][finals[numpy.argmax(history['best'][finals])]]
+        rows = history['run'] == best_run
+        return (history['evals'][rows].tolist(), history['best'][rows].tolist(),
+                history['average'][rows].tolist())
+
     eval_counts = []
     best_fitnesses = []
     avg_fitnesses = []
@@ -76,16 +92,34 @@ def plot_graph(name, filenames, suffix, evaluationes_list, fitnesses_list, title
     plt.ylim(0)
     plt.legend(loc="best")
 
-    dirname = "g3/graphs"
+    Path(f'./doc/{GRAPH_DIR}').mkdir(parents=True, exist_ok=True)
+    plt.savefig(graph_path(name, suffix))
+    plt.close()
+
+
+def graph_path(name, suffix):
+    return f"./doc/{GRAPH_DIR}/{name}{suffix}.png"
 
-    Path(f'./doc/{dirname}').mkdir(parents=True, exist_ok=True)
-    plt.savefig(f"./doc/{dirname}/{name}{suffix}.png")
-    plt.show()
-    plt.clf()
 
+def log_inputs(*filenames):
+    """ Files the graphs of the logs are made from, a log and its history. """
+
+    return [path for filename in filenames
+            for path in (filename, os.path.splitext(filename)[0] + '.npy')]
+
+
+def main():
+    logs = ['logs/g2/default_config.log', 'logs/g2/max_config.log', 'logs/g2/high_config.log']
+
+    jobs = [report_cache.Job([graph_path('config_compare', '_best'),
+                              graph_path('config_compare', '_avg')],
+                             log_inputs(*logs), graph_compare, ('config_compare', *logs))]
+    for filename in logs:
+        name = os.path.splitext(os.path.split(filename)[1])[0]
+        jobs.append(report_cache.Job([graph_path(name, '_best_avg')], log_inputs(filename),
+                                     graph_avg_best, (filename,)))
+    report_cache.render(__file__, jobs)
 
-graph_compare('config_compare', 'logs/g2/default_config.log',
-              'logs/g2/max_config.log', 'logs/g2/high_config.log')
 
-graph_avg_best('logs/g2/default_config.log',
-               'logs/g2/max_config.log', 'logs/g2/high_config.log')
+if __name__ == '__main__':
+    main()
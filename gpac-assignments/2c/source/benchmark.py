@@ -0,0 +1,272 @@
+""" Benchmarks the hot paths of the GPac engine and the GP solver and writes the results
+to a JSON file so runs on different commits can be compared.
+
+Every benchmark is seeded and only uses the bundled maps, run it from the assignment
+folder:
+
+    python source/benchmark.py -o benchmark.json
+
+Larger maps are made by tiling a bundled map, see scale_map.
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+import numpy
+import gpac
+import node
+import solver
+import shortest_path
+
+CONFIG = 'config/test_run_config.json'
+MAP = 'maps/map0.txt'
+
+
+def scale_map(map_filepath, scale, directory):
+    """ Tiles a map scale times in both directions. Returns the path of the new map. """
+
+    width, height, board = gpac.GPac._parse_map(map_filepath)  # pylint: disable=protected-access
+    rows = [''.join(row) * scale for row in board[:height]] * scale
+    filepath = os.path.join(directory, f'{os.path.splitext(os.path.basename(map_filepath))[0]}'
+                                       f'_x{scale}.txt')
+    with open(filepath, 'w') as file:
+        file.write(f'{width * scale} {height * scale}\n')
+        file.write('\n'.join(rows))
+    return filepath
+
+
+def best_time(function, repeat):
+    """ Runs function repeat times. Returns the fastest run time and the last result. """
+
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def seed_all(seed):
+    """ Seeds the random and numpy.random generators. """
+
+    random.seed(seed)
+    numpy.random.seed(seed)
+
+
+def random_controller(game, unit):
+    """ Picks a random legal move for unit, see gpac.play_game. """
+
+    return random.choice(game.get_moves_for_unit(unit))
+
+
+def create_solver(map_filepath, population, seed):
+    """ Returns a serial solver with population parents and half as many children. """
+
+    instance = solver.Solver(CONFIG)
+    instance.seed = seed
+    instance.maps = [map_filepath]
+    instance.workers = 1
+    instance.pacman_parents = instance.ghost_parents = population
+    instance.pacman_children = instance.ghost_children = max(2, population // 2)
+    instance.pacman_mutation_rate = instance.ghost_mutation_rate = 0.5
+    return instance
+
+
+def grow_trees(population, unit, max_depth=None):
+    """ Returns population random trees for unit, grown with the full or grow method. """
+
+    trees = []
+    for _ in range(population):
+        tree = node.Node(tree_type=random.choice(('full', 'grow')),
+                         depth_limit=max_depth, unit=unit)
+        tree.grow()
+        trees.append(tree)
+    return trees
+
+
+def bench_turns(map_filepath, engine, games, seed, repeat):
+    """ Turns per second of games between random controllers. """
+
+    def play():
+        seed_all(seed)
+        turns = 0
+        for _ in range(games):
+            game = gpac.ENGINES[engine](map_filepath, 0.5, 0.01, 10, 2, log=False)
+            gpac.play_game(game, (random_controller, random_controller))
+            turns += game.time_elapsed
+        return turns
+
+    seconds, turns = best_time(play, repeat)
+    return {'turns': turns, 'seconds': seconds, 'turns_per_second': turns / seconds}
+
+
+def bench_sensors(map_filepath, seed, repeat):
+    """ Cost of the sensor inputs of every open cell, for Pac-Man and for ghosts. """
+
+    seed_all(seed)
+    # the distance table is built once per map, keep it out of the timings
+    shortest_path.load_distance_table(map_filepath)
+    instance = create_solver(map_filepath, 2, seed)
+    instance._create_game(map_filepath, log=False)  # pylint: disable=protected-access
+    game = instance.game_instance
+    cells = [(row, column) for row in range(game.height) for column in range(game.width)
+             if game.cell_at((row, column)) != gpac.WALL]
+    results = {'cells': len(cells)}
+    for name, unit in (('pacman', gpac.PACMAN), ('ghost', gpac.GHOST[0])):
+        def sense(unit=unit):
+            # a new turn every pass so the memo table starts empty
+            instance.sensor_memo_turn = None
+            for cell in cells:
+                instance._generate_sensor_inputs(cell, unit)  # pylint: disable=protected-access
+
+        seconds, _ = best_time(sense, repeat)
+        results[f'{name}_microseconds_per_cell'] = seconds / len(cells) * 1e6
+    return results
+
+
+def bench_trees(population, max_depth, rows, seed, repeat):
+    """ Tree evaluations per second, one call per sensor row and one call per matrix. """
+
+    seed_all(seed)
+    trees = grow_trees(population, gpac.PACMAN, max_depth)
+    sensors = numpy.random.randint(0, 50, size=(rows, 5)).astype(float)
+    sensor_rows = sensors.tolist()
+    for tree in trees:
+        tree.calculate(*sensor_rows[0])
+        tree.calculate_vector(sensors[:1])
+
+    def scalar():
+        for tree in trees:
+            for sensor_row in sensor_rows:
+                tree.calculate(*sensor_row)
+
+    def vector():
+        for tree in trees:
+            tree.calculate_vector(sensors)
+
+    evaluations = population * rows
+    scalar_seconds, _ = best_time(scalar, repeat)
+    vector_seconds, _ = best_time(vector, repeat)
+    return {'evaluations': evaluations,
+            'scalar_evaluations_per_second': evaluations / scalar_seconds,
+            'vector_evaluations_per_second': evaluations / vector_seconds}
+
+
+def bench_variation(population, max_depth, operations, seed, repeat):
+    """ Subtree crossovers and mutations per second. """
+
+    seed_all(seed)
+    trees = grow_trees(population, gpac.PACMAN, max_depth)
+
+    def crossover():
+        seed_all(seed)
+        for _ in range(operations):
+            solver.Solver.sub_tree_crossover(*random.sample(trees, 2))
+
+    def mutation():
+        seed_all(seed)
+        for _ in range(operations):
+            solver.Solver.sub_tree_mutation(random.choice(trees))
+
+    crossover_seconds, _ = best_time(crossover, repeat)
+    mutation_seconds, _ = best_time(mutation, repeat)
+    return {'crossovers_per_second': operations / crossover_seconds,
+            'mutations_per_second': operations / mutation_seconds}
+
+
+def bench_generation(map_filepath, population, seed, repeat):
+    """ Time of a full generation: selection, variation, evaluation and survival. """
+
+    def generation():
+        seed_all(seed)
+        instance = create_solver(map_filepath, population, seed)
+        pacmans, ghosts = instance._create_initial_populations()  # pylint: disable=protected-access
+        start = time.perf_counter()
+        pacman_children = instance.child_selection(
+            instance.parent_selection(pacmans, gpac.PACMAN), gpac.PACMAN)
+        ghost_children = instance.child_selection(
+            instance.parent_selection(ghosts, gpac.GHOST), gpac.GHOST)
+        pacmans, ghosts = instance.reevaluate(pacmans, ghosts, pacman_children, ghost_children)
+        instance.survival_selection(pacmans, gpac.PACMAN)
+        instance.survival_selection(ghosts, gpac.GHOST)
+        return time.perf_counter() - start, len(pacmans)
+
+    results = [generation() for _ in range(repeat)]
+    seconds = min(seconds for seconds, _ in results)
+    return {'games': results[0][1], 'seconds': seconds}
+
+
+def git_commit():
+    """ Returns the hash of the checked out commit, or None outside of a git repository. """
+
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    """ Runs every benchmark and returns the results as a dictionary. """
+
+    results = []
+
+    def record(benchmark, parameters, function, *function_args):
+        """ Runs a benchmark and prints its result as it comes in. """
+        result = function(*function_args)
+        results.append({'benchmark': benchmark, **parameters, **result})
+        print(json.dumps(results[-1]))
+
+    with tempfile.TemporaryDirectory() as directory:
+        maps = {scale: MAP if scale == 1 else scale_map(MAP, scale, directory)
+                for scale in args.scales}
+        for scale, map_filepath in maps.items():
+            for engine in sorted(gpac.ENGINES):
+                record('turns', {'scale': scale, 'engine': engine}, bench_turns,
+                       map_filepath, engine, args.games, args.seed, args.repeat)
+            record('sensors', {'scale': scale}, bench_sensors,
+                   map_filepath, args.seed, args.repeat)
+
+        for population in args.populations:
+            record('trees', {'population': population}, bench_trees,
+                   population, args.max_depth, args.rows, args.seed, args.repeat)
+            record('variation', {'population': population}, bench_variation,
+                   population, args.max_depth, args.operations, args.seed, args.repeat)
+            for scale, map_filepath in maps.items():
+                record('generation', {'scale': scale, 'population': population},
+                       bench_generation, map_filepath, population, args.seed, args.repeat)
+
+    return {'commit': git_commit(), 'python': platform.python_version(),
+            'numpy': numpy.__version__, 'seed': args.seed, 'results': results}
+
+
+def main():
+    """ Parses the command line, runs the benchmarks and writes the JSON report. """
+
+    parser = argparse.ArgumentParser(description='Benchmarks the GPac engine and GP solver')
+    parser.add_argument('-o', '--output', default='benchmark.json', help='JSON results file')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each benchmark')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 2],
+                        help='map sizes as multiples of the bundled maps')
+    parser.add_argument('--populations', type=int, nargs='+', default=[20, 100])
+    parser.add_argument('--games', type=int, default=10, help='games per turn benchmark')
+    parser.add_argument('--rows', type=int, default=100, help='sensor rows per tree')
+    parser.add_argument('--operations', type=int, default=1000,
+                        help='crossovers and mutations per variation benchmark')
+    parser.add_argument('--max-depth', type=int, default=5)
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+""" CIAO module. Builds Current Individual vs Ancestral Opponents plots one generation at a time. """
+
+import os
+from pathlib import Path
+import numpy
+from PIL import Image
+
+
+class CiaoPlot:
+    """ Fitness of every generation's best Pac-Man against the best ghosts of the generations
+    before it.
+
+    The matrix grows by one row per generation and is saved to disk as a .npy file after
+    every row, so only the newest generation's games are played.
+
+    filepath - path of the .npy file the matrix is saved to
+    max_opponents - maximum number of ghost generations each Pac-Man plays, None for all
+    """
+
+    def __init__(self, filepath, max_opponents=None):
+        self.filepath = filepath
+        self.max_opponents = max_opponents
+        self.generations = 0
+        # unplayed cells are nan, capacity is doubled as generations are added
+        self.fitnesses = numpy.full((8, 8), numpy.nan)
+
+    def opponents(self):
+        """ Returns the ghost generations the next generation's Pac-Man plays against.
+
+        If there are more generations than max_opponents they are evenly subsampled,
+        always keeping the first and the current generation.
+        """
+
+        generation = self.generations
+        if self.max_opponents and generation + 1 > self.max_opponents:
+            samples = numpy.linspace(0, generation, self.max_opponents).round().astype(int)
+            return sorted(set(samples.tolist()))
+        return list(range(generation + 1))
+
+    def add_generation(self, opponents, fitnesses):
+        """ Adds next generation's row and saves the matrix.
+
+        opponents - ghost generations played, as returned by opponents
+        fitnesses - Pac-Man fitness against each opponent
+        """
+
+        if self.generations == len(self.fitnesses):
+            size = len(self.fitnesses) * 2
+            grown = numpy.full((size, size), numpy.nan)
+            grown[:self.generations, :self.generations] = self.fitnesses
+            self.fitnesses = grown
+
+        self.fitnesses[self.generations, opponents] = fitnesses
+        self.generations += 1
+        self.save()
+
+    def matrix(self):
+        """ Returns the filled part of the matrix. """
+        return self.fitnesses[:self.generations, :self.generations]
+
+    def save(self):
+        """ Saves the matrix to filepath. """
+
+        Path(os.path.split(self.filepath)[0] or '.').mkdir(parents=True, exist_ok=True)
+        with open(self.filepath, 'wb') as file:
+            numpy.save(file, self.matrix())
+
+    def render(self, image_path):
+        """ Renders the matrix as a greyscale image, with the first generation at the bottom.
+        Each row is normalized on its own, higher fitness is darker and unplayed cells are white.
+        """
+
+        size = self.generations
+        data = numpy.full((size, size, 3), 255, dtype=numpy.uint8)
+
+        for row, fitnesses in enumerate(self.matrix()):
+            played = ~numpy.isnan(fitnesses)
+            if not played.any():
+                continue
+            shifted = fitnesses[played] - fitnesses[played].min()
+            if shifted.max():
+                shifted = shifted / shifted.max()
+            data[-(row + 1), played] = ((1 - shifted) * 255)[:, None].astype(numpy.uint8)
+
+        Path(os.path.split(image_path)[0] or '.').mkdir(parents=True, exist_ok=True)
+        Image.fromarray(data).save(image_path)
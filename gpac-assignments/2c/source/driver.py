@@ -6,7 +6,9 @@ Uses the argparse library to help with passing of command line arguments"""
 import glob
 import random
 import argparse
+import json
 import game
+import islands
 import solver
 
 parser = argparse.ArgumentParser(
@@ -18,6 +20,9 @@ run_group.add_argument('-c', '--config', help='path to configuration file')
 run_group.add_argument('-d', '--demo', help='demo pacman game',
                        action='store_true', default=False)
 
+parser.add_argument('-m', '--migration-server', action='store_true', default=False,
+                    help="serve the island inboxes of the config's migration_address")
+
 output_group = parser.add_mutually_exclusive_group()
 output_group.add_argument('-p', '--progress', help='Show progress bar',
                           action='store_true', default=False)
@@ -30,6 +35,12 @@ if args.demo:
     maps = glob.glob('./maps/map*.txt')
     game.play(random.choice(maps))
 
+elif args.migration_server:
+    with open(args.config) as file:
+        config = json.load(file)
+    islands.serve_inboxes(islands.parse_address(config['migration_address']),
+                          config.get('migration_authkey', 'gpac').encode(), config['islands'])
+
 else:
     instance = solver.Solver(args.config, show_progress_bar=args.progress, show_board=args.board)
     instance.run()
@@ -0,0 +1,49 @@
+""" Fitness cache module. Implements a size bounded LRU cache for game results. """
+
+import collections
+
+
+class FitnessCache:
+    """ Least recently used cache of game results.
+
+    size - maximum number of results kept, 0 disables the cache
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.results = collections.OrderedDict()
+        self.hits = 0
+        self.lookups = 0
+
+    def get(self, key):
+        """ Returns cached result for key or None if there is none. """
+
+        self.lookups += 1
+        result = self.results.get(key)
+        if result is not None:
+            self.hits += 1
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        """ Stores result for key, evicting the least recently used result if full. """
+
+        if not self.size:
+            return
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+    def add_counts(self, hits, lookups):
+        """ Adds the hits and lookups of a cache used in another process. """
+
+        self.hits += hits
+        self.lookups += lookups
+
+    def hit_rate(self):
+        """ Returns fraction of lookups that were found in the cache. """
+
+        if not self.lookups:
+            return 0
+        return self.hits / self.lookups
@@ -1,9 +1,14 @@
 """ Module that implements map parsing and game logic """
 
 import os
+import bisect
+import collections
+import contextlib
 import random
 import copy
 import math
+import time
+import numpy
 from utilities import MyException
 
 # global constants
@@ -35,6 +40,107 @@ FRUIT_COLLISION = 20
 PILL_COLLISION = 30
 NO_COLLISION = 40
 
+# cell codes used by the array backed engine
+EMPTY_CODE = 0
+WALL_CODE = 1
+PILL_CODE = 2
+FRUIT_CODE = 3
+CELL_CODES = {EMPTY_CELL: EMPTY_CODE, WALL: WALL_CODE, PILL: PILL_CODE, FRUIT: FRUIT_CODE}
+CELL_TYPES = (EMPTY_CELL, WALL, PILL, FRUIT)
+
+# row and column offsets for each direction
+OFFSETS = {UP: (-1, 0), DOWN: (1, 0), LEFT: (0, -1), RIGHT: (0, 1), HOLD: (0, 0)}
+
+
+class MapTemplate:
+    """ Parsed map shared by every game played on it. Games copy the board from it.
+
+    rows - board as a tuple of rows of unit types
+    codes - board as cell codes, row by row
+    walls - locations of every wall
+    pill_cells - array of open (row, column) cells a pill can be placed on
+    """
+
+    def __init__(self, width, height, board):
+        self.width = width
+        self.height = height
+        self.rows = tuple(tuple(row) for row in board)
+        self.codes = bytes(CELL_CODES[cell] for row in board for cell in row)
+        self.walls = tuple((row, column) for row, cells in enumerate(self.rows)
+                           for column, cell in enumerate(cells) if cell == WALL)
+
+        # Pac-Man's starting cell never holds a pill
+        open_cells = [(row, column) for row, cells in enumerate(self.rows)
+                      for column, cell in enumerate(cells)
+                      if cell != WALL and (row, column) != (0, 0)]
+        self.pill_cells = numpy.array(open_cells, dtype=int).reshape(-1, 2)
+        self.pill_cells.setflags(write=False)
+
+
+# map templates by file path, each map file is only parsed once per process
+_map_templates = {}
+
+
+def load_map(filename):
+    """ Returns the MapTemplate of the map file, parsing it on first use. """
+
+    template = _map_templates.get(filename)
+    if template is None:
+        template = MapTemplate(*GPac._parse_map(filename))  # pylint: disable=protected-access
+        _map_templates[filename] = template
+    return template
+
+
+class PillIndex:
+    """ Bucket grid of pill locations used to find the closest pill to a cell.
+
+    Pills are bucketed by row and each row keeps its columns sorted, so a query
+    only visits rows that could hold a pill closer than the best one found so far.
+    """
+
+    def __init__(self, height):
+        self.rows = [[] for _ in range(height)]
+        self.count = 0
+
+    def add(self, location):
+        """ Adds a pill to the index. """
+        columns = self.rows[location[0]]
+        index = bisect.bisect_left(columns, location[1])
+        if index == len(columns) or columns[index] != location[1]:
+            columns.insert(index, location[1])
+            self.count += 1
+
+    def remove(self, location):
+        """ Removes a pill from the index if it is present. """
+        columns = self.rows[location[0]]
+        index = bisect.bisect_left(columns, location[1])
+        if index < len(columns) and columns[index] == location[1]:
+            del columns[index]
+            self.count -= 1
+
+    def nearest(self, cell):
+        """ Returns manhattan distance from cell to the closest pill, 0 if there are no pills. """
+
+        if not self.count:
+            return 0
+
+        row, column = cell[0], cell[1]
+        best = None
+        for offset in range(len(self.rows)):
+            # rows further away than the best distance cannot hold a closer pill
+            if best is not None and offset >= best:
+                break
+            for current_row in {row - offset, row + offset}:
+                if not 0 <= current_row < len(self.rows) or not self.rows[current_row]:
+                    continue
+                columns = self.rows[current_row]
+                index = bisect.bisect_left(columns, column)
+                for neighbour in columns[max(index - 1, 0):index + 1]:
+                    distance = offset + abs(neighbour - column)
+                    if best is None or distance < best:
+                        best = distance
+        return best
+
 
 class GPac():
     """ GPac class. Defines functionality for the Pac-Man Game logic."""
@@ -45,34 +151,43 @@ class GPac():
     #######################     Core    ###############################
     ###################################################################
 
-    def __init__(self, filename, pill_chance, fruit_chance, fruit_score, time_multiplier):
+    def __init__(self, filename, pill_chance, fruit_chance, fruit_score, time_multiplier,
+                 log=True):
         # pylint: disable=too-many-arguments
-        width, height, board = self._parse_map(filename)
-        self.world_contents = f'{width}\n{height}\n'
-        self.width = width    # x
-        self.height = height  # y
-        self.board = board
-        self.collision = False
+        self.template = load_map(filename)
+        self.width = self.template.width    # x
+        self.height = self.template.height  # y
 
         self.chances = {}
         self.chances['pill'] = pill_chance
         self.chances['fruit'] = fruit_chance
 
         self.level_filename = filename
+        self.log = log
+
+        self.fruit_score = fruit_score
+        self.time_multiplier = time_multiplier
+
+        self.reset()
+
+    def reset(self):
+        """ Starts a new game on the same map without parsing the map file again. """
+
+        self.world_contents = self._create_world_log(self.width, self.height)
+        self.board = self._create_board(self.template)
+        self.collision = False
 
         self.locations = {}
         self.locations[PACMAN] = self._place_pacman()
         self.locations = {**self.locations, **self._place_ghosts()}
         self.locations[WALL] = self._read_walls()
+        self.pill_index = PillIndex(self.height)
         self.locations[PILL] = self._place_pills()
         self.locations[FRUIT] = self._place_fruit()
 
         self.total_pills = len(self.locations[PILL])
 
-        self.fruit_score = fruit_score
-        self.time_multiplier = time_multiplier
-
-        self.time = width * height * self.time_multiplier
+        self.time = self.width * self.height * self.time_multiplier
         self.time_elapsed = 0
 
         self.consumed = {}
@@ -91,16 +206,23 @@ class GPac():
     def _read_walls(self):
         """ Adds walls to log file """
 
-        walls = []
-        for row, _ in enumerate(self.board):
-            for column, _ in enumerate(self.board[row]):
-                cell = self.board[row][column]
-                if cell == WALL:
-                    walls.append([row, column])
-                    self._place([row, column], '#')
-                    # redundant but allows walls to be logged
+        walls = [list(wall) for wall in self.template.walls]
+        if self.log:
+            for wall in walls:
+                # redundant but allows walls to be logged
+                self._place(wall, WALL)
         return walls
 
+    @staticmethod
+    def _create_board(template):
+        """ Returns the storage used for the game board, a copy of the template's board. """
+        return [list(row) for row in template.rows]
+
+    @staticmethod
+    def _create_world_log(width, height):
+        """ Returns the buffer the world file is logged into. """
+        return f'{width}\n{height}\n'
+
     def turn(self):
         """ Handles a "turn". Pac-Man and Ghosts move.
         If Pac-Man collides with ghosts game ends.
@@ -159,47 +281,34 @@ class GPac():
 
     def _place_pills(self):
         """ Places pills in empty cells based on pill_chance value. """
-        if self.chances['pill'] > 1:
-            raise MyException(
-                "Error: Fruit Chance should be in the range [0,1]")
 
         pills = []
-        walls = sum([row.count(WALL) for row in self.board])
-        cells = len(self.board) * len(self.board[0])
-        total_pills = math.floor(self.chances['pill'] * (cells - 1 - walls))
-
-        pill_count = 0
-        while pill_count != total_pills:
-            for row_count, row in enumerate(self.board):
-                if pill_count == total_pills:
-                    break
-                for column_count, cell in enumerate(row):
-                    if pill_count == total_pills:
-                        break
-                    if cell != WALL and cell != PILL and \
-                            not (row_count == 0 and column_count == 0):
-                        rng = random.random()
-                        if rng <= self.chances['pill']:
-                            self._place([row_count, column_count], PILL)
-                            pills.append([row_count, column_count])
-                            pill_count += 1
+        for row, column in self._choose_pill_cells():
+            self._place([row, column], PILL)
+            pills.append([row, column])
+            self.pill_index.add([row, column])
+        return pills
 
-        # has to have at least one pill
-        if pill_count == 0:
-            while pill_count != 1:
-                width = len(self.board[0])
-                height = len(self.board)
-                rand_row = random.randint(0, height - 1)
-                rand_column = random.randint(0, width - 1)
+    def _choose_pill_cells(self):
+        """ Picks the cells pills are placed on with a random mask over the open cells.
 
-                if self.board[rand_row][rand_column] == EMPTY_CELL and \
-                        not (rand_row == 0 and rand_column == 0):
+        pill_chance of the open cells are picked, at least one. Cells are returned
+        row by row.
+        """
+        if self.chances['pill'] > 1:
+            raise MyException(
+                "Error: Pill Chance should be in the range [0,1]")
 
-                    self._place([rand_row, rand_column], PILL)
-                    pills.append([rand_row, rand_column])
-                    break
+        candidates = self.template.pill_cells
+        walls = len(self.template.walls)
+        total_pills = math.floor(self.chances['pill'] * (self.width * self.height - 1 - walls))
 
-        return pills
+        # has to have at least one pill
+        total_pills = min(max(total_pills, 1), len(candidates))
+
+        mask = numpy.zeros(len(candidates), dtype=bool)
+        mask[numpy.random.permutation(len(candidates))[:total_pills]] = True
+        return candidates[mask].tolist()
 
     def _place_fruit(self):
         """ Place fruit on board based on chance value. If fruit already
@@ -297,6 +406,7 @@ class GPac():
         if self.board[loc[0]][loc[1]] == PILL:
             self.consumed['pill'] += 1
             self.locations[PILL].remove(loc)
+            self.pill_index.remove(loc)
             self._remove(loc)
             return PILL_COLLISION
 
@@ -384,6 +494,21 @@ class GPac():
     #########################   Utilities    ##########################
     ###################################################################
 
+    def cell_at(self, location):
+        """ Returns the unit type stored on the board at location. """
+        return self.board[location[0]][location[1]]
+
+    def state_key(self):
+        """ Returns a hashable summary of everything that changes during a game: unit
+        locations, the fruit and the number of pills and fruit eaten.
+        """
+        return (tuple(tuple(self.locations[unit]) for unit in (PACMAN, *GHOST)),
+                tuple(self.locations[FRUIT] or ()), self.consumed['pill'], self.consumed['fruit'])
+
+    def get_rows(self):
+        """ Returns the board as a tuple of rows so that it can be hashed. """
+        return tuple(tuple(row) for row in self.board)
+
     @staticmethod
     def neg_index_to_positive(value, max_val):
         """ Converts negative index value to positive"""
@@ -468,7 +593,7 @@ class GPac():
         print(f"GPac by Jordan Sosnowski \t{self.time - self.time_elapsed}")
         print('-' * (self.width + 1))
 
-        board = copy.deepcopy(self.board)
+        board = [list(row) for row in self.get_rows()]
         pacman_loc = self.locations[PACMAN]
         board[pacman_loc[0]][pacman_loc[1]] = PACMAN
 
@@ -502,12 +627,349 @@ class GPac():
         args: list of args to log related to the log_type
         """
 
+        if not self.log:
+            return
+
         log_type = log_type.replace('#', 'w')
         self.world_contents += ' '.join([log_type, *args, '\n'])
 
     def _log_turn(self):
         """ Logs current turn. Calculates score and passses to log_world."""
 
-        current_score = self._calculate_score()
-        self._log_world('t', str(self.time - self.time_elapsed), str(current_score))
+        if self.log:
+            current_score = self._calculate_score()
+            self._log_world('t', str(self.time - self.time_elapsed), str(current_score))
         self.time_elapsed += 1
+
+
+class WorldLog:
+    """ Append only buffer for world file contents.
+
+    Lines are kept in a list and only joined when the contents are requested,
+    so logging stays linear in the length of the game.
+    """
+
+    def __init__(self, header=''):
+        self.lines = [header]
+
+    def append(self, line):
+        """ Adds a line to the end of the log. """
+        self.lines.append(line)
+
+    def __str__(self):
+        if len(self.lines) > 1:
+            self.lines = [''.join(self.lines)]
+        return self.lines[0]
+
+
+class StateHistory:
+    """ Remembers the game states of the last window turns. """
+
+    def __init__(self, window):
+        self.window = window
+        self.states = collections.deque()
+        self.seen = collections.Counter()
+
+    def repeated(self, state):
+        """ Adds state to the history. Returns True if it was seen within the window. """
+
+        if self.seen[state]:
+            return True
+        self.states.append(state)
+        self.seen[state] += 1
+        if len(self.states) > self.window:
+            self.seen[self.states.popleft()] -= 1
+        return False
+
+
+class ArrayGPac(GPac):
+    """ GPac engine backed by a flat bytearray of cell codes.
+
+    Unit locations are stored as tuples, pills are stored in a set and the world
+    file is logged into a WorldLog. Game rules are inherited from GPac, so both
+    engines play the exact same game for the same random seed.
+    """
+
+    ###################################################################
+    #######################     Core    ###############################
+    ###################################################################
+
+    @staticmethod
+    def _create_board(template):
+        """ Copies the template's cell codes into a bytearray. """
+        return bytearray(template.codes)
+
+    @staticmethod
+    def _create_world_log(width, height):
+        """ Returns a WorldLog so that logging does not copy the world contents. """
+        return WorldLog(f'{width}\n{height}\n')
+
+    def _read_walls(self):
+        """ Adds walls to log file """
+
+        walls = list(self.template.walls)
+        if self.log:
+            for wall in walls:
+                self._place(wall, WALL)
+        return walls
+
+    ###################################################################
+    #####################     Placement    ############################
+    ###################################################################
+
+    def _place_pacman(self):
+        """ Places pacman. Returns location to be added to location dict"""
+
+        self._place((0, 0), PACMAN)
+        return (0, 0)
+
+    def _place_ghosts(self):
+        """ Place ghosts on board. Returns dict to be merged with locations """
+
+        locations = {}
+        for ghost in GHOST:
+            location = (self.height - 1, self.width - 1)
+            locations[ghost] = location
+            self._place(location, ghost)
+        return locations
+
+    def _place_pills(self):
+        """ Places pills in empty cells based on pill_chance value. """
+
+        pills = set()
+        for row, column in self._choose_pill_cells():
+            self._place((row, column), PILL)
+            pills.add((row, column))
+            self.pill_index.add((row, column))
+        return pills
+
+    def _place_fruit(self):
+        """ Place fruit on board based on chance value. If fruit already
+        exists do not place anything as only one fruit can be on the board at a time. """
+
+        if self.chances['fruit'] > 1:
+            raise MyException(
+                "Error: Fruit Chance should be in the range [0,1]")
+
+        # check if board has fruit
+        if self.locations.get(FRUIT, None):
+            return self.locations.get(FRUIT)
+
+        rng = random.random()
+        if rng <= self.chances['fruit']:
+            # loop until a location that is free is found
+            while True:
+                rand_row = random.randint(0, self.height - 1)
+                rand_column = random.randint(0, self.width - 1)
+
+                if self.board[rand_row * self.width + rand_column] == EMPTY_CODE:
+                    self._place((rand_row, rand_column), FRUIT)
+                    return (rand_row, rand_column)
+        return None
+
+    ###################################################################
+    #####################   Unit Interaction    #######################
+    ###################################################################
+
+    def _remove(self, location):
+        """ Removes a unit from the board. """
+        self.board[location[0] * self.width + location[1]] = EMPTY_CODE
+
+    def _place(self, location, unit_type, log=True):
+        """ Places unit on board and log to file.
+
+        location - unit's location
+        unit_type - unit type (i.e. for pacman it would be 'p'
+        """
+        if unit_type == PILL or unit_type == FRUIT:
+            self.board[location[0] * self.width + location[1]] = CELL_CODES[unit_type]
+
+        if log:
+            x_loc, y_loc = self._convert_coordinates(location)
+            self._log_world(unit_type, str(x_loc), str(y_loc))
+
+    def _pacman_collision(self):
+        """ handles pacman collisions """
+
+        loc = self.locations[PACMAN]
+        for ghost in GHOST:
+            if loc == self.locations[ghost]:
+                return GHOST_COLLISION  # GAMEOVER
+
+        # collides with pill
+        if self.board[loc[0] * self.width + loc[1]] == PILL_CODE:
+            self.consumed['pill'] += 1
+            self.locations[PILL].discard(loc)
+            self.pill_index.remove(loc)
+            self._remove(loc)
+            return PILL_COLLISION
+
+        # collides with fruit
+        if self.locations[FRUIT] == loc:
+            self.consumed['fruit'] += 1
+            self.locations[FRUIT] = ()
+            self._remove(loc)
+            return FRUIT_COLLISION
+
+        return NO_COLLISION
+
+    def get_all_spots_around_cell(self, cell):
+        """ Gets all spots around the passed cell.
+
+        Does not look at any game logic just gets the raw cells around a cell.
+        """
+
+        row, column = cell
+        possible_spots = ((row + 1, column), (row, column + 1),
+                          (row - 1, column), (row, column - 1), (row, column))
+        return [spot for spot in possible_spots
+                if 0 <= spot[0] < self.height and 0 <= spot[1] < self.width]
+
+    def get_spots_around_unit(self, unit_type):
+        """ Gets all legal spots around the passed cell.
+
+        For instance ghosts cannot move through ghosts so there is
+        special logic for that unit.
+        """
+
+        cell = self.locations[unit_type]
+        final_spots = []
+        for spot in self.get_all_spots_around_cell(cell):
+            if unit_type in GHOST and cell == spot:
+                continue
+            if self.board[spot[0] * self.width + spot[1]] == WALL_CODE:
+                continue
+            final_spots.append(spot)
+
+        return final_spots
+
+    ###################################################################
+    #########################   Utilities    ##########################
+    ###################################################################
+
+    def cell_at(self, location):
+        """ Returns the unit type stored on the board at location. """
+        return CELL_TYPES[self.board[location[0] * self.width + location[1]]]
+
+    def get_rows(self):
+        """ Returns the board as a tuple of rows so that it can be hashed. """
+        return tuple(tuple(CELL_TYPES[code] for code in self.board[row:row + self.width])
+                     for row in range(0, len(self.board), self.width))
+
+    def cardinal_to_location(self, direction, current_position, unit_type):
+        """ Translates cardinal direction to location
+
+        Locations wrap around the board the same way GPac's logging does.
+
+        direction - cardinal direction
+        current_position - current location of unit
+        unit_type - type of unit in question
+        """
+        # pylint: disable=unused-argument,arguments-differ
+
+        row_offset, column_offset = OFFSETS.get(direction, (0, 0))
+        return ((current_position[0] + row_offset) % self.height,
+                (current_position[1] + column_offset) % self.width)
+
+    def _convert_coordinates(self, coordinates):
+        """ Converts input coordinates as if the origin of the board was bottom left """
+        return coordinates[1], self.height - coordinates[0] - 1
+
+    ###################################################################
+    ##########################   Log    ###############################
+    ###################################################################
+
+    def _log_world(self, log_type, *args):
+        """ Logs info to buffer with the following format:
+        log_type args[0] args[1] ... args[n]
+
+        log_type: type of unit being logged
+        args: list of args to log related to the log_type
+        """
+
+        if not self.log:
+            return
+
+        log_type = log_type.replace('#', 'w')
+        self.world_contents.append(' '.join([log_type, *args, '\n']))
+
+
+# game engines selectable from the solver config
+ENGINES = {'list': GPac, 'array': ArrayGPac}
+
+
+@contextlib.contextmanager
+def seeded_random(seed):
+    """ Seeds the random generators games draw from with seed for the body of a with
+    statement. Their previous states are restored afterwards, so playing a game doesn't
+    change the random stream of the caller.
+    """
+
+    states = random.getstate(), numpy.random.get_state()
+    random.seed(seed)
+    numpy.random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(states[0])
+        numpy.random.set_state(states[1])
+
+
+def play_game(game, controllers):
+    """ Plays game until it is over and returns the final score.
+
+    controllers - (pacman, ghost) callables that take the game and a unit type and
+    return the direction the unit should move in. Every move of a turn is picked
+    before any unit moves.
+    """
+
+    pacman_controller, ghost_controller = controllers
+    score = 0
+    while not game.is_gameover:
+        pacman_move = pacman_controller(game, PACMAN)
+        ghost_moves = [ghost_controller(game, ghost) for ghost in GHOST]
+
+        game.move(pacman_move, PACMAN)
+        for move, ghost in zip(ghost_moves, GHOST):
+            game.move(move, ghost)
+        score = game.turn()[0]
+    return score
+
+
+def simulate_batch(controllers, maps, seeds, n_games, pill_chance=0.5, fruit_chance=0.01,
+                   fruit_score=10, time_multiplier=2, engine='array', log=False):
+    """ Plays n_games headless games and returns their scores with the games played per second.
+
+    Each map is parsed once and its game is reset in place between games. Game i is
+    played on maps[i % len(maps)] with the random generators seeded with seeds[i]. The
+    caller's random state is restored afterwards, see seeded_random.
+
+    controllers - (pacman, ghost) callables, see play_game
+    maps - map file paths
+    seeds - a seed for every game, or a single int to count up from
+    n_games - number of games to play
+    log - whether the world file is logged, off by default as it is never read
+    """
+    # pylint: disable=too-many-arguments
+
+    if isinstance(seeds, int):
+        seeds = range(seeds, seeds + n_games)
+    if len(seeds) < n_games:
+        raise MyException("Error: a seed is needed for every game")
+
+    # games are reset before they are played, so the numbers drawn to build them don't matter
+    with seeded_random(seeds[0] if n_games else 0):
+        games = [ENGINES[engine](map_filepath, pill_chance, fruit_chance, fruit_score,
+                                 time_multiplier, log=log) for map_filepath in maps]
+
+    scores = numpy.zeros(n_games)
+    start = time.perf_counter()
+    for index in range(n_games):
+        game = games[index % len(games)]
+        with seeded_random(seeds[index]):
+            game.reset()
+            scores[index] = play_game(game, controllers)
+    elapsed = time.perf_counter() - start
+
+    games_per_second = n_games / elapsed if elapsed else float('inf')
+    return scores, games_per_second
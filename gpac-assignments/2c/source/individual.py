@@ -1,22 +1,31 @@
 """ Individual Module. Contains Individual class definition. """
 
+import collections
 import string
 import random
 
+# enough to replay a game turn by turn, see Solver.world_log
+Game = collections.namedtuple('Game', ['pacman', 'ghost', 'map_filepath', 'seed', 'turns'])
+
 
 class Individual:
     """ Individual Class
 
-    Stores important information such as game score, fitness, world contents,
-    and tree.
+    Stores important information such as game score, fitness, the Game it was
+    evaluated on, and tree.
     """
 
-    def __init__(self, score, raw_score, contents, head_node, name=None):
+    def __init__(self, score, raw_score, game, head_node, name=None):
         self.fitness = score
         self.score = raw_score
-        self.contents = contents
+        self.game = game
         self.head_node = head_node
 
+        # scores at each racing checkpoint and how the game ended
+        self.checkpoints = None
+        self.stagnated = False
+        self.abandoned = False
+
         if name is None:
             self.name = self.get_random_string()
         else:
@@ -0,0 +1,126 @@
+""" Island model support. Islands evolve their own populations and every few generations
+send their best individuals to neighbouring islands.
+
+Every island has an inbox queue. Inboxes are local queues when all islands run on one
+machine, or proxies to queues held by a QueueManager server when islands run on
+several machines.
+"""
+
+import queue
+import random
+from multiprocessing.managers import BaseManager
+from utilities import MyException
+
+RING = 'ring'
+FULLY_CONNECTED = 'fully_connected'
+RANDOM = 'random'
+TOPOLOGIES = (RING, FULLY_CONNECTED, RANDOM)
+
+# inboxes held by a migration server
+_inboxes = []
+
+
+def neighbours(island, n_islands, topology):
+    """ Returns the islands that island sends its migrants to. """
+
+    others = [other for other in range(n_islands) if other != island]
+    if not others:
+        return []
+    if topology == RING:
+        return [(island + 1) % n_islands]
+    if topology == FULLY_CONNECTED:
+        return others
+    if topology == RANDOM:
+        return [random.choice(others)]
+    raise MyException(f"Error: unknown migration topology {topology}")
+
+
+class Migration:
+    """ Exchanges migrants between an island and its neighbours.
+
+    island - id of this island
+    inboxes - one queue per island, None for islands that no process reads
+    interval - number of generations between migrations
+    topology - one of TOPOLOGIES
+    migrants - number of individuals of each population that are sent
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, island, inboxes, interval, topology=RING, migrants=1):
+        self.island = island
+        self.inboxes = inboxes
+        self.interval = interval
+        self.topology = topology
+        self.migrants = migrants
+        self.sent = 0
+        self.received = 0
+
+    def exchange(self, generation, pacman_population, ghost_population):
+        """ Every interval generations sends the best individuals of both populations to the
+        neighbours. Migrants waiting in the inbox replace the worst individuals.
+
+        Receiving never blocks, migrants that have not arrived yet are picked up at
+        the next migration. Returns the new populations.
+        """
+
+        if self.interval <= 0 or generation % self.interval:
+            return pacman_population, ghost_population
+
+        message = (sorted(pacman_population, reverse=True)[:self.migrants],
+                   sorted(ghost_population, reverse=True)[:self.migrants])
+        for neighbour in neighbours(self.island, len(self.inboxes), self.topology):
+            if self.inboxes[neighbour] is None:
+                continue
+            self.inboxes[neighbour].put(message)
+            self.sent += 1
+
+        while True:
+            try:
+                pacmans, ghosts = self.inboxes[self.island].get_nowait()
+            except queue.Empty:
+                break
+            pacman_population = self._replace_worst(pacman_population, pacmans)
+            ghost_population = self._replace_worst(ghost_population, ghosts)
+            self.received += 1
+        return pacman_population, ghost_population
+
+    @staticmethod
+    def _replace_worst(population, migrants):
+        """ Replaces the worst individuals of population with migrants. """
+
+        migrants = migrants[:len(population)]
+        survivors = sorted(population, reverse=True)[:len(population) - len(migrants)]
+        return survivors + migrants
+
+
+def parse_address(address):
+    """ Converts a "host:port" string to a (host, port) address. """
+
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+class QueueManager(BaseManager):
+    """ Serves island inboxes over the network. """
+
+
+def _get_inbox(island):
+    return _inboxes[island]
+
+
+def serve_inboxes(address, authkey, n_islands):
+    """ Serves an inbox for every island at address until the process is stopped. """
+
+    _inboxes[:] = [queue.Queue() for _ in range(n_islands)]
+    QueueManager.register('get_inbox', callable=_get_inbox)
+    manager = QueueManager(address=address, authkey=authkey)
+    manager.get_server().serve_forever()
+
+
+def connect_inboxes(address, authkey, n_islands):
+    """ Connects to the migration server at address. Returns a proxy for every inbox. """
+
+    QueueManager.register('get_inbox')
+    manager = QueueManager(address=address, authkey=authkey)
+    manager.connect()
+    return [manager.get_inbox(island) for island in range(n_islands)]
@@ -1,6 +1,9 @@
 """ Node module. Implements functionality for node object. """
 
 import random
+import hashlib
+from array import array
+import numpy
 import gpac
 from utilities import MyException
 
@@ -62,11 +65,47 @@ def rand(arg_a, arg_b):
     return random.uniform(arg_a, arg_b)
 
 
+def vector_div(arg_a, arg_b):
+    """ Protected division over numpy arrays. Elements divided by zero are 0. """
+
+    arg_a, arg_b = numpy.broadcast_arrays(numpy.asarray(arg_a, dtype=float),
+                                          numpy.asarray(arg_b, dtype=float))
+    return numpy.divide(arg_a, arg_b, out=numpy.zeros(arg_a.shape), where=arg_b != 0)
+
+
+def vector_rand(arg_a, arg_b, rows):
+    """ Random function over numpy arrays. Draws one value for each of the rows from numpy's
+    random generator, also when both arguments are constants.
+    """
+
+    return numpy.random.uniform(numpy.minimum(arg_a, arg_b), numpy.maximum(arg_a, arg_b), rows)
+
+
 operation_functions = {'*': mul, '+': add, '-': sub, '/': div, 'RAND': rand}
 
+# templates used when compiling trees to python source
+operation_templates = {'*': '({} * {})', '+': '({} + {})', '-': '({} - {})',
+                       '/': 'div({}, {})', 'RAND': 'rand({}, {})'}
+# vector functions take the number of rows as their last argument
+vector_templates = {**operation_templates, 'RAND': 'rand({}, {}, rows)'}
+operation_namespace = {'div': div, 'rand': rand}
+vector_namespace = {'div': vector_div, 'rand': vector_rand}
+pacman_arguments = {GHOST_DISTANCE: 'ghost_distance', PILL_DISTANCE: 'pill_distance',
+                    WALL_DISTANCE: 'walls', FRUIT_DISTANCE: 'fruit_distance',
+                    GHOST_SHORTEST_PATH: 'ghost_shortest'}
+ghost_arguments = {GHOST_DISTANCE: 'ghost_distance', PACMAN_DISTANCE: 'pacman_distance',
+                   PACMAN_SHORTEST_PATH: 'pacman_shortest'}
+
 
 class Node:
-    """ Node class to be used with Tree based GP Solver """
+    """ Node class to be used with Tree based GP Solver
+
+    Height and size of a node are cached. They are dropped along the path to the root
+    whenever the subtree below a node is changed.
+    """
+
+    __slots__ = ('tree_type', 'max_depth', 'depth', 'unit', 'data', 'children', 'parent',
+                 'height', 'size', 'compiled', 'vector_compiled')
 
     def __init__(self, depth=0, children=None, data=None, tree_type='grow', depth_limit=None,
                  max_depth=4, unit=gpac.PACMAN):
@@ -77,7 +116,7 @@ class Node:
             self.max_depth = max_depth
         self.depth = depth
         self.unit = unit
-        if data:
+        if data is not None:
             self.data = data
         else:
             self.data = self.generate_value()
@@ -85,7 +124,27 @@ class Node:
             self.children = children
         else:
             self.children = [None, None]
+        self.parent = None
+        for child in self.children:
+            if child:
+                child.parent = self
         self.height = None
+        self.size = None
+        self.compiled = None
+        self.vector_compiled = None
+
+    def __getstate__(self):
+        # compiled functions cannot be pickled and are rebuilt on first use
+        state = {slot: getattr(self, slot) for slot in self.__slots__}
+        state['compiled'] = None
+        state['vector_compiled'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.parent = None
+        self.size = None
+        for slot, value in state.items():
+            setattr(self, slot, value)
 
     def generate_value(self):
         """ Generate value for node. """
@@ -132,7 +191,9 @@ class Node:
                 if current.data in operations:
                     current.grow()
                 self.children[element] = current
+                current.parent = self
 
+        self.invalidate()
         self.get_height()
 
     def to_list(self, node_list=None):
@@ -151,13 +212,14 @@ class Node:
                 node_list = child.to_list(node_list)
         return node_list
 
-    def get_total_nodes(self, count=1):
-        """ Calculating the total number of nodes in a tree. """
+    def get_total_nodes(self):
+        """ Calculating the total number of nodes in a tree. The count is cached
+        until the subtree changes.
+        """
 
-        for child in self.children:
-            if child:
-                count = 1 + child.get_total_nodes(count)
-        return count
+        if self.size is None:
+            self.size = 1 + sum(child.get_total_nodes() for child in self.children if child)
+        return self.size
 
     def update_depth(self, depth):
         """ Update the depth values of a node and its children. """
@@ -173,6 +235,10 @@ class Node:
 
         self.data = other.data
         self.children = other.children
+        for child in self.children:
+            if child:
+                child.parent = self
+        self.invalidate()
 
         self.update_depth(self.depth)
         self.get_height()
@@ -183,22 +249,13 @@ class Node:
         Recursively call get_height on children and pick the highest number
         from the two children and add by one.
         If there is no children then the node is a leaf node and therefore its height is 0.
+        The height is cached until the subtree changes.
         """
 
-        if self.children[0]:
-            child_one_height = self.children[0].get_height()
-        else:
-            child_one_height = -1
-
-        if self.children[1]:
-            child_two_height = self.children[1].get_height()
-        else:
-            child_two_height = -1
-
-        height = max(child_one_height, child_two_height) + 1
-
-        self.height = height
-        return height
+        if self.height is None:
+            heights = [child.get_height() for child in self.children if child]
+            self.height = max(heights, default=-1) + 1
+        return self.height
 
     def parse_tree(self, prior='', depth=0):
         """ Parses Tree from current node. Returns parsed tree in a string format. """
@@ -210,13 +267,99 @@ class Node:
         output = prior + output
         return output
 
+    def is_deterministic(self):
+        """ Whether the tree always gives the same value for the same sensors, that is
+        it has no RAND nodes.
+        """
+
+        return self.data != 'RAND' and \
+            all(child.is_deterministic() for child in self.children if child)
+
+    def canonical_hash(self):
+        """ Returns hash identifying the tree's structure and unit. Trees that parse to the
+        same expression for the same unit share a hash no matter what depth they start at.
+        """
+
+        unit = gpac.PACMAN if self.unit == gpac.PACMAN else 'ghost'
+        return hashlib.sha1(f'{unit}\n{self.parse_tree()}'.encode()).hexdigest()
+
     def calculate(self, *args, **kwargs):
-        """ Evaluates node of current individual. Checks first
-        if it is a Pacman controller or a Ghost one.
+        """ Evaluates node of current individual using its compiled function.
+        Takes the same arguments as calculate_pacman or calculate_ghost depending on the unit.
+        """
+
+        return self.compile_tree()(*args, **kwargs)
+
+    def invalidate(self):
+        """ Drops the cached compiled functions, height and size of this node and of
+        every node above it. Needs to be called when the subtree below a node changes.
+        """
+
+        current = self
+        while current is not None:
+            current.compiled = None
+            current.vector_compiled = None
+            current.height = None
+            current.size = None
+            current = current.parent
+
+    def calculate_vector(self, sensors):
+        """ Evaluates the tree for every row of a sensor matrix in a single pass.
+
+        sensors - numpy array with one row of sensor values per candidate cell, ordered like
+        the arguments of calculate_pacman or calculate_ghost
+        """
+
+        if self.vector_compiled is None:
+            self.vector_compiled = self._compile(vector_namespace)
+        return numpy.broadcast_to(self.vector_compiled(*sensors.T, len(sensors)),
+                                  (len(sensors),))
+
+    def compile_tree(self):
+        """ Compiles the tree into a single python function and caches it on this node.
+
+        The function evaluates children left to right just like calculate_pacman and
+        calculate_ghost, so RAND nodes draw the same random numbers in the same order.
+        """
+
+        if self.compiled is None:
+            self.compiled = self._compile(operation_namespace)
+        return self.compiled
+
+    def _compile(self, namespace):
+        """ Builds function for the tree using the div and rand functions from namespace. """
+
+        arguments = pacman_arguments if self.unit == gpac.PACMAN else ghost_arguments
+        vector = namespace is vector_namespace
+        names = list(arguments.values()) + (['rows'] if vector else [])
+        templates = vector_templates if vector else operation_templates
+        try:
+            source = f"lambda {', '.join(names)}: {self.to_source(arguments, templates)}"
+            return eval(source, dict(namespace))  # pylint: disable=eval-used
+        except (SyntaxError, RecursionError, MemoryError):
+            # tree is too deep for the python compiler, fall back to interpreting it
+            interpreted = self.calculate_pacman if self.unit == gpac.PACMAN \
+                else self.calculate_ghost
+            if vector:
+                vectorized = numpy.vectorize(interpreted)
+                return lambda *values: vectorized(*values[:-1])
+            return interpreted
+
+    def to_source(self, arguments, templates=None):
+        """ Converts tree to a python expression.
+
+        arguments - dictionary mapping sensors to argument names
+        templates - dictionary mapping operations to source templates, operation_templates
+        by default
         """
 
-        func = self.calculate_pacman if self.unit == gpac.PACMAN else self.calculate_ghost
-        return func(*args, **kwargs)
+        templates = templates or operation_templates
+        if self.data in operations:
+            return templates[self.data].format(self.children[0].to_source(arguments, templates),
+                                               self.children[1].to_source(arguments, templates))
+        if self.data in arguments:
+            return arguments[self.data]
+        return repr(self.data)
 
     def calculate_ghost(self, ghost_distance, pacman_distance, pacman_shortest):
         """ Evaluates tree of Ghost controller """
@@ -267,3 +410,121 @@ class Node:
         elif data == GHOST_SHORTEST_PATH:
             data = ghost_shortest
         return data
+
+
+class PrefixTree:
+    """ Tree flattened into prefix order. Used by the variation operators so that
+    children are built from slices of their parents instead of deep copies.
+
+    values - data of every node in prefix order
+    sizes - number of nodes in the subtree rooted at every position
+    heights - height of the subtree rooted at every position
+    depths - depth of every position
+    unit, tree_type and max_depth are stored once for the whole tree.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, values, sizes, heights, depths, unit, tree_type, max_depth):
+        self.values = values
+        self.sizes = sizes
+        self.heights = heights
+        self.depths = depths
+        self.unit = unit
+        self.tree_type = tree_type
+        self.max_depth = max_depth
+        self.levels = None
+
+    @classmethod
+    def from_node(cls, head):
+        """ Flattens the tree below head. """
+
+        values = []
+        depths = array('i')
+        arities = []
+        stack = [(head, head.depth)]
+        while stack:
+            current, depth = stack.pop()
+            children = [child for child in current.children if child]
+            values.append(current.data)
+            depths.append(depth)
+            arities.append(len(children))
+            stack.extend((child, depth + 1) for child in reversed(children))
+
+        # children follow their parent, so sizes and heights are filled in from the back
+        sizes = array('i', [1]) * len(values)
+        heights = array('i', [0]) * len(values)
+        for index in reversed(range(len(values))):
+            child = index + 1
+            for _ in range(arities[index]):
+                sizes[index] += sizes[child]
+                heights[index] = max(heights[index], heights[child] + 1)
+                child += sizes[child]
+        return cls(values, sizes, heights, depths, head.unit, head.tree_type, head.max_depth)
+
+    @staticmethod
+    def _child_indices(sizes, index):
+        """ Positions of the children of the node at index. """
+
+        child = index + 1
+        while child < index + sizes[index]:
+            yield child
+            child += sizes[child]
+
+    def random_index(self):
+        """ Picks a random depth and then a random position at that depth, the same
+        way a node is picked from Node.to_list.
+        """
+
+        if self.levels is None:
+            self.levels = [[] for _ in range(max(self.depths) - self.depths[0] + 1)]
+            for index, depth in enumerate(self.depths):
+                self.levels[depth - self.depths[0]].append(index)
+        return random.choice(random.choice(self.levels))
+
+    def height(self, index):
+        """ Height of the subtree rooted at index. """
+
+        return self.heights[index]
+
+    def replace(self, index, other, other_index):
+        """ Returns a new tree with the subtree at index replaced by the subtree of
+        other at other_index. Neither tree is changed.
+        """
+
+        end = index + self.sizes[index]
+        other_end = other_index + other.sizes[other_index]
+        shift = self.depths[index] - other.depths[other_index]
+        delta = other.sizes[other_index] - self.sizes[index]
+
+        values = self.values[:index] + other.values[other_index:other_end] + self.values[end:]
+        sizes = self.sizes[:index] + other.sizes[other_index:other_end] + self.sizes[end:]
+        heights = self.heights[:index] + other.heights[other_index:other_end] + \
+            self.heights[end:]
+        depths = self.depths[:index] + \
+            array('i', [depth + shift for depth in other.depths[other_index:other_end]]) + \
+            self.depths[end:]
+
+        # ancestors of index hold the replaced subtree, deepest ancestors come last
+        ancestors = [ancestor for ancestor in range(index)
+                     if ancestor + self.sizes[ancestor] > index]
+        for ancestor in reversed(ancestors):
+            sizes[ancestor] += delta
+            heights[ancestor] = max(heights[child] + 1
+                                    for child in self._child_indices(sizes, ancestor))
+        return PrefixTree(values, sizes, heights, depths, self.unit, self.tree_type,
+                          self.max_depth)
+
+    def to_node(self):
+        """ Builds the Node tree. Returns its head. """
+
+        nodes = [None] * len(self.values)
+        for index in reversed(range(len(self.values))):
+            children = [nodes[child] for child in self._child_indices(self.sizes, index)]
+            children += [None] * (2 - len(children))
+
+            current = Node(self.depths[index], children, self.values[index], self.tree_type,
+                           max_depth=self.max_depth, unit=self.unit)
+            current.height = self.heights[index]
+            current.size = self.sizes[index]
+            nodes[index] = current
+        return nodes[0]
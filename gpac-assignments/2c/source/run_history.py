@@ -0,0 +1,57 @@
+""" Per-generation statistics of a run. A population is reduced to a Generation row as
+soon as it is logged so it can be released.
+"""
+
+import collections
+import numpy
+
+Generation = collections.namedtuple('Generation', ['evals', 'size', 'score_sum', 'best_score'])
+# columns of a saved history
+COLUMNS = [('run', '<i4'), ('evals', '<i8'), ('size', '<i8'), ('average', '<f8'), ('best', '<f8')]
+
+
+def summarize(evals, population):
+    """ Returns the Generation row of a population logged after evals evaluations. """
+
+    scores = [member.score for member in population]
+    return Generation(evals, len(scores), sum(scores), max(scores))
+
+
+def merge(rows):
+    """ Joins rows logged at the same evaluation count, such as the rows of every island. """
+
+    rows = list(rows)
+    return Generation(rows[0].evals, sum(row.size for row in rows),
+                      sum(row.score_sum for row in rows), max(row.best_score for row in rows))
+
+
+def average(row):
+    """ Average score of a row's population. """
+
+    return round(row.score_sum / row.size, 2)
+
+
+def save(filepath, runs):
+    """ Writes the rows of every run to a columnar .npy file. The file holds a single record
+    with one field per column (run, evals, size, average and best), so every column is
+    stored contiguously and can be read from a memory map with load. Averages are rounded
+    like the ones written to the text log.
+    """
+
+    rows = [(run, *row) for run, generations in enumerate(runs) for row in generations]
+    columns = numpy.array(rows, dtype=float).reshape(-1, len(Generation._fields) + 1)
+    history = numpy.zeros((), dtype=[(name, dtype, (len(rows),)) for name, dtype in COLUMNS])
+    history['run'] = columns[:, 0]
+    history['evals'] = columns[:, 1]
+    history['size'] = columns[:, 2]
+    history['average'] = [average(Generation(*row[1:])) for row in rows]
+    history['best'] = columns[:, 4]
+    numpy.save(filepath, history)
+
+
+def load(filepath):
+    """ Memory-maps a file written by save. Columns are read by name, such as
+    history['best'].
+    """
+
+    return numpy.load(filepath, mmap_mode='r')
@@ -3,10 +3,17 @@
 Modified code based on https://www.geeksforgeeks.org/shortest-path-in-a-binary-maze/
 """
 
+import os
+import hashlib
 from collections import deque
 from functools import lru_cache
+from pathlib import Path
+import numpy
 import gpac
 
+# distance tables already loaded by this process keyed by map filepath
+_distance_tables = {}
+
 
 class queueNode:
     """ A data structure for queue used in BFS. """
@@ -74,3 +81,80 @@ def BFS(mat, src: tuple, dest: tuple):
 
     # Return -1 if destination cannot be reached
     return -1
+
+
+def build_distance_table(mat):
+    """ Runs a BFS from every open cell of the board and returns the distance between every
+    pair of cells. Cells are indexed row by row, so cell (row, col) has index row * width + col.
+
+    Walls never change during a game, so the table is valid for the whole game.
+    Distances to or from walls and unreachable cells are -1, same as BFS.
+    """
+
+    height = len(mat)
+    width = len(mat[0])
+    cells = width * height
+    is_open = [mat[index // width][index % width] != gpac.WALL for index in range(cells)]
+
+    # open neighbours of every cell
+    neighbours = [[] for _ in range(cells)]
+    for index in range(cells):
+        if not is_open[index]:
+            continue
+        row, col = divmod(index, width)
+        for row_offset, col_offset in ((-1, 0), (0, -1), (0, 1), (1, 0)):
+            if isValid(row + row_offset, col + col_offset, mat):
+                neighbour = index + row_offset * width + col_offset
+                if is_open[neighbour]:
+                    neighbours[index].append(neighbour)
+
+    table = numpy.full((cells, cells), -1, dtype=numpy.int16)
+    for source in range(cells):
+        if not is_open[source]:
+            continue
+        distances = [-1] * cells
+        distances[source] = 0
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            dist = distances[current] + 1
+            for neighbour in neighbours[current]:
+                if distances[neighbour] == -1:
+                    distances[neighbour] = dist
+                    queue.append(neighbour)
+        table[source] = distances
+    return table
+
+
+def load_distance_table(map_filepath, cache_dir=None):
+    """ Returns the distance table for a map file. Tables are built at most once per process.
+
+    If cache_dir is provided tables are saved there as .npy files named after the hash of the
+    map file and are memory-mapped on load so worker processes share a single copy.
+    """
+
+    if map_filepath in _distance_tables:
+        return _distance_tables[map_filepath]
+
+    table = None
+    if cache_dir:
+        with open(map_filepath, 'rb') as file:
+            map_hash = hashlib.sha1(file.read()).hexdigest()
+        cache_file = os.path.join(cache_dir, map_hash + '.npy')
+        if os.path.exists(cache_file):
+            table = numpy.load(cache_file, mmap_mode='r')
+
+    if table is None:
+        _, _, board = gpac.GPac._parse_map(map_filepath)  # pylint: disable=protected-access
+        table = build_distance_table(board)
+        if cache_dir:
+            # write to a temporary file first so other processes never see a partial table
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            temp_file = f'{cache_file}.{os.getpid()}.tmp'
+            with open(temp_file, 'wb') as file:
+                numpy.save(file, table)
+            os.replace(temp_file, cache_file)
+            table = numpy.load(cache_file, mmap_mode='r')
+
+    _distance_tables[map_filepath] = table
+    return table
@@ -3,19 +3,75 @@ import json
 import time
 import os
 import collections
+import concurrent.futures
 from pathlib import Path
 import random
 import glob
-import copy
+import shutil
+import hashlib
 import multiprocessing
-from functools import lru_cache
+import queue
+import traceback
 import numpy
-from PIL import Image
 import tqdm
 import gpac
 import node
 import shortest_path
 import individual
+import fitness_cache
+import ciao
+import islands
+import run_history
+import steady_state
+from utilities import MyException
+
+# solver used by pool workers, set once per worker by _init_worker
+_worker_solver = None
+
+# seconds between checks that the island processes of a run are still alive
+ISLAND_POLL_SECONDS = 1
+
+
+def _init_worker(solver):
+    """ Pool initializer. Stores the solver so tasks only need to carry the trees. """
+
+    global _worker_solver  # pylint: disable=global-statement
+    _worker_solver = solver
+
+
+def _init_run_worker(solver):
+    """ Pool initializer for run workers. Games are played in the worker itself as pool
+    workers cannot start pools of their own.
+    """
+
+    _init_worker(solver)
+    _worker_solver.workers = 1
+
+
+def _evolve_run(run):
+    """ Evolves a whole run with the worker's solver. Runs inside run workers. Returns the
+    run's result, run time, game counts and fitness cache (hits, lookups).
+
+    A worker keeps its fitness cache between the runs it plays, the counts are the run's own.
+    """
+
+    cache = _worker_solver.fitness_cache
+    _worker_solver.game_stats = collections.Counter()
+    cache.hits = cache.lookups = 0
+    _worker_solver._seed_run(run)  # pylint: disable=protected-access
+    result = _worker_solver._evolve(run)  # pylint: disable=protected-access
+    return (result, _worker_solver.run_times[-1], _worker_solver.game_stats,
+            (cache.hits, cache.lookups))
+
+
+def _calculate_fitness(task):
+    """ Plays a game with the worker's solver. Runs inside pool workers.
+
+    task - (controllers, racing reference of the solver that sent the game)
+    """
+
+    controllers, _worker_solver.racing_reference = task
+    return _worker_solver.calculate_fitness(controllers)
 
 
 class Solver():
@@ -54,6 +110,8 @@ class Solver():
             self.seed = config.get('seed')
 
             self.log_file = config.get('log_file')
+            # optional columnar .npy file with the statistics of every logged generation
+            self.history_file = config.get('history_file')
             self.ghost_solution_file = config.get('ghost_solution_file')
             self.pacman_solution_file = config.get('pacman_solution_file')
             self.highest_score_file = config.get('highest_score_file')
@@ -62,7 +120,37 @@ class Solver():
             self.max_evaluations = config.get('max_evaluations')
 
             self.algorithm = config.get('algorithm')
+            self.engine = config.get('engine', 'list')
+            self.path_cache_dir = config.get('path_cache_dir')
+            self.batch_evaluation = config.get('batch_evaluation', False)
+
+            # worker pool settings, workers default to the number of cpus
+            self.workers = config.get('workers') or os.cpu_count()
+            self.chunk_size = config.get('chunk_size', 1)
+            self.pool = None
+
+            # number of processes whole runs are spread over
+            self.run_workers = config.get('run_workers', 1)
+
+            # noisy evaluations play every pair on a random game, otherwise a pair always
+            # plays the same game and its result can be cached
+            self.noisy_evaluation = config.get('noisy_evaluation', True)
+            self.fitness_cache = fitness_cache.FitnessCache(config.get('fitness_cache_size', 0))
+
+            # games end once their state repeats within stagnation_window turns, the score
+            # at that point is the exact final score
+            self.stagnation_window = config.get('stagnation_window', 0)
+            # every racing_interval turns games trailing the best game of the last generation
+            # by more than racing_margin points are abandoned
+            self.racing_interval = config.get('racing_interval', 0)
+            self.racing_margin = config.get('racing_margin', 10)
+            self.racing_reference = None
+            self.game_stats = collections.Counter()
             self.game_instance = None
+            # sensor inputs of the current turn by cell id, one table for pacman and one
+            # shared by the ghosts
+            self.sensor_memo = ({}, {})
+            self.sensor_memo_turn = None
 
             self.top_x_percent = config.get('top_x_percent')
             self.maps = None
@@ -89,6 +177,21 @@ class Solver():
                 self.ghost_mutation_rate = config.get('ghost_mutation_rate')
                 self.pacman_mutation_rate = config.get('pacman_mutation_rate')
                 self.ciao_file = config.get('ciao_file')
+                self.ciao_opponents = config.get('ciao_opponents')
+
+                # island model, islands evolve in their own processes and exchange migrants
+                self.islands = config.get('islands', 0)
+                self.island_ids = config.get('island_ids')
+                self.island_workers = config.get('island_workers')
+                self.migration_interval = config.get('migration_interval', 5)
+                self.migration_topology = config.get('migration_topology', islands.RING)
+                self.migrants = config.get('migrants', 1)
+                self.migration_address = config.get('migration_address')
+                self.migration_authkey = config.get('migration_authkey', 'gpac')
+
+                # steady state, children are bred and played as soon as a worker is free
+                self.steady_state = config.get('steady_state', False)
+                self.games_in_flight = config.get('games_in_flight')
                 try:
                     self.ghost_parent_selection_alg = config.get(
                         'ghost_parent_selection_alg').lower()
@@ -108,7 +211,116 @@ class Solver():
         self._set_seed()
         maps = glob.glob('./maps/map*.txt')
         self.maps = maps
-        self._genetic_programming()
+
+        # parse maps and build shortest path tables before workers are forked so they are shared
+        for map_filepath in maps:
+            gpac.load_map(map_filepath)
+            shortest_path.load_distance_table(map_filepath, self.path_cache_dir)
+
+        if self.islands or self.run_workers > 1 or self.steady_state:
+            # every island or run worker plays its own games, steady state runs start
+            # executors of their own
+            self._genetic_programming()
+            return
+
+        # one pool is kept for the whole experiment
+        with self._create_pool() as pool:
+            self.pool = pool
+            try:
+                self._genetic_programming()
+            finally:
+                self.pool = None
+
+    def __getstate__(self):
+        # pools cannot be pickled, workers never need it. Workers start with an empty
+        # fitness cache of their own
+        state = self.__dict__.copy()
+        state['pool'] = None
+        state['fitness_cache'] = fitness_cache.FitnessCache(self.fitness_cache.size)
+        state['sensor_memo'] = ({}, {})
+        state['sensor_memo_turn'] = None
+        return state
+
+    def _create_pool(self):
+        """ Creates worker pool. Each worker receives a copy of the solver once. """
+        return multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(self,))
+
+    def _evaluate(self, population):
+        """ Evaluates every (pacman, ghost) pair in population. Results are yielded
+        in the same order as population.
+
+        Unless evaluation is noisy every pair plays a game picked by hashing its trees, and
+        pairs found in the fitness cache are not played again.
+        """
+        if self.noisy_evaluation:
+            yield from self._play([self._game(pacman, ghost) for pacman, ghost in population])
+            return
+
+        keys = [self._evaluation_key(pacman, ghost) for pacman, ghost in population]
+        results = [self.fitness_cache.get(key) for key in keys]
+        played = self._play([(pacman, ghost, *key[2:]) for (pacman, ghost), key, result
+                             in zip(population, keys, results) if result is None])
+
+        for (pacman, ghost), key, result in zip(population, keys, results):
+            if result is None:
+                res = next(played)
+                # abandoned games depend on the racing reference and are not reused
+                if not res[0].abandoned:
+                    self.fitness_cache.put(key, (res[0].fitness, res[1].fitness,
+                                                 res[0].score, res[0].game.turns))
+                yield res
+            else:
+                pacman_fitness, ghost_fitness, score, turns = result
+                game = individual.Game(pacman, ghost, *key[2:], turns)
+                yield [individual.Individual(pacman_fitness, score, game, pacman),
+                       individual.Individual(ghost_fitness, score, game, ghost)]
+        played.close()
+
+    def _game(self, pacman, ghost):
+        """ Returns the (pacman, ghost, map, seed) game a pair plays. Noisy evaluations draw
+        the map and seed from the run's random stream in this process, so a game doesn't
+        depend on the worker that plays it.
+        """
+        if self.noisy_evaluation:
+            return pacman, ghost, random.choice(self.maps), random.getrandbits(32)
+        return (pacman, ghost, *self._evaluation_key(pacman, ghost)[2:])
+
+    def _evaluation_key(self, pacman, ghost):
+        """ Returns (pacman hash, ghost hash, map, seed) for the game a pair plays when
+        evaluation is not noisy. The map and seed are derived from the tree hashes.
+        """
+        pacman_hash = pacman.canonical_hash()
+        ghost_hash = ghost.canonical_hash()
+        digest = hashlib.sha1(f'{self.seed}:{pacman_hash}:{ghost_hash}'.encode()).hexdigest()
+        game_seed = int(digest[:8], 16)
+        maps = sorted(self.maps)
+        return pacman_hash, ghost_hash, maps[game_seed % len(maps)], game_seed
+
+    def _play(self, games):
+        """ Plays games on the worker pool. Results are yielded in the same order as games.
+
+        A temporary pool is used if the solver is not running.
+        """
+        for res in self._play_games(games):
+            self.game_stats['games'] += 1
+            self.game_stats['stagnated'] += res[0].stagnated
+            self.game_stats['abandoned'] += res[0].abandoned
+            yield res
+
+    def _play_games(self, games):
+        """ Plays games in this process or on a pool. """
+
+        if self.workers == 1:
+            # a single worker gains nothing from a pool
+            yield from map(self.calculate_fitness, games)
+            return
+
+        tasks = ((game, self.racing_reference) for game in games)
+        if self.pool is None:
+            with self._create_pool() as pool:
+                yield from pool.imap(_calculate_fitness, tasks, self.chunk_size)
+        else:
+            yield from self.pool.imap(_calculate_fitness, tasks, self.chunk_size)
 
     def reevaluate(self, pacman_population, ghost_population, pacman_children, ghost_children):
         """ Used for reevaluating individuals. Expects the current pacman and ghost population
@@ -128,137 +340,373 @@ class Solver():
         runs = []
         best_pacmans_overall = []
         best_ghosts_overall = []
+        results = self._evolve_runs()
         # setup progress bar for runs if correct parameter is passed
         if self.show_progress_bar:
-            run_range = tqdm.tqdm(range(self.max_runs), "Run", position=0)
+            results = tqdm.tqdm(results, "Run", total=self.max_runs, position=0)
+
+        # runs are written as they finish, the parameters are only known at the end
+        runs_file = self.log_file + '.runs'
+        self._create_path(runs_file)
+        with open(runs_file, "w") as file:
+            for count, (evaluations, best_pacman, best_ghost) in enumerate(results):
+                self._log_run(file, count, evaluations)
+                if self.history_file:
+                    runs.append(evaluations)
+                best_pacmans_overall.append(best_pacman)
+                best_ghosts_overall.append(best_ghost)
+
+        best_pacman = max(best_pacmans_overall)
+        best_ghost = max(best_ghosts_overall)
+        self._log_results(runs_file)
+        if self.history_file:
+            self._create_path(self.history_file)
+            run_history.save(self.history_file, runs)
+        self._log_world(self.world_log(best_pacman.game))
+        self._log_solution(best_pacman.head_node.parse_tree(),
+                           best_ghost.head_node.parse_tree())
+
+    def _evolve_runs(self):
+        """ Yields the result of every run in order. Every run is seeded from the config seed
+        and its run number, so it evolves the same way no matter which process runs it.
+
+        Runs are spread over run_workers processes unless islands are used.
+        """
+
+        if self.islands:
+            for run in range(self.max_runs):
+                yield self._evolve_islands(run)
+        elif self.run_workers > 1:
+            with multiprocessing.Pool(self.run_workers, initializer=_init_run_worker,
+                                      initargs=(self,)) as pool:
+                for result, run_time, game_stats, cache_counts in pool.imap(
+                        _evolve_run, range(self.max_runs)):
+                    self.run_times.append(run_time)
+                    self.game_stats.update(game_stats)
+                    self.fitness_cache.add_counts(*cache_counts)
+                    yield result
         else:
-            run_range = range(self.max_runs)
+            for run in range(self.max_runs):
+                self._seed_run(run)
+                yield self._evolve(run)
 
-        for run in run_range:
+    def _evolve(self, run, migration=None):
+        """ Evolves the populations of a run.
 
-            best_pacmans = []
-            best_ghosts = []
-            start_time = time.time()
+        migration - islands.Migration used to exchange migrants when running on an island
+        Returns a run_history.Generation row for every logged population with the run's
+        best pacman and ghost.
+        """
 
-            # create initial population for run and increase eval_counter
-            pacman_population, ghost_population = self._create_initial_populations()
-            eval_counter = len(pacman_population)
+        best_pacmans = []
+        best_ghosts = []
+        start_time = time.time()
+        ciao_plot = self._create_ciao_plot(run)
+        self.racing_reference = None
 
-            # find the best pacman and ghost
-            best_pacmans.append(max(pacman_population))
-            best_ghosts.append(max(ghost_population))
+        # create initial population for run and increase eval_counter
+        pacman_population, ghost_population = self._create_initial_populations()
+        eval_counter = len(pacman_population)
 
-            keep_going = True
-            evaluations = collections.OrderedDict()
-            evaluations[eval_counter] = pacman_population
+        # find the best pacman and ghost
+        best_pacmans.append(max(pacman_population))
+        best_ghosts.append(max(ghost_population))
+        self._extend_ciao_plot(ciao_plot, best_pacmans, best_ghosts)
+        self._update_racing_reference(pacman_population)
 
-            # setup progress bar for evaluations if correct parameter is passed
-            if self.show_progress_bar:
-                eval_range = tqdm.tqdm(range(0, self.max_evaluations - len(pacman_population),
-                                             self.pacman_children + self.pacman_parents),
-                                       "Evaluations", position=1, leave=False)
-            else:
-                eval_range = range(0, self.max_evaluations - len(pacman_population),
-                                   self.pacman_children + self.pacman_parents)
+        keep_going = True
+        evaluations = [run_history.summarize(eval_counter, pacman_population)]
 
-            for _ in eval_range:
-                if keep_going is False:
-                    break
+        # setup progress bar for evaluations if correct parameter is passed
+        if self.show_progress_bar:
+            eval_range = tqdm.tqdm(range(0, self.max_evaluations - len(pacman_population),
+                                         self.pacman_children + self.pacman_parents),
+                                   "Evaluations", position=1, leave=False)
+        else:
+            eval_range = range(0, self.max_evaluations - len(pacman_population),
+                               self.pacman_children + self.pacman_parents)
+
+        if self.steady_state:
+            self._evolve_steady_state(pacman_population, ghost_population, evaluations,
+                                      best_pacmans, best_ghosts, ciao_plot, migration)
+            # the generational loop has nothing left to do
+            eval_range = ()
+
+        for generation, _ in enumerate(eval_range, 1):
+            if keep_going is False:
+                break
 
-                # parent selection
-                pacman_parents = self.parent_selection(pacman_population, gpac.PACMAN)
-                ghost_parents = self.parent_selection(ghost_population, gpac.GHOST)
+            # parent selection
+            pacman_parents = self.parent_selection(pacman_population, gpac.PACMAN)
+            ghost_parents = self.parent_selection(ghost_population, gpac.GHOST)
 
-                # recombination and mutation
-                pacman_children = self.child_selection(pacman_parents, gpac.PACMAN)
-                ghost_children = self.child_selection(ghost_parents, gpac.GHOST)
+            # recombination and mutation
+            pacman_children = self.child_selection(pacman_parents, gpac.PACMAN)
+            ghost_children = self.child_selection(ghost_parents, gpac.GHOST)
 
-                # revaluate
-                pacman_population, ghost_population = self.reevaluate(
-                    pacman_population, ghost_population, pacman_children, ghost_children)
+            # revaluate
+            pacman_population, ghost_population = self.reevaluate(
+                pacman_population, ghost_population, pacman_children, ghost_children)
 
-                eval_counter += len(pacman_population)
+            eval_counter += len(pacman_population)
 
-                # survival
-                pacman_population = self.survival_selection(pacman_population, gpac.PACMAN)
-                ghost_population = self.survival_selection(ghost_population, gpac.GHOST)
+            # survival
+            pacman_population = self.survival_selection(pacman_population, gpac.PACMAN)
+            ghost_population = self.survival_selection(ghost_population, gpac.GHOST)
 
-                # update max individual of generation
-                evaluations[eval_counter] = pacman_population
+            if migration:
+                pacman_population, ghost_population = migration.exchange(
+                    generation, pacman_population, ghost_population)
 
-                best_pacmans.append(max(pacman_population))
-                best_ghosts.append(max(ghost_population))
+            # update max individual of generation
+            evaluations.append(run_history.summarize(eval_counter, pacman_population))
 
-                # check termination criteria
-                keep_going = self.termination_selection(eval_counter)
+            best_pacmans.append(max(pacman_population))
+            best_ghosts.append(max(ghost_population))
+            self._extend_ciao_plot(ciao_plot, best_pacmans, best_ghosts)
+            self._update_racing_reference(pacman_population)
 
-            runs.append(evaluations)
-            self.run_times.append(time.time() - start_time)
+            # check termination criteria
+            keep_going = self.termination_selection(eval_counter)
 
-            self.gen_ciao_plot(best_pacmans, best_ghosts, run)
+        self.run_times.append(time.time() - start_time)
 
-            best_pacmans_overall.append(max(best_pacmans))
-            best_ghosts_overall.append(max(best_ghosts))
+        if ciao_plot:
+            ciao_plot.render(self._ciao_path(run, os.path.splitext(self.ciao_file)[1]))
 
-        best_pacman = max(best_pacmans_overall)
-        best_ghost = max(best_ghosts_overall)
-        pacman, _ = self.create_individuals([best_pacman.head_node], [best_ghost.head_node])
-        self._log_results(runs)
-        self._log_world(pacman[0].contents, best_ghost.contents)
-        self._log_solution(best_pacman.head_node.parse_tree(),
-                           best_ghost.head_node.parse_tree())
+        return evaluations, max(best_pacmans), max(best_ghosts)
 
-    def gen_ciao_plot(self, pacmans, ghosts, run):
-        """ Create CIAO plot for experiment. """
+    # pylint: disable=too-many-arguments
+    def _evolve_steady_state(self, pacman_population, ghost_population, evaluations,
+                             best_pacmans, best_ghosts, ciao_plot, migration=None):
+        """ Evolves the populations one pair of children at a time. Every finished game
+        goes through survival selection with the current populations.
+
+        Parents are not played again. The populations are logged every μ + λ games so the
+        log matches the generational one.
+        """
 
-        fitnesses = []
+        generation_size = self.pacman_parents + self.pacman_children
+        eval_counter = evaluations[-1].evals
+        games = max(0, self.max_evaluations - eval_counter)
+
+        def breed():
+            pacman = self._breed(self.parent_selection(pacman_population, gpac.PACMAN),
+                                 self.pacman_mutation_rate)
+            ghost = self._breed(self.parent_selection(ghost_population, gpac.GHOST),
+                                self.ghost_mutation_rate)
+            return self._game(pacman, ghost), self.racing_reference
+
+        def insert(result):
+            nonlocal pacman_population, ghost_population, eval_counter
+            pacman, ghost = result
+            self.game_stats['games'] += 1
+            self.game_stats['stagnated'] += pacman.stagnated
+            self.game_stats['abandoned'] += pacman.abandoned
+            pacman_population = self.survival_selection(pacman_population + [pacman],
+                                                        gpac.PACMAN)
+            ghost_population = self.survival_selection(ghost_population + [ghost], gpac.GHOST)
+
+            eval_counter += 1
+            if eval_counter % generation_size and eval_counter < self.max_evaluations:
+                return
+            if migration:
+                pacman_population, ghost_population = migration.exchange(
+                    eval_counter // generation_size, pacman_population, ghost_population)
+            evaluations.append(run_history.summarize(eval_counter, pacman_population))
+            best_pacmans.append(max(pacman_population))
+            best_ghosts.append(max(ghost_population))
+            self._extend_ciao_plot(ciao_plot, best_pacmans, best_ghosts)
+            self._update_racing_reference(pacman_population)
 
-        for gen, pacman in enumerate(pacmans):
-            fitnesses.append([])
+        if self.workers == 1:
+            scheduler = steady_state.Scheduler(breed, self._calculate_task, insert, 1)
+            scheduler.run(games)
+            return
 
-            ghost_heads = [ghost.head_node for ghost in ghosts[:gen + 1]]
-            pacman_heads = [pacman.head_node for _ in range(gen + 1)]
-            population = list(zip(pacman_heads, ghost_heads))
-            with multiprocessing.Pool() as pool:
-                for _, res in enumerate(pool.imap_unordered(self.calculate_fitness, population)):
+        scheduler = steady_state.Scheduler(breed, _calculate_fitness, insert,
+                                           self.games_in_flight or 2 * self.workers)
+        with concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=(self,)) as executor:
+            scheduler.run(games, executor)
 
-                    fitnesses[-1].append(res[0].fitness)
+    def _calculate_task(self, task):
+        """ Plays a (controllers, racing reference) task in this process. """
 
-        data = numpy.full((len(pacmans), len(pacmans), 3), 255, dtype=numpy.uint8)
+        controllers, self.racing_reference = task
+        return self.calculate_fitness(controllers)
 
-        for row, fitness in enumerate(fitnesses):
-            fitness = Solver.normalize_fitnesses(fitness)
-            for col, fit in enumerate(fitness):
-                luminance = (1 - fit) * 255
-                data[-(row + 1)][col] = [luminance, luminance, luminance]
-        img = Image.fromarray(data)
-        path, ext = os.path.splitext(self.ciao_file)
-        path += str(run) + ext
-        self._create_path(path)
-        img.save(path)
+    def _evolve_islands(self, run):
+        """ Evolves the populations of a run on islands in separate processes.
 
-    @ staticmethod
-    def normalize_fitnesses(fitnesses):
-        min_fitness = min(fitnesses)
+        The rows logged at each evaluation count are the islands' rows joined together.
+        Returns them with the best pacman and ghost of all islands.
+        """
 
-        constant = min_fitness * -1
+        start_time = time.time()
+        island_ids = self.island_ids if self.island_ids is not None else range(self.islands)
+        with multiprocessing.Manager() as manager:
+            if self.migration_address:
+                inboxes = islands.connect_inboxes(islands.parse_address(self.migration_address),
+                                                  self.migration_authkey.encode(), self.islands)
+            else:
+                # islands that run elsewhere have no reader, migrants sent to them are dropped
+                inboxes = [manager.Queue() if island in island_ids else None
+                           for island in range(self.islands)]
+            results = manager.Queue()
+
+            processes = {island: multiprocessing.Process(target=self._run_island,
+                                                         args=(run, island, inboxes, results))
+                         for island in island_ids}
+            for process in processes.values():
+                process.start()
+            try:
+                island_results = sorted(self._collect_islands(processes, results))
+            except BaseException:
+                # the other islands' results would be thrown away
+                for process in processes.values():
+                    process.terminate()
+                raise
+            finally:
+                for process in processes.values():
+                    process.join()
+        self.run_times.append(time.time() - start_time)
+
+        rows = collections.OrderedDict()
+        for island, result, error, game_stats, cache_counts in island_results:
+            if error:
+                raise MyException(f"Error: island {island} failed\n{error}")
+            self.game_stats.update(game_stats)
+            self.fitness_cache.add_counts(*cache_counts)
+            for row in result[0]:
+                rows.setdefault(row.evals, []).append(row)
+        evaluations = [run_history.merge(island_rows) for island_rows in rows.values()]
+        best_pacman = max(result[1] for _, result, _, _, _ in island_results)
+        best_ghost = max(result[2] for _, result, _, _, _ in island_results)
+        return evaluations, best_pacman, best_ghost
+
+    @staticmethod
+    def _collect_islands(processes, results):
+        """ Returns the result every island process puts on results. Raises MyException if
+        an island process exits without putting its result, rather than waiting forever.
+
+        processes - island process by island id
+        """
 
-        mod_fitnesses = [fitness + constant for fitness in fitnesses]
-        max_mod_fitness = max(mod_fitnesses)
-        if max_mod_fitness:
-            return [fitness / max_mod_fitness for fitness in mod_fitnesses]
-        else:
-            return mod_fitnesses
+        island_results = []
+        while len(island_results) < len(processes):
+            try:
+                island_results.append(results.get(timeout=ISLAND_POLL_SECONDS))
+                continue
+            except queue.Empty:
+                pass
+            finished = {result[0] for result in island_results}
+            for island, process in processes.items():
+                # a result put before the process exited is still waiting on the queue
+                if island not in finished and not process.is_alive() and results.empty():
+                    raise MyException(f"Error: island {island} exited with code "
+                                      f"{process.exitcode} without a result")
+        return island_results
+
+    def _run_island(self, run, island, inboxes, results):
+        """ Evolves an island's populations. Runs in the island's own process and puts
+        (island, result, error, game stats, fitness cache (hits, lookups)) on results.
+        """
+
+        random.seed(self._derive_seed(run, island))
+        numpy.random.seed(self._derive_seed(run, island))
+        # every island would write the same CIAO files
+        self.ciao_file = None
+        # forked islands start with the counts of earlier runs
+        self.game_stats = collections.Counter()
+        self.fitness_cache.hits = self.fitness_cache.lookups = 0
+
+        self.workers = self.island_workers or max(1, multiprocessing.cpu_count() // self.islands)
+        migration = islands.Migration(island, inboxes, self.migration_interval,
+                                      self.migration_topology, self.migrants)
+        try:
+            with self._create_pool() as pool:
+                self.pool = pool
+                results.put((island, self._evolve(run, migration), None, self.game_stats,
+                             (self.fitness_cache.hits, self.fitness_cache.lookups)))
+        except Exception:  # pylint: disable=broad-except
+            results.put((island, None, traceback.format_exc(), None, None))
+
+    def _ciao_path(self, run, ext):
+        """ Path of the run's CIAO files, the run number is appended to ciao_file. """
+        path = os.path.splitext(self.ciao_file)[0]
+        return path + str(run) + ext
+
+    def _create_ciao_plot(self, run):
+        """ Create CIAO plot for run. Returns None if no ciao_file is configured. """
+
+        if not self.ciao_file:
+            return None
+        return ciao.CiaoPlot(self._ciao_path(run, '.npy'), self.ciao_opponents)
+
+    def _extend_ciao_plot(self, ciao_plot, pacmans, ghosts):
+        """ Plays the newest generation's best Pac-Man against earlier generations' best ghosts
+        and adds the results to the CIAO plot.
+        """
+
+        if not ciao_plot:
+            return
 
-    def _create_game(self):
+        opponents = ciao_plot.opponents()
+        population = [(pacmans[-1].head_node, ghosts[opponent].head_node)
+                      for opponent in opponents]
+        fitnesses = [res[0].fitness for res in self._evaluate(population)]
+        ciao_plot.add_generation(opponents, fitnesses)
+
+    def _create_game(self, map_filepath=None, log=True):
         """ Loads class variable with game instance.
 
-        Game instance should be created per run.
+        Game instance should be created per run. A random map is used if none is passed.
+        log - whether the game builds its world file contents
+        """
+        if map_filepath is None:
+            map_filepath = random.choice(self.maps)
+        self.game_instance = gpac.ENGINES[self.engine](map_filepath, self.pill_density,
+                                                       self.fruit_spawn_probability,
+                                                       self.fruit_score, self.time_multiplier,
+                                                       log)
+
+    def world_log(self, game):
+        """ Replays an individual.Game and returns its world file contents.
+
+        Games only depend on their map, seed and trees, so the replay matches the game
+        played during evaluation, including games that ended early.
+        """
+        with gpac.seeded_random(game.seed):
+            self._create_game(game.map_filepath)
+            contents = self.game_instance.world_contents
+            for _ in range(game.turns):
+                if self.game_instance.is_gameover:
+                    break
+                _, contents, _ = self._turn(game.pacman, game.ghost)
+        # array engine hands back a WorldLog buffer
+        return str(contents)
+
+    def controller(self, root_node):
+        """ Returns a gpac.play_game controller that moves units with the tree root_node. """
+
+        def move(game, unit):
+            self.game_instance = game
+            move_scores = self._calculate_move_scores(root_node, unit)
+            return self._select_best_move(move_scores, unit)
+        return move
+
+    def simulate(self, pacman, ghost, n_games, seeds=None):
+        """ Plays n_games headless games of pacman against ghost on every map.
+
+        Returns an array of scores and the number of games played per second.
+        Seeds count up from the config seed unless passed.
         """
-        map_filepath = random.choice(self.maps)
-        self.game_instance = gpac.GPac(map_filepath, self.pill_density,
-                                       self.fruit_spawn_probability, self.fruit_score,
-                                       self.time_multiplier)
+        maps = self.maps or sorted(glob.glob('./maps/map*.txt'))
+        return gpac.simulate_batch((self.controller(pacman), self.controller(ghost)), maps,
+                                   (self.seed or 0) if seeds is None else seeds, n_games,
+                                   self.pill_density, self.fruit_spawn_probability,
+                                   self.fruit_score, self.time_multiplier, self.engine)
 
     ###########################################################################
     #######################  Algorithm Selection ##############################
@@ -299,24 +747,24 @@ class Solver():
             num_of_children = self.ghost_children
             mutation_rate = self.ghost_mutation_rate
 
-        children = []
-        for _ in range(num_of_children):
-            parent_one, parent_two = random.sample(population, 2)
-            parent_one = parent_one.head_node
-            parent_two = parent_two.head_node
-            rng = random.random()
-            if rng < mutation_rate:
-                # mutate
-                if random.randint(0, 1):
-                    parent = parent_one
-                else:
-                    parent = parent_two
-                child_node = self.sub_tree_mutation(parent)
-            else:
-                child_node = self.sub_tree_crossover(parent_one, parent_two)
-            children.append(child_node)
+        return [self._breed(population, mutation_rate) for _ in range(num_of_children)]
 
-        return children
+    def _breed(self, population, mutation_rate):
+        """ Creates a child from two random parents of population by recombination
+        or mutation.
+        """
+        parent_one, parent_two = random.sample(population, 2)
+        parent_one = parent_one.head_node
+        parent_two = parent_two.head_node
+        rng = random.random()
+        if rng < mutation_rate:
+            # mutate
+            if random.randint(0, 1):
+                parent = parent_one
+            else:
+                parent = parent_two
+            return self.sub_tree_mutation(parent)
+        return self.sub_tree_crossover(parent_one, parent_two)
 
     def survival_selection(self, population, unit):
         """ Selects μ - individuals to survive into the next generation based on
@@ -444,38 +892,111 @@ class Solver():
         pacman_ind = []
         ghost_ind = []
         population = list(zip(pacman_population, ghost_population))
-        with multiprocessing.Pool() as pool:
-            for _, res in enumerate(pool.imap_unordered(self.calculate_fitness, population)):
-                pacman_ind.append(res[0])
-                ghost_ind.append(res[1])
+        for res in self._evaluate(population):
+            pacman_ind.append(res[0])
+            ghost_ind.append(res[1])
         return pacman_ind, ghost_ind
 
     def calculate_fitness(self, controllers):
         """ Creates a game instance with a random map picked from the maps variable.
-        Game is played until completion and it's score and game contents are recorded.
+        Game is played until completion and it's score is recorded. The world file is
+        not built, the game can be replayed with world_log.
+
+        controllers - (pacman, ghost) or (pacman, ghost, map, seed) to play a specific game
         """
         current_score = 0
-        contents = ''
-        pacman, ghost = controllers
-        self._create_game()
+        pacman, ghost = controllers[:2]
+        if len(controllers) > 2:
+            map_filepath, game_seed = controllers[2:]
+        else:
+            map_filepath = random.choice(self.maps)
+            game_seed = random.getrandbits(32)
         pacman_eaten = False
-        while not self.game_instance.is_gameover:
-            current_score, contents, pacman_eaten = self._turn(pacman, ghost)
+        history = self._create_state_history(pacman, ghost)
+        checkpoints = [] if self.racing_interval else None
+        stagnated = abandoned = False
+        turn = 0
+        # the game and the names of its individuals come from the game's own stream, the
+        # evolution stream carries on after the game
+        with gpac.seeded_random(game_seed):
+            self._create_game(map_filepath, log=False)
+            while not self.game_instance.is_gameover:
+                current_score, _, pacman_eaten = self._turn(pacman, ghost)
+                turn += 1
+
+                if history and self._stagnated(history):
+                    stagnated = True
+                    break
+
+                if checkpoints is not None and turn % self.racing_interval == 0:
+                    checkpoints.append(current_score)
+                    if self._dominated(checkpoints):
+                        abandoned = True
+                        break
+
+            pacman_count = pacman.get_total_nodes()
+            ghost_count = ghost.get_total_nodes()
+
+            pacman_penalty = self.pacman_parsimony_penalty * pacman_count
+            ghost_penalty = self.ghost_parsimony_penalty * ghost_count
+
+            pacman_score = current_score - pacman_penalty
+
+            ghost_bonus = 100 if pacman_eaten else 0
+            ghost_score = 1 / (1 if (current_score - ghost_penalty +
+                                     1) == 0 else (current_score - ghost_penalty + 1)) + ghost_bonus
+            game = individual.Game(pacman, ghost, map_filepath, game_seed, turn)
+            pacman_solution = individual.Individual(pacman_score, current_score, game, pacman)
+            ghost_solution = individual.Individual(ghost_score, current_score, game, ghost)
+            for solution in (pacman_solution, ghost_solution):
+                solution.checkpoints = checkpoints
+                solution.stagnated = stagnated
+                solution.abandoned = abandoned
+            return [pacman_solution, ghost_solution]
+
+    def _create_state_history(self, pacman, ghost):
+        """ Returns a StateHistory if stagnation detection is on and both controllers
+        are deterministic, otherwise None.
+        """
+
+        if not self.stagnation_window:
+            return None
+        if not (pacman.is_deterministic() and ghost.is_deterministic()):
+            return None
+        return gpac.StateHistory(self.stagnation_window)
+
+    def _stagnated(self, history):
+        """ Checks whether the game has entered a cycle it can never leave.
 
-        pacman_count = pacman.get_total_nodes()
-        ghost_count = ghost.get_total_nodes()
+        Controllers are deterministic, so once a state repeats every later turn repeats
+        the same cycle. Nothing is eaten during the cycle as the eaten counts are part of
+        the state, so the current score is the final score. This only holds if no new
+        fruit can appear, which needs a fruit on the board or no fruit spawning.
+        """
+
+        if self.fruit_spawn_probability and not self.game_instance.locations[gpac.FRUIT]:
+            return False
+        return history.repeated(self.game_instance.state_key())
+
+    def _dominated(self, checkpoints):
+        """ Whether the score at the last checkpoint trails the racing reference by more
+        than the racing margin.
+        """
 
-        pacman_penalty = self.pacman_parsimony_penalty * pacman_count
-        ghost_penalty = self.ghost_parsimony_penalty * ghost_count
+        index = len(checkpoints) - 1
+        if not self.racing_reference or index >= len(self.racing_reference):
+            return False
+        return checkpoints[index] + self.racing_margin < self.racing_reference[index]
 
-        pacman_score = current_score - pacman_penalty
+    def _update_racing_reference(self, pacman_population):
+        """ Races the next generation against the checkpoints of the best complete game
+        of pacman_population.
+        """
 
-        ghost_bonus = 100 if pacman_eaten else 0
-        ghost_score = 1 / (1 if (current_score - ghost_penalty +
-                                 1) == 0 else (current_score - ghost_penalty + 1)) + ghost_bonus
-        pacman_solution = individual.Individual(pacman_score, current_score, contents, pacman)
-        ghost_solution = individual.Individual(ghost_score, current_score, contents, ghost)
-        return [pacman_solution, ghost_solution]
+        complete = [pacman for pacman in pacman_population
+                    if pacman.checkpoints is not None and not pacman.abandoned]
+        if complete:
+            self.racing_reference = max(complete).checkpoints
 
     ###################################################################
     #############     Recombination / Mutation    #####################
@@ -483,32 +1004,25 @@ class Solver():
 
     @ staticmethod
     def sub_tree_crossover(parent_one_original, parent_two_original):
-        """ Crosses two tree's at two random nodes """
+        """ Crosses two tree's at two random nodes.
+
+        Parents are flattened into prefix order and the child is built from slices of them.
+        """
 
-        not_found = True
-        parent_one = copy.deepcopy(parent_one_original)
+        parent_one = node.PrefixTree.from_node(parent_one_original)
+        parent_two = node.PrefixTree.from_node(parent_two_original)
 
         # find node one
-        parent_one_list = parent_one.to_list()
-        child_one = random.choice(random.choice(parent_one_list))
-
-        parent_two = copy.deepcopy(parent_two_original)
-        parent_two_list = parent_two.to_list()
+        index_one = parent_one.random_index()
 
-        while not_found:
+        while True:
             # find node two
+            index_two = parent_two.random_index()
 
-            child_two = random.choice(random.choice(parent_two_list))
-
-            if (child_one.depth + child_two.get_height()) <= parent_one.max_depth:
-                not_found = False
-            else:
-                continue
-
-            # swap node over
-            child_one.swap(child_two)
-
-        return parent_one
+            if parent_one.depths[index_one] + parent_two.height(index_two) <= \
+                    parent_one.max_depth:
+                # swap node over
+                return parent_one.replace(index_one, parent_two, index_two).to_node()
 
     @ staticmethod
     def sub_tree_mutation(head):
@@ -516,13 +1030,13 @@ class Solver():
         This node is reset and a tree is grown from it.
         """
 
-        head = copy.deepcopy(head)
-        mutated_node = random.choice(random.choice(head.to_list()))
-        mutated_node.children = [None, None]
-        mutated_node.data = mutated_node.generate_value()
+        tree = node.PrefixTree.from_node(head)
+        index = tree.random_index()
+        mutated_node = node.Node(tree.depths[index], tree_type=tree.tree_type,
+                                 max_depth=tree.max_depth, unit=tree.unit)
         mutated_node.grow()
 
-        return head
+        return tree.replace(index, node.PrefixTree.from_node(mutated_node), 0).to_node()
 
     ###################################################################
     ###############     Distance Calculation    #######################
@@ -535,48 +1049,39 @@ class Solver():
         for ghost in gpac.GHOST:
             ghost_loc = self.game_instance.locations[ghost]
 
-            distances.append(self._calculate_manhattan_distance(tuple(cell), tuple(ghost_loc)))
+            distances.append(self._calculate_manhattan_distance(cell, ghost_loc))
 
         return min(distances)
 
     def _closest_pill(self, cell):
         """ Calculate manhattan distance for closest pill to Pac-Man. """
-        min_distance = 0
-        seen = [cell]
-        possible_locations = [cell]
-        found = False
-        while not found:
-            current = possible_locations.pop()
-
-            if self.game_instance.board[current[0]][current[1]] == gpac.PILL:
-                found = True
-                min_distance = self._calculate_manhattan_distance(tuple(cell), tuple(current))
-                break
+        return self.game_instance.pill_index.nearest(cell)
 
-            locations = self.game_instance.get_all_spots_around_cell(current)
-            for location in locations:
-                if location not in seen:
-                    seen.append(location)
-                    possible_locations.append(location)
-
-        return min_distance
+    def _shortest_distances(self, cell):
+        """ Returns the row of the current map's distance table for cell. """
+        distances = shortest_path.load_distance_table(self.game_instance.level_filename,
+                                                      self.path_cache_dir)
+        return distances[cell[0] * self.game_instance.width + cell[1]]
 
     def _shortest_pacman_distance(self, cell):
+        """ Calculate shortest path distance from cell to Pac-Man. """
         pacman_loc = self.game_instance.locations[gpac.PACMAN]
-        board = tuple([tuple(row) for row in self.game_instance.board])
-        return shortest_path.BFS(board, tuple(cell), tuple(pacman_loc))
+        distances = self._shortest_distances(cell)
+        return int(distances[pacman_loc[0] * self.game_instance.width + pacman_loc[1]])
 
     def _shortest_ghost_distance(self, cell):
         """ Calculate shortest path distance for closest ghost to Pac-Man. """
-        distances = []
-        board = tuple([tuple(row) for row in self.game_instance.board])
+        distances = self._shortest_distances(cell)
+        width = self.game_instance.width
+
+        ghost_distances = []
 
         for ghost in gpac.GHOST:
             ghost_loc = self.game_instance.locations[ghost]
 
-            distances.append(shortest_path.BFS(board, tuple(cell), tuple(ghost_loc)))
+            ghost_distances.append(int(distances[ghost_loc[0] * width + ghost_loc[1]]))
 
-        return min(distances)
+        return min(ghost_distances)
 
     def _closest_fruit(self, cell):
         """ Calculate manhattan distance for closest fruit to pacman.
@@ -587,12 +1092,12 @@ class Solver():
 
         fruit_loc = self.game_instance.locations[gpac.FRUIT]
         if fruit_loc:
-            return self._calculate_manhattan_distance(tuple(cell), tuple(fruit_loc))
+            return self._calculate_manhattan_distance(cell, fruit_loc)
         return 0
 
     def _pacman_distance(self, cell):
         pacman_loc = self.game_instance.locations[gpac.PACMAN]
-        return self._calculate_manhattan_distance(tuple(cell), tuple(pacman_loc))
+        return self._calculate_manhattan_distance(cell, pacman_loc)
 
     def _calculate_adjacent_walls(self, cell):
         """ Calculate walls adjacent to Pac-Man. """
@@ -600,7 +1105,7 @@ class Solver():
         num_of_walls = 0
 
         for loc in locs:
-            if self.game_instance.board[loc[0]][loc[1]] == '#':
+            if self.game_instance.cell_at(loc) == gpac.WALL:
                 num_of_walls += 1
 
         return num_of_walls
@@ -622,20 +1127,37 @@ class Solver():
         """ Generates sensor inputs for a given location.
 
         cell - location to calculate inputs on
+
+        Inputs are remembered until the turn advances, as the ghosts' candidate cells
+        overlap each other and Pac-Man's.
         """
+        game = self.game_instance
+        if self.sensor_memo_turn != (game, game.time_elapsed):
+            self.sensor_memo_turn = (game, game.time_elapsed)
+            for memo in self.sensor_memo:
+                memo.clear()
+
+        memo = self.sensor_memo[unit != gpac.PACMAN]
+        cell_id = cell[0] * game.width + cell[1]
+        sensor_inputs = memo.get(cell_id)
+        if sensor_inputs is not None:
+            return sensor_inputs
+
         if unit == gpac.PACMAN:
             manhattan_ghost = self._closest_ghost(cell)
             manhattan_pill = self._closest_pill(cell)
             number_of_walls = self._calculate_adjacent_walls(cell)
             manhattan_fruit = self._closest_fruit(cell)
             ghost_shortest = self._shortest_ghost_distance(cell)
-            return [
+            sensor_inputs = [
                 manhattan_ghost, manhattan_pill, number_of_walls, manhattan_fruit, ghost_shortest]
         else:
             manhattan_ghost = self._closest_ghost(cell)
             manhattan_pacman = self._pacman_distance(cell)
             shortest_pacman = self._shortest_pacman_distance(cell)
-            return [manhattan_ghost, manhattan_pacman, shortest_pacman]
+            sensor_inputs = [manhattan_ghost, manhattan_pacman, shortest_pacman]
+        memo[cell_id] = sensor_inputs
+        return sensor_inputs
 
     ###################################################################
     ######################     Turn    #############################
@@ -644,16 +1166,24 @@ class Solver():
     def _turn(self, pacman_controller, ghost_controller):
         """ Run a single turn through the pac-man game. """
 
-        # calculates best move for pac-man
-        move_scores = self._calculate_move_scores(pacman_controller, gpac.PACMAN)
-        pacman_move = self._select_best_move(move_scores, gpac.PACMAN)
+        if self.batch_evaluation:
+            pacman_scores = self._calculate_batch_move_scores(pacman_controller, [gpac.PACMAN])
+            ghost_scores = self._calculate_batch_move_scores(ghost_controller, gpac.GHOST)
 
-        # move ghosts
-        ghosts_moves = []
-        for ghost in gpac.GHOST:
-            move_scores = self._calculate_move_scores(ghost_controller, ghost)
-            ghost_move = self._select_best_move(move_scores, gpac.GHOST)
-            ghosts_moves.append(ghost_move)
+            pacman_move = self._select_best_move(pacman_scores[gpac.PACMAN], gpac.PACMAN)
+            ghosts_moves = [self._select_best_move(ghost_scores[ghost], gpac.GHOST)
+                            for ghost in gpac.GHOST]
+        else:
+            # calculates best move for pac-man
+            move_scores = self._calculate_move_scores(pacman_controller, gpac.PACMAN)
+            pacman_move = self._select_best_move(move_scores, gpac.PACMAN)
+
+            # move ghosts
+            ghosts_moves = []
+            for ghost in gpac.GHOST:
+                move_scores = self._calculate_move_scores(ghost_controller, ghost)
+                ghost_move = self._select_best_move(move_scores, gpac.GHOST)
+                ghosts_moves.append(ghost_move)
 
         # move pacman
         self.game_instance.move(pacman_move, gpac.PACMAN)
@@ -695,6 +1225,31 @@ class Solver():
             move_choices[move_direction] = move_score
         return move_choices
 
+    def _calculate_batch_move_scores(self, root_node, units):
+        """ Calculates scores for every move of every unit in units with a single
+        pass of the tree over a matrix of sensor inputs.
+
+        Returns a dictionary of move scores for each unit.
+        """
+        move_choices = {unit: {} for unit in units}
+        candidates = []
+        sensor_values = []
+        for unit in units:
+            for move in self.game_instance.get_spots_around_unit(unit):
+                candidates.append((unit, move))
+                sensor_values.append(self._generate_sensor_inputs(move, unit))
+
+        if not candidates:
+            return move_choices
+
+        move_scores = root_node.calculate_vector(numpy.array(sensor_values, dtype=float))
+        for (unit, move), move_score in zip(candidates, move_scores):
+            location = self.game_instance.locations[unit]
+            move_direction = self.game_instance.location_to_cardinal(location, move)
+
+            move_choices[unit][move_direction] = move_score
+        return move_choices
+
     ###################################################################
     ######################     Logging    #############################
     ###################################################################
@@ -712,12 +1267,12 @@ class Solver():
             file.write(ghost_tree)
             file.write("\n")
 
-    def _log_world(self, pacman_contents, ghost_contents):
+    def _log_world(self, contents):
         """ Log best solution of a time's world contents. """
 
         self._create_path(self.highest_score_file)
         with open(self.highest_score_file, "+w") as file:
-            file.write(pacman_contents)
+            file.write(contents)
 
     def _log_parameters(self):
         total_time = sum(self.run_times)
@@ -730,51 +1285,81 @@ class Solver():
         outputs += f'\tGhost Children: {self.ghost_children}\n'
         outputs += f'\tGhost Parents: {self.ghost_parents}\n'
         outputs += f'\tNumber of runs: {self.max_runs}\n'
+        outputs += f'\tRun workers: {self.run_workers}\n'
         outputs += f'\tNumber of evaluation: {self.max_evaluations}\n'
         outputs += f'\tPill density: {self.pill_density}\n'
         outputs += f'\tFruit spawn chance: {self.fruit_spawn_probability}\n'
         outputs += f'\tFruit score: {self.fruit_score}\n'
-        outputs += f'\tTime multiplier: {self.time_multiplier}\n\n'
+        outputs += f'\tTime multiplier: {self.time_multiplier}\n'
+        outputs += f'\tNoisy evaluation: {self.noisy_evaluation}\n'
+        if self.history_file:
+            outputs += f'\tHistory file: {self.history_file}\n'
+        if self.algorithm != 'random' and self.steady_state:
+            outputs += f'\tSteady state: {self.games_in_flight or 2 * self.workers} ' \
+                'games in flight\n'
+        outputs += f'\tStagnation window: {self.stagnation_window} turns ' \
+            f'({self.game_stats["stagnated"]} of {self.game_stats["games"]} games ended early)\n'
+        outputs += f'\tRacing: every {self.racing_interval} turns with a margin of ' \
+            f'{self.racing_margin} ({self.game_stats["abandoned"]} of ' \
+            f'{self.game_stats["games"]} games abandoned)\n'
+        if self.islands:
+            outputs += f'\tIslands: {self.islands} ({self.migration_topology}, ' \
+                f'{self.migrants} migrants every {self.migration_interval} generations)\n'
+        outputs += f'\tFitness cache hits: {self.fitness_cache.hits} of ' \
+            f'{self.fitness_cache.lookups} ({self.fitness_cache.hit_rate():.2%})\n\n'
         outputs += f'\tAverage Run Time: {total_time/self.max_runs}\n'
         outputs += f'\tTotal Experiment Time: {total_time}\n\n'
         return outputs
 
-    def _log_results(self, runs):
-        """ Log runs to result file.
+    @staticmethod
+    def _log_run(file, count, evaluations):
+        """ Writes the average and best score of every logged generation of a run. """
 
-        Evaluations should be logged as the highest solution of a run is beaten.
-        """
+        file.write(f"Run {count+1}\n")
+        for row in evaluations:
+            file.write(f"\t{row.evals}\t{run_history.average(row)}\t{row.best_score}\n")
+        file.write("\n")
+        file.flush()
+
+    def _log_results(self, runs_file):
+        """ Log runs to result file. The runs written to runs_file follow the parameters. """
 
         self._create_path(self.log_file)
         with open(self.log_file, "+w") as file:
             file.write("Result Log\n\n")
 
             file.write(self._log_parameters())
-            for count, run_info in enumerate(runs):
-                file.write(f"Run {count+1}\n")
-
-                for evals, population in run_info.items():
-                    best_individual = sorted(population, key=lambda x: x.score, reverse=True)[0]
-
-                    pop_sum = sum([pop.score for pop in population])
-                    avg_fitness = round(pop_sum / len(population), 2)
-                    file.write(f"\t{evals}\t{avg_fitness}\t{best_individual.score}\n")
-                file.write("\n")
+            with open(runs_file) as runs:
+                shutil.copyfileobj(runs, file)
+        os.remove(runs_file)
 
     ###################################################################
     ####################     Utilities    #############################
     ###################################################################
 
+    def _derive_seed(self, *labels):
+        """ Derives a seed from the config seed and labels such as a run or island number. """
+
+        digest = hashlib.sha1(':'.join(map(str, (self.seed, *labels))).encode()).hexdigest()
+        return int(digest[:8], 16)
+
+    def _seed_run(self, run):
+        """ Seeds the random generators for a run. """
+
+        random.seed(self._derive_seed(run))
+        numpy.random.seed(self._derive_seed(run))
+
     def _set_seed(self):
         """Sets random seed value based on object seed variable."""
 
         if self.seed is None:
             self.seed = int(time.time())
         random.seed(self.seed)
-        # np.random.seed(self.seed)
+        # RAND nodes draw from numpy when trees are evaluated in batches
+        numpy.random.seed(self.seed)
 
-    @ lru_cache(maxsize=1000)
-    def _calculate_manhattan_distance(self, point_a, point_b):
+    @ staticmethod
+    def _calculate_manhattan_distance(point_a, point_b):
         """ Calculate manhattan distance for two points. """
         distance = (point_a[0] + point_a[1]) - (point_b[0] + point_b[1])
         if distance < 0:
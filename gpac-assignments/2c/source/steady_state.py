@@ -0,0 +1,50 @@
+""" Steady-state co-evolution. A new pair of children is bred and sent to a worker as soon
+as any game finishes, and every finished game goes through survival selection straight
+away, so workers never wait for the slowest game of a generation.
+
+Games finish in whatever order the workers get through them, so a steady-state run
+with more than one worker is not reproducible from its seed.
+"""
+
+import asyncio
+
+
+class Scheduler:
+    """ Keeps a fixed number of games in flight on an executor.
+
+    breed - returns the next (pacman, ghost) game to play
+    play - plays a game in a worker, must be picklable
+    insert - merges a played game into the populations
+    in_flight - number of games played at once
+    """
+
+    def __init__(self, breed, play, insert, in_flight):
+        self.breed = breed
+        self.play = play
+        self.insert = insert
+        self.in_flight = max(1, in_flight)
+
+    def run(self, games, executor=None):
+        """ Plays games games. Without an executor games are played one at a time in
+        this process.
+        """
+
+        if executor is None:
+            for _ in range(games):
+                self.insert(self.play(self.breed()))
+            return
+        asyncio.run(self._run(games, executor))
+
+    async def _run(self, games, executor):
+        loop = asyncio.get_running_loop()
+        pending = set()
+        dispatched = 0
+        while dispatched < games or pending:
+            # top up with children bred from the latest populations
+            while dispatched < games and len(pending) < self.in_flight:
+                pending.add(loop.run_in_executor(executor, self.play, self.breed()))
+                dispatched += 1
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                self.insert(future.result())
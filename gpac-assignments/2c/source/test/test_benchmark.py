@@ -0,0 +1,27 @@
+import argparse
+import benchmark
+import gpac
+
+
+def test_scale_map(tmp_path):
+    filepath = benchmark.scale_map(benchmark.MAP, 2, str(tmp_path))
+    width, height, board = gpac.GPac._parse_map(filepath)
+    assert (width, height) == (70, 40)
+    assert len(board) == 40 and all(len(row) == 70 for row in board)
+
+
+def test_run_every_benchmark(capsys):
+    args = argparse.Namespace(seed=1, repeat=1, scales=[1, 2], populations=[2], games=1,
+                              rows=2, operations=2, max_depth=2)
+    report = benchmark.run(args)
+    capsys.readouterr()
+
+    benchmarks = [result['benchmark'] for result in report['results']]
+    assert benchmarks.count('turns') == 2 * len(gpac.ENGINES)
+    assert benchmarks.count('sensors') == 2
+    assert benchmarks.count('generation') == 2
+    assert {'trees', 'variation'} <= set(benchmarks)
+    for result in report['results']:
+        assert all(value > 0 for key, value in result.items()
+                   if key.endswith('per_second') or key.endswith('per_cell'))
+    assert report['seed'] == 1
@@ -0,0 +1,39 @@
+import numpy
+from PIL import Image
+import ciao
+
+
+def test_opponents_all():
+    plot = ciao.CiaoPlot('unused.npy')
+    assert plot.opponents() == [0]
+    plot.generations = 3
+    assert plot.opponents() == [0, 1, 2, 3]
+
+
+def test_opponents_subsampled():
+    plot = ciao.CiaoPlot('unused.npy', max_opponents=3)
+    plot.generations = 10
+    assert plot.opponents() == [0, 5, 10]
+
+
+def test_add_generation_grows_and_saves(tmp_path):
+    plot = ciao.CiaoPlot(str(tmp_path / 'ciao0.npy'))
+    for generation in range(10):
+        plot.add_generation(plot.opponents(), [generation] * (generation + 1))
+
+    saved = numpy.load(str(tmp_path / 'ciao0.npy'))
+    assert saved.shape == (10, 10)
+    assert saved[9, 0] == 9
+    assert numpy.isnan(saved[0, 1])
+
+
+def test_render(tmp_path):
+    plot = ciao.CiaoPlot(str(tmp_path / 'ciao0.npy'))
+    plot.add_generation([0], [5])
+    plot.add_generation([0, 1], [1, 3])
+
+    plot.render(str(tmp_path / 'ciao0.png'))
+    image = numpy.array(Image.open(str(tmp_path / 'ciao0.png')))
+    # first generation is drawn on the bottom row
+    assert list(image[0, :, 0]) == [255, 0]
+    assert list(image[1, :, 0]) == [255, 255]
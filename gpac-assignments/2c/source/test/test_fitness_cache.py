@@ -0,0 +1,30 @@
+import fitness_cache
+
+
+def test_get_put():
+    cache = fitness_cache.FitnessCache(2)
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    assert cache.hits == 1
+    assert cache.lookups == 2
+    assert cache.hit_rate() == 0.5
+
+
+def test_evicts_least_recently_used():
+    cache = fitness_cache.FitnessCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_disabled():
+    cache = fitness_cache.FitnessCache(0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
+    assert cache.hit_rate() == 0
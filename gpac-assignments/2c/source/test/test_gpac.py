@@ -3,6 +3,7 @@ import copy
 import pytest
 import gpac
 import random
+import numpy
 
 # pylint: disable=protected-access
 # pylint: disable=missing-function-docstring
@@ -211,3 +212,165 @@ def test_score_calculation_all_pills_no_time():
     instance.consumed['pill'] = 142
     instance.time_elapsed = instance.time
     assert instance._calculate_score() == 100
+
+
+def test_array_engine_parse_board():
+    instance = gpac.ArrayGPac('maps/map0.txt', .5, 0, 0, 2)
+    _, _, board = gpac.GPac._parse_map('maps/map0.txt')
+    assert len(instance.board) == 35 * 20
+    assert instance.cell_at((1, 1)) == gpac.WALL
+    assert instance.cell_at((0, 0)) == gpac.EMPTY_CELL
+    rows = [[gpac.EMPTY_CELL if cell == gpac.PILL else cell for cell in row]
+            for row in instance.get_rows()]
+    assert rows == board
+
+
+def test_array_engine_matches_list_engine():
+    games = []
+    for engine in (gpac.GPac, gpac.ArrayGPac):
+        random.seed(7)
+        numpy.random.seed(7)
+        instance = engine('maps/map0.txt', .5, .1, 10, 2)
+        while not instance.is_gameover:
+            for unit in [gpac.PACMAN, *gpac.GHOST]:
+                instance.move(random.choice(instance.get_moves_for_unit(unit)), unit)
+            score, contents, collision = instance.turn()
+        games.append((score, str(contents), collision))
+    assert games[0] == games[1]
+
+
+def test_array_engine_pill_collision():
+    instance = gpac.ArrayGPac('maps/map0.txt', 0, 0, 0, 10)
+    instance._place((1, 0), gpac.PILL)
+    instance.locations[gpac.PILL].add((1, 0))
+
+    instance.move(gpac.DOWN, gpac.PACMAN)
+    assert instance.consumed['pill'] == 1
+    assert (1, 0) not in instance.locations[gpac.PILL]
+    assert instance.cell_at((1, 0)) == gpac.EMPTY_CELL
+
+
+def test_pill_index_nearest():
+    random.seed(4)
+    index = gpac.PillIndex(20)
+    pills = [(random.randrange(20), random.randrange(35)) for _ in range(40)]
+    for pill in pills:
+        index.add(pill)
+
+    for cell in [(0, 0), (19, 34), (10, 17), pills[3]]:
+        expected = min(abs(cell[0] - pill[0]) + abs(cell[1] - pill[1]) for pill in pills)
+        assert index.nearest(cell) == expected
+
+
+def test_pill_index_empty():
+    index = gpac.PillIndex(20)
+    index.add((3, 4))
+    index.remove((3, 4))
+    index.remove((3, 4))
+    assert index.count == 0
+    assert index.nearest((0, 0)) == 0
+
+
+def test_pill_index_updated_on_collision():
+    numpy.random.seed(1)
+    instance = gpac.GPac('maps/map0.txt', 0, 0, 0, 10)
+    instance._place([1, 0], gpac.PILL)
+    instance.locations[gpac.PILL].append([1, 0])
+    instance.pill_index.add([1, 0])
+    assert instance.pill_index.nearest([0, 0]) == 1
+
+    instance.move(gpac.DOWN, gpac.PACMAN)
+    assert instance.pill_index.count == len(instance.locations[gpac.PILL])
+    assert instance.pill_index.nearest([1, 0]) != 0
+
+
+def random_controller(game, unit):
+    return random.choice(game.get_moves_for_unit(unit))
+
+
+def test_reset_replays_same_game():
+    instance = gpac.ArrayGPac('maps/map0.txt', .5, .1, 10, 2)
+    games = []
+    for _ in range(2):
+        random.seed(5)
+        numpy.random.seed(5)
+        instance.reset()
+        score = gpac.play_game(instance, (random_controller, random_controller))
+        games.append((score, str(instance.world_contents)))
+    assert games[0] == games[1]
+    assert instance.consumed['pill'] <= instance.total_pills
+
+
+def test_no_log():
+    for engine in (gpac.GPac, gpac.ArrayGPac):
+        random.seed(5)
+        instance = engine('maps/map0.txt', .5, .1, 10, 2, log=False)
+        gpac.play_game(instance, (random_controller, random_controller))
+        assert str(instance.world_contents) == '35\n20\n'
+        assert instance.time_elapsed > 1
+
+
+def test_simulate_batch_matches_single_games():
+    maps = ['maps/map0.txt', 'maps/map1.txt']
+    scores, games_per_second = gpac.simulate_batch((random_controller, random_controller),
+                                                   maps, 11, 4, .5, .1, 10, 1)
+    assert scores.shape == (4,)
+    assert games_per_second > 0
+
+    for index, seed in enumerate(range(11, 15)):
+        random.seed(seed)
+        numpy.random.seed(seed)
+        instance = gpac.GPac(maps[index % 2], .5, .1, 10, 1)
+        score = gpac.play_game(instance, (random_controller, random_controller))
+        assert scores[index] == score
+
+
+def test_simulate_batch_keeps_caller_random_state():
+    random.seed(2)
+    numpy.random.seed(2)
+    expected = random.random(), numpy.random.random()
+
+    random.seed(2)
+    numpy.random.seed(2)
+    gpac.simulate_batch((random_controller, random_controller), ['maps/map0.txt'], 11, 2,
+                        .5, .1, 10, 1)
+    assert (random.random(), numpy.random.random()) == expected
+
+
+def test_simulate_batch_needs_seeds():
+    with pytest.raises(gpac.MyException):
+        gpac.simulate_batch((random_controller, random_controller), ['maps/map0.txt'],
+                            [1, 2], 3)
+
+
+def test_load_map_parses_once():
+    template = gpac.load_map('maps/map0.txt')
+    assert gpac.load_map('maps/map0.txt') is template
+    assert (template.width, template.height) == (35, 20)
+    assert template.rows == tuple(tuple(row) for row in gpac.GPac._parse_map('maps/map0.txt')[2])
+    assert not template.pill_cells.flags.writeable
+
+    instance = gpac.GPac('maps/map0.txt', .5, 0, 0, 2)
+    assert instance.template is template
+    instance._remove([0, 1])
+    assert template.rows[0][1] == gpac.EMPTY_CELL
+
+
+def test_place_pills_on_open_cells():
+    numpy.random.seed(3)
+    instance = gpac.ArrayGPac('maps/map0.txt', .5, 0, 0, 2)
+    template = instance.template
+    open_cells = 35 * 20 - 1 - len(template.walls)
+    assert len(instance.locations[gpac.PILL]) == open_cells // 2
+    assert (0, 0) not in instance.locations[gpac.PILL]
+    assert all(instance.cell_at(pill) == gpac.PILL for pill in instance.locations[gpac.PILL])
+
+
+def test_state_history_window():
+    history = gpac.StateHistory(2)
+    assert not history.repeated('a')
+    assert not history.repeated('b')
+    assert history.repeated('a')
+    assert not history.repeated('c')
+    # 'a' has left the window
+    assert not history.repeated('a')
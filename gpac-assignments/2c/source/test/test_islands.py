@@ -0,0 +1,48 @@
+import queue
+import pytest
+import islands
+import individual
+
+
+def make_population(fitnesses):
+    return [individual.Individual(fitness, fitness, '', None) for fitness in fitnesses]
+
+
+def test_neighbours():
+    assert islands.neighbours(3, 4, islands.RING) == [0]
+    assert islands.neighbours(1, 4, islands.FULLY_CONNECTED) == [0, 2, 3]
+    assert islands.neighbours(0, 1, islands.RING) == []
+    assert islands.neighbours(2, 4, islands.RANDOM)[0] in [0, 1, 3]
+
+
+def test_neighbours_unknown_topology():
+    with pytest.raises(islands.MyException):
+        islands.neighbours(0, 2, 'star')
+
+
+def test_migration_replaces_worst():
+    inboxes = [queue.Queue(), queue.Queue()]
+    first = islands.Migration(0, inboxes, interval=2, migrants=2)
+    second = islands.Migration(1, inboxes, interval=2, migrants=2)
+
+    # nothing is sent between migrations
+    assert first.exchange(1, make_population([1, 2]), make_population([3]))[0][0].fitness == 1
+    assert inboxes[1].empty()
+
+    first.exchange(2, make_population([5, 9, 7]), make_population([1, 2]))
+    pacmans, ghosts = second.exchange(2, make_population([1, 2, 3]), make_population([0]))
+
+    assert sorted(pacman.fitness for pacman in pacmans) == [3, 7, 9]
+    assert [ghost.fitness for ghost in ghosts] == [2]
+    assert first.sent == second.sent == 1
+    assert second.received == 1
+    assert inboxes[0].qsize() == 1
+
+
+def test_migration_skips_islands_without_inbox():
+    inboxes = [queue.Queue(), None, queue.Queue()]
+    migration = islands.Migration(0, inboxes, interval=1, topology=islands.FULLY_CONNECTED)
+
+    migration.exchange(1, make_population([1, 2]), make_population([3]))
+    assert migration.sent == 1
+    assert inboxes[2].qsize() == 1
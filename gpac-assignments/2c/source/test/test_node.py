@@ -1,6 +1,10 @@
 import pytest
 import node
 import random
+import copy
+import pickle
+import gpac
+import numpy
 
 
 def test_init():
@@ -153,3 +157,156 @@ def test_to_list():
     assert len(node_list[0]) == 1
     assert len(node_list[1]) == 2
     assert len(node_list[2]) == 4
+
+
+def test_compiled_matches_interpreted():
+    for seed in range(20):
+        random.seed(seed)
+        unit = gpac.PACMAN if seed % 2 else gpac.GHOST
+        instance = node.Node(tree_type='full' if seed % 3 else 'grow', max_depth=5, unit=unit)
+        instance.grow()
+        sensors = [random.randint(0, 50) for _ in range(5 if unit == gpac.PACMAN else 3)]
+        interpreted = instance.calculate_pacman if unit == gpac.PACMAN else instance.calculate_ghost
+
+        random.seed(seed)
+        expected = interpreted(*sensors)
+        random.seed(seed)
+        assert instance.calculate(*sensors) == expected
+
+
+def test_compiled_cache_invalidated_on_swap():
+    instance = node.Node(data='+', depth=0)
+    instance.children[0] = node.Node(data='G', depth=1)
+    instance.children[1] = node.Node(data=2, depth=1)
+    assert instance.calculate(10, 1, 2, 0, 0) == 12
+
+    other = node.Node(data='*', depth=0)
+    other.children[0] = node.Node(data='P', depth=1)
+    other.children[1] = node.Node(data=3, depth=1)
+    instance.swap(other)
+    assert instance.calculate(10, 1, 2, 0, 0) == 3
+
+
+def test_compiled_tree_can_be_copied():
+    instance = node.Node(data='/', depth=0)
+    instance.children[0] = node.Node(data='W', depth=1)
+    instance.children[1] = node.Node(data=0, depth=1)
+    instance.children[1].data = 0
+    assert instance.calculate(10, 1, 2, 0, 0) == 0
+
+    copied = pickle.loads(pickle.dumps(instance))
+    assert copied.compiled is None
+    assert copied.calculate(10, 1, 2, 0, 0) == 0
+    assert copy.deepcopy(instance).compiled is None
+
+
+def test_calculate_vector_matches_calculate():
+    instance = node.Node(data='-', depth=0)
+    instance.children[0] = node.Node(data='/', depth=1)
+    instance.children[1] = node.Node(data='*', depth=1)
+    instance.children[0].children[0] = node.Node(data=1.2, depth=2)
+    instance.children[0].children[1] = node.Node(data='G', depth=2)
+    instance.children[1].children[0] = node.Node(data='W', depth=2)
+    instance.children[1].children[1] = node.Node(data='P', depth=2)
+
+    sensors = [[10, 1, 2, 0, 0], [0, 3, 1, 5, 2], [4, 0, 0, 1, 1]]
+    scores = instance.calculate_vector(numpy.array(sensors, dtype=float))
+    assert list(scores) == [instance.calculate(*row) for row in sensors]
+
+
+def test_calculate_vector_rand_bounds():
+    instance = node.Node(data='RAND', depth=0)
+    instance.children[0] = node.Node(data='G', depth=1)
+    instance.children[1] = node.Node(data=5, depth=1)
+
+    scores = instance.calculate_vector(numpy.array([[10, 0, 0, 0, 0], [1, 0, 0, 0, 0]]))
+    assert 5 <= scores[0] <= 10
+    assert 1 <= scores[1] <= 5
+
+
+
+def test_calculate_vector_rand_constants():
+    instance = node.Node(data='RAND', depth=0)
+    instance.children[0] = node.Node(data=1, depth=1)
+    instance.children[1] = node.Node(data=2, depth=1)
+
+    # every candidate move gets a draw of its own, like the per-move scalar path
+    scores = instance.calculate_vector(numpy.zeros((20, 5)))
+    assert len(set(scores)) == 20
+    assert all(1 <= score <= 2 for score in scores)
+
+def test_canonical_hash():
+    instance = node.Node(data='+', depth=0)
+    instance.children[0] = node.Node(data='G', depth=1)
+    instance.children[1] = node.Node(data=2.5, depth=1)
+
+    other = node.Node(data='+', depth=3)
+    other.children[0] = node.Node(data='G', depth=4)
+    other.children[1] = node.Node(data=2.5, depth=4)
+    assert instance.canonical_hash() == other.canonical_hash()
+
+    other.children[1].data = 2.6
+    assert instance.canonical_hash() != other.canonical_hash()
+
+    other.children[1].data = 2.5
+    other.unit = gpac.GHOST
+    assert instance.canonical_hash() != other.canonical_hash()
+
+
+def test_prefix_tree_round_trip():
+    random.seed(6)
+    instance = node.Node(tree_type='grow', max_depth=5, unit=gpac.GHOST)
+    instance.grow()
+
+    tree = node.PrefixTree.from_node(instance)
+    assert tree.sizes[0] == instance.get_total_nodes() == len(tree.values)
+    assert tree.height(0) == instance.height
+
+    rebuilt = tree.to_node()
+    assert rebuilt.parse_tree() == instance.parse_tree()
+    assert rebuilt.height == instance.height
+    assert rebuilt.unit == gpac.GHOST
+
+
+def test_prefix_tree_replace():
+    instance = node.Node(data='+', depth=0)
+    instance.children[0] = node.Node(data='G', depth=1)
+    instance.children[1] = node.Node(data='P', depth=1)
+    other = node.Node(data='*', depth=0)
+    other.children[0] = node.Node(data=0.0, depth=1)
+    other.children[1] = node.Node(data='W', depth=1)
+
+    tree = node.PrefixTree.from_node(instance)
+    child = tree.replace(1, node.PrefixTree.from_node(other), 0)
+
+    assert child.values == ['+', '*', 0.0, 'W', 'P']
+    assert list(child.sizes) == [5, 3, 1, 1, 1]
+    assert list(child.depths) == [0, 1, 2, 2, 1]
+    assert tree.values == ['+', 'G', 'P']
+    assert child.to_node().children[0].children[0].data == 0.0
+
+
+def test_slots():
+    instance = node.Node(data='G', depth=0)
+    assert not hasattr(instance, '__dict__')
+    with pytest.raises(AttributeError):
+        instance.weight = 1
+
+
+def test_height_and_size_invalidated_up_to_root():
+    random.seed(8)
+    instance = node.Node(tree_type='full', max_depth=3)
+    instance.grow()
+    assert instance.get_total_nodes() == 15
+    assert instance.children[0].children[0].parent is instance.children[0]
+
+    leaf = node.Node(data='W', depth=1)
+    instance.children[1].swap(leaf)
+    assert instance.size is None and instance.height is None
+    assert instance.children[0].size == 7
+    assert instance.get_total_nodes() == 9
+    assert instance.get_height() == 3
+
+    copied = pickle.loads(pickle.dumps(instance))
+    assert copied.children[0].parent is copied
+    assert copied.get_total_nodes() == 9
@@ -1,7 +1,17 @@
+import os
+import queue
 import random
+import pickle
+import multiprocessing
+import pytest
+import numpy
 import node
 import solver
 import gpac
+import shortest_path
+import islands
+import run_history
+from utilities import MyException
 
 
 def test_solver_init():
@@ -72,7 +82,7 @@ def test_closest_fruit():
     instance._create_game()
 
     closest_fruit_location = instance._closest_fruit([0, 0])
-    assert closest_fruit_location == 36
+    assert closest_fruit_location == 31
 
 
 def test_generate_pacman_weights():
@@ -111,7 +121,7 @@ def test_generate_sensor_inputs():
     instance._create_game()
 
     sensor_inputs = instance._generate_sensor_inputs([0, 0], gpac.PACMAN)
-    assert sensor_inputs == [53, 1, 0, 36, 55]
+    assert sensor_inputs == [53, 1, 0, 31, 55]
 
 
 # def test_calculate_move_scores():
@@ -220,3 +230,458 @@ def test_mutate():
     assert child.children[1].data == 'RAND'
     assert child.children[1].children[0].data == 'W'
     assert child.children[1].children[1].data == 'P'
+
+
+def test_calculate_fitness_array_engine():
+    results = []
+    for engine in ('list', 'array'):
+        instance = solver.Solver('config/test_run_config.json')
+        instance.engine = engine
+        instance.time_multiplier = 1
+        instance.maps = ['maps/map0.txt']
+        random.seed(3)
+        numpy.random.seed(3)
+        pacman = node.Node(tree_type='full', max_depth=2)
+        pacman.grow()
+        ghost = node.Node(tree_type='full', max_depth=2, unit=gpac.GHOST[0])
+        ghost.grow()
+        pacman_solution, ghost_solution = instance.calculate_fitness((pacman, ghost))
+        results.append((pacman_solution.score, ghost_solution.fitness,
+                        instance.world_log(pacman_solution.game)))
+    assert results[0] == results[1]
+    assert isinstance(results[1][2], str)
+
+
+def test_shortest_ghost_distance_matches_bfs():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 100
+    instance._set_seed()
+    instance.maps = ['maps/map0.txt']
+    instance._create_game()
+    board = instance.game_instance.get_rows()
+
+    for cell in [(0, 0), (3, 0), (9, 12), (19, 34)]:
+        expected = min(shortest_path.BFS(board, cell, tuple(instance.game_instance.locations[ghost]))
+                       for ghost in gpac.GHOST)
+        assert instance._shortest_ghost_distance(cell) == expected
+        assert instance._shortest_pacman_distance(cell) == shortest_path.BFS(
+            board, cell, tuple(instance.game_instance.locations[gpac.PACMAN]))
+
+
+def test_distance_table_cache(tmp_path):
+    table = shortest_path.build_distance_table(gpac.GPac._parse_map('maps/map1.txt')[2])
+    shortest_path._distance_tables.pop('maps/map1.txt', None)
+    shortest_path.load_distance_table('maps/map1.txt', str(tmp_path))
+    shortest_path._distance_tables.pop('maps/map1.txt')
+
+    cached = shortest_path.load_distance_table('maps/map1.txt', str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    assert (cached == table).all()
+
+
+def test_batch_move_scores_match_scalar():
+    random.seed(6)
+    instance = solver.Solver('config/test_run_config.json')
+    instance.maps = ['maps/map0.txt']
+    instance._create_game()
+    instance.game_instance.locations[gpac.PACMAN] = [3, 4]
+
+    ghost = node.Node(data='+', depth=0, unit=gpac.GHOST)
+    ghost.children[0] = node.Node(data='M_SHORT', depth=1, unit=gpac.GHOST)
+    ghost.children[1] = node.Node(data='/', depth=1, unit=gpac.GHOST)
+    ghost.children[1].children[0] = node.Node(data='M', depth=2, unit=gpac.GHOST)
+    ghost.children[1].children[1] = node.Node(data='G', depth=2, unit=gpac.GHOST)
+
+    batch_scores = instance._calculate_batch_move_scores(ghost, gpac.GHOST)
+    for unit in gpac.GHOST:
+        assert batch_scores[unit] == instance._calculate_move_scores(ghost, unit)
+
+
+def test_create_individuals_persistent_pool():
+    random.seed(8)
+    instance = solver.Solver('config/test_run_config.json')
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt']
+    instance.workers = 2
+    instance.chunk_size = 2
+    pacmans = [node.Node(tree_type='full', max_depth=2) for _ in range(4)]
+    ghosts = [node.Node(tree_type='full', max_depth=2, unit=gpac.GHOST) for _ in range(4)]
+    for tree in pacmans + ghosts:
+        tree.grow()
+
+    with instance._create_pool() as pool:
+        instance.pool = pool
+        first, _ = instance.create_individuals(pacmans, ghosts)
+        second, _ = instance.create_individuals(pacmans, ghosts)
+    instance.pool = None
+
+    assert len(first) == len(second) == 4
+    assert pickle.loads(pickle.dumps(instance)).pool is None
+
+
+def test_fitness_cache_replays_pair_once():
+    random.seed(9)
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 9
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt', 'maps/map1.txt']
+    instance.workers = 1
+    instance.noisy_evaluation = False
+    instance.fitness_cache = solver.fitness_cache.FitnessCache(10)
+    pacman = node.Node(tree_type='full', max_depth=2)
+    pacman.grow()
+    ghost = node.Node(tree_type='full', max_depth=2, unit=gpac.GHOST)
+    ghost.grow()
+
+    first, _ = instance.create_individuals([pacman], [ghost])
+    second, _ = instance.create_individuals([pacman], [ghost])
+
+    assert instance.fitness_cache.hits == 1
+    assert first[0].fitness == second[0].fitness
+    assert second[0].head_node is pacman
+
+    # a fixed game is played, so a fresh evaluation matches the cached one
+    key = instance._evaluation_key(pacman, ghost)
+    replayed, _ = instance.calculate_fitness((pacman, ghost, *key[2:]))
+    assert replayed.fitness == first[0].fitness
+
+
+def test_simulate_matches_calculate_fitness():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt']
+    random.seed(2)
+    pacman = node.Node(tree_type='full', max_depth=2)
+    pacman.grow()
+    ghost = node.Node(tree_type='full', max_depth=2, unit=gpac.GHOST)
+    ghost.grow()
+
+    scores, _ = instance.simulate(pacman, ghost, 2, seeds=[4, 5])
+    for seed, score in zip([4, 5], scores):
+        pacman_solution, _ = instance.calculate_fitness((pacman, ghost, 'maps/map0.txt', seed))
+        assert pacman_solution.score == score
+
+
+
+def test_games_keep_evolution_stream():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt']
+    random.seed(2)
+    pacman = node.Node(tree_type='full', max_depth=2)
+    pacman.grow()
+    ghost = node.Node(tree_type='full', max_depth=2, unit=gpac.GHOST)
+    ghost.grow()
+
+    numpy.random.seed(3)
+    states = random.getstate(), numpy.random.get_state()[1].copy()
+    pacman_solution, _ = instance.calculate_fitness((pacman, ghost, 'maps/map0.txt', 4))
+    instance.world_log(pacman_solution.game)
+    assert random.getstate() == states[0]
+    assert (numpy.random.get_state()[1] == states[1]).all()
+
+
+def test_pooled_games_match_in_process():
+    rows = []
+    for workers in (1, 2):
+        instance = solver.Solver('config/test_run_config.json')
+        instance.seed = 5
+        instance.time_multiplier = 1
+        instance.maps = ['maps/map0.txt', 'maps/map1.txt']
+        instance.workers = workers
+        instance.max_evaluations = 12
+        instance.pacman_parents = instance.ghost_parents = 4
+        instance.pacman_children = instance.ghost_children = 2
+        instance._seed_run(0)
+
+        evaluations, _, _ = instance._evolve(0)
+        rows.append(evaluations)
+    assert rows[0] == rows[1]
+
+
+def test_evolve_islands():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 3
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt']
+    instance.max_evaluations = 12
+    instance.pacman_parents = instance.ghost_parents = 4
+    instance.pacman_children = instance.ghost_children = 2
+    instance.islands = 2
+    instance.island_workers = 1
+    instance.migration_interval = 1
+
+    evaluations, best_pacman, _ = instance._evolve_islands(0)
+
+    assert [row.evals for row in evaluations] == [4, 10, 16]
+    assert all(row.size == 8 for row in evaluations)
+    assert best_pacman.score <= max(row.best_score for row in evaluations)
+    assert len(instance.run_times) == 1
+
+
+def test_evolve_islands_local_subset():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 3
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt']
+    instance.max_evaluations = 6
+    instance.pacman_parents = instance.ghost_parents = 4
+    instance.pacman_children = instance.ghost_children = 2
+    instance.islands = 3
+    instance.island_ids = [1]
+    instance.island_workers = 1
+    instance.migration_interval = 1
+    run_island = instance._run_island
+    # islands run in their own processes
+    inbox_readers = multiprocessing.Queue()
+
+    def record_inboxes(run, island, inboxes, results):
+        inbox_readers.put([inbox is not None for inbox in inboxes])
+        run_island(run, island, inboxes, results)
+
+    instance._run_island = record_inboxes
+    evaluations, _, _ = instance._evolve_islands(0)
+
+    assert all(row.size == 4 for row in evaluations)
+    assert inbox_readers.get(timeout=10) == [False, True, False]
+
+
+def test_evolve_islands_dead_island():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 3
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt']
+    instance.max_evaluations = 6
+    instance.pacman_parents = instance.ghost_parents = 4
+    instance.pacman_children = instance.ghost_children = 2
+    instance.islands = 2
+    instance.island_workers = 1
+    run_island = instance._run_island
+
+    def crash_second_island(run, island, inboxes, results):
+        if island == 1:
+            os._exit(3)
+        run_island(run, island, inboxes, results)
+
+    instance._run_island = crash_second_island
+    with pytest.raises(MyException, match='island 1 exited with code 3'):
+        instance._evolve_islands(0)
+
+
+def test_evolve_sends_migrants():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 3
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt']
+    instance.workers = 1
+    instance.max_evaluations = 12
+    instance.pacman_parents = instance.ghost_parents = 4
+    instance.pacman_children = instance.ghost_children = 2
+    inboxes = [queue.Queue(), queue.Queue()]
+    migration = islands.Migration(0, inboxes, 1)
+
+    instance._evolve(0, migration)
+
+    assert migration.sent == 2
+    pacmans, ghosts = inboxes[1].get_nowait()
+    assert len(pacmans) == len(ghosts) == 1
+
+
+def test_parallel_runs_match_serial(tmp_path):
+    logs = []
+    for run_workers in (1, 2):
+        instance = solver.Solver('config/test_run_config.json')
+        instance.seed = 4
+        instance.max_runs = 2
+        instance.max_evaluations = 12
+        instance.pacman_parents = instance.ghost_parents = 4
+        instance.pacman_children = instance.ghost_children = 2
+        instance.time_multiplier = 1
+        instance.workers = 1
+        instance.run_workers = run_workers
+        instance.log_file = str(tmp_path / f'{run_workers}.log')
+        instance.history_file = str(tmp_path / f'{run_workers}.npy')
+        instance.pacman_solution_file = str(tmp_path / 'pacman.txt')
+        instance.ghost_solution_file = str(tmp_path / 'ghost.txt')
+        instance.highest_score_file = str(tmp_path / 'world.txt')
+        instance.maps = ['maps/map0.txt']
+        instance._genetic_programming()
+
+        with open(instance.log_file) as file:
+            logs.append(file.read().split('Run 1\n')[1])
+    assert logs[0] == logs[1]
+    assert logs[0].count('Run ') == 1
+    assert len(instance.run_times) == 2
+    assert not os.path.exists(instance.log_file + '.runs')
+
+    history = run_history.load(instance.history_file)
+    assert list(history['run']) == [0, 0, 0, 1, 1, 1]
+    assert list(history['evals']) == [4, 10, 16] * 2
+
+
+
+def test_run_workers_merge_cache_counts():
+    counts = []
+    for run_workers in (1, 2):
+        instance = solver.Solver('config/test_run_config.json')
+        instance.seed = 4
+        instance.max_runs = 3
+        instance.max_evaluations = 12
+        instance.pacman_parents = instance.ghost_parents = 4
+        instance.pacman_children = instance.ghost_children = 2
+        instance.time_multiplier = 1
+        instance.workers = 1
+        instance.run_workers = run_workers
+        instance.noisy_evaluation = False
+        instance.fitness_cache = solver.fitness_cache.FitnessCache(100)
+        instance.maps = ['maps/map0.txt']
+
+        list(instance._evolve_runs())
+        cache = instance.fitness_cache
+        assert cache.hits + instance.game_stats['games'] == cache.lookups
+        counts.append(cache.lookups)
+    assert counts[0] == counts[1]
+
+
+def test_unpickled_run_worker_has_cache():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 4
+    instance.max_evaluations = 8
+    instance.pacman_parents = instance.ghost_parents = 4
+    instance.pacman_children = instance.ghost_children = 2
+    instance.time_multiplier = 1
+    instance.noisy_evaluation = False
+    instance.fitness_cache = solver.fitness_cache.FitnessCache(100)
+    instance.maps = ['maps/map0.txt']
+
+    # spawned workers receive the solver by pickling
+    solver._init_run_worker(pickle.loads(pickle.dumps(instance)))
+    _, _, game_stats, (hits, lookups) = solver._evolve_run(0)
+
+    assert solver._worker_solver.fitness_cache.size == 100
+    assert hits + game_stats['games'] == lookups == 10
+
+def deterministic_tree(unit, seed):
+    random.seed(seed)
+    tree = node.Node(tree_type='full', max_depth=2, unit=unit)
+    tree.grow()
+    while not tree.is_deterministic():
+        tree = node.Node(tree_type='full', max_depth=2, unit=unit)
+        tree.grow()
+    return tree
+
+
+def test_stagnation_keeps_final_score():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.time_multiplier = 1
+    instance.fruit_spawn_probability = 0
+    pacman = deterministic_tree(gpac.PACMAN, 0)
+    ghost = deterministic_tree(gpac.GHOST, 0)
+
+    stagnated = 0
+    for seed in range(5):
+        game = (pacman, ghost, 'maps/map0.txt', seed)
+        instance.stagnation_window = 0
+        full, _ = instance.calculate_fitness(game)
+        instance.stagnation_window = 50
+        early, _ = instance.calculate_fitness(game)
+        assert early.score == full.score
+        stagnated += early.stagnated
+    assert stagnated
+
+
+def test_racing_abandons_dominated_games():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.time_multiplier = 1
+    instance.racing_interval = 5
+    pacman = deterministic_tree(gpac.PACMAN, 1)
+    ghost = deterministic_tree(gpac.GHOST, 2)
+    game = (pacman, ghost, 'maps/map0.txt', 0)
+
+    complete, _ = instance.calculate_fitness(game)
+    assert not complete.abandoned
+    assert len(complete.checkpoints) > 0
+
+    instance.racing_reference = [checkpoint + 1000 for checkpoint in complete.checkpoints]
+    abandoned, _ = instance.calculate_fitness(game)
+    assert abandoned.abandoned
+    assert abandoned.checkpoints == complete.checkpoints[:1]
+
+
+def test_evolve_steady_state():
+    for workers in (1, 2):
+        instance = solver.Solver('config/test_run_config.json')
+        instance.seed = 3
+        instance.time_multiplier = 1
+        instance.maps = ['maps/map0.txt']
+        instance.workers = workers
+        instance.steady_state = True
+        instance.max_evaluations = 12
+        instance.pacman_parents = instance.ghost_parents = 4
+        instance.pacman_children = instance.ghost_children = 2
+        instance._seed_run(0)
+
+        evaluations, best_pacman, _ = instance._evolve(0)
+
+        assert [row.evals for row in evaluations] == [4, 6, 12]
+        assert all(row.size == 4 for row in evaluations)
+        assert best_pacman.score <= max(row.best_score for row in evaluations)
+        assert instance.game_stats['games'] == 12
+
+
+def test_steady_state_default_workers():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 3
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt']
+    instance.steady_state = True
+    instance.max_runs = 1
+    instance.max_evaluations = 8
+    instance.pacman_parents = instance.ghost_parents = 4
+    instance.pacman_children = instance.ghost_children = 2
+    instance._seed_run(0)
+
+    evaluations, _, _ = instance._evolve(0)
+
+    assert instance.workers == os.cpu_count()
+    assert [row.evals for row in evaluations] == [4, 6, 8]
+    assert 'Steady state: ' in instance._log_parameters()
+
+
+def test_sensor_memo_reset_each_turn():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.seed = 100
+    instance._set_seed()
+    instance.maps = ['maps/map0.txt']
+    instance._create_game()
+
+    first = instance._generate_sensor_inputs([0, 0], gpac.PACMAN)
+    assert instance._generate_sensor_inputs([0, 0], gpac.PACMAN) is first
+    assert len(instance._generate_sensor_inputs([0, 0], gpac.GHOST[0])) == 3
+
+    for unit in (gpac.PACMAN, *gpac.GHOST):
+        instance.game_instance.move('hold', unit)
+    instance.game_instance.turn()
+    instance._generate_sensor_inputs([0, 0], gpac.GHOST[1])
+    assert not instance.sensor_memo[0]
+    assert list(instance.sensor_memo[1]) == [0]
+
+
+def test_world_log_replays_evaluation():
+    instance = solver.Solver('config/test_run_config.json')
+    instance.time_multiplier = 1
+    instance.maps = ['maps/map0.txt']
+    random.seed(6)
+    pacman = node.Node(tree_type='full', max_depth=2)
+    pacman.grow()
+    ghost = node.Node(tree_type='full', max_depth=2, unit=gpac.GHOST)
+    ghost.grow()
+
+    pacman_solution, ghost_solution = instance.calculate_fitness((pacman, ghost))
+    assert ghost_solution.game is pacman_solution.game
+    assert pacman_solution.game.map_filepath == 'maps/map0.txt'
+
+    contents = instance.world_log(pacman_solution.game)
+    last_turn = [line for line in contents.splitlines() if line.startswith('t ')][-1]
+    assert int(last_turn.split()[2]) == pacman_solution.score
+    assert instance.world_log(pacman_solution.game) == contents
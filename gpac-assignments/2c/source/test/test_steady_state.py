@@ -0,0 +1,23 @@
+import concurrent.futures
+import steady_state
+
+
+def square(number):
+    return number * number
+
+
+def test_scheduler_serial():
+    numbers = iter(range(5))
+    results = []
+    scheduler = steady_state.Scheduler(lambda: next(numbers), square, results.append, 3)
+    scheduler.run(5)
+    assert results == [0, 1, 4, 9, 16]
+
+
+def test_scheduler_keeps_games_in_flight():
+    numbers = iter(range(20))
+    results = []
+    scheduler = steady_state.Scheduler(lambda: next(numbers), square, results.append, 4)
+    with concurrent.futures.ProcessPoolExecutor(2) as executor:
+        scheduler.run(20, executor)
+    assert sorted(results) == [number * number for number in range(20)]
@@ -2,97 +2,167 @@
 
 # author: Deacon Seals
 
-# use: python3 treeCheck.py treeFilePath0 treeFilePath1 ... treeFilePathN
-# use note: Bash regex filename expressions supported
+# use: python3 treeCheck.py [--jobs N] [--json] treeFilePath0 treeFilePath1 ... treeFilePathN
+# use note: Bash regex filename expressions supported, directories and quoted glob patterns
+#           such as 'solutions/**/*.txt' are expanded to the tree files they contain
 
+import os
 import sys
+import glob
+import json
+import argparse
+import multiprocessing
 import re # python regex library
 
+sensors = {"G", "P", "W", "F", "M", "M_SHORT", "G_SHORT"}
+operators = {"+":2, "-":2, "*":2, "/":2, "RAND":2}
+number = re.compile(r'-?[0-9]+(\.[0-9]*)?(e[-+]?[0-9]+)?')
 
 def getDepth(line):
 	# trying to support arbitratry node strings was a mistake
 	return len(line)-len(line.lstrip("|")) # this is kinda gross but it works
 
+# identified sensor nodes
+def isSensor(value):
+	return value in sensors or number.fullmatch(value)
+
 '''
-desc:	Returns the number of children for a node on a given line.
+desc:	Checks a finished node, one that has all of its children, and adds an error or
+		warning for its line.
 '''
-def numChildren(depths, lineNum):
-	myDepth = depths[lineNum]
-	children = 0
-	for line in range(lineNum+1,len(depths)):
-		nodeDepth = depths[line]
-		if nodeDepth == myDepth+1:
-			children += 1
-		elif nodeDepth <= myDepth:
-			break
-	return children
+def checkNode(node, line, numKids, errors, warnings):
+	if isSensor(node): # sensor
+		if numKids != 0: # sensor has children but shouldn't
+			errors.append((line, "sensor node "+repr(node)+" on line "+repr(line+1)+" has "+repr(numKids)+" more children than it should"))
+	elif node in operators: # operators
+		if numKids != operators[node]: # defined operator has incorrect number of children
+			errors.append((line, "operator node "+repr(node)+" on line "+repr(line+1)+" has "+repr(numKids)+" children but "+repr(operators[node])+" were expected"))
+	else: # unknown node
+		warnings.append((line, "unknown node "+repr(node)+" on line "+repr(line+1)+" has "+repr(numKids)+" children"))
 
 '''
 desc:	Checks tree file at input `filepath` for a valid tree. Considers formatting errors
 		that cause tree depth to increase by unreasonable amounts, the number of children
-		each node has. A comment is made for each instance of an unknown node, but this 
+		each node has. A comment is made for each instance of an unknown node, but this
 		does not indicate an error if the node is a new sensor or operator you have added
 		and documented.
+
+		The file is read in one pass. Nodes wait on a stack of [depth, node, line, children]
+		until a line at the same or a lower depth shows they have all of their children.
+		Returns the lists of warnings and errors.
 '''
 def checkTree(filename):
-	sensors = {"G", "P", "W", "F"}
-	operators = {"+":2, "-":2, "*":2, "/":2, "RAND":2}
-
-	# identified sensor nodes
-	def isSensor(value):
-		numbers = value.split(".")
-		return value in sensors or re.fullmatch('(-?[0-9]+(\.[0-9]*)?)',value)
-
+	depthErrors = []
 	errors = []
-	treeText = []
-
+	warnings = []
+	stack = []
+	previous = [None] # depth of the previous line
+
+	def addLine(line, text):
+		depth = getDepth(text)
+
+		# check for invalid depth increases
+		if previous[0] is not None and depth-previous[0] > 1:
+			depthErrors.append("depth increased by more than 1 between lines "+repr(line)+" and "+repr(line+1))
+		previous[0] = depth
+
+		# node checks don't matter once depth errors were found
+		if depthErrors:
+			return
+		while stack and stack[-1][0] >= depth:
+			checkNode(*stack.pop()[1:], errors, warnings)
+		if stack and stack[-1][0] == depth-1:
+			stack[-1][3] += 1
+		stack.append([depth, text.lstrip("|"), line, 0])
+
+	lines = 0
+	blankLines = []
 	with open(filename, 'r') as file:
-		treeText = [line.rstrip() for line in file] # remove tailing space from each line
-	# remove tailing blank lines from file
-	for line in range(len(treeText)):
-		if treeText[-(line+1)]:
-			if line > 0:
-				treeText = treeText[:-line]
-			break
-	if not treeText:
-		print(filename+": [ERROR] is empty")
-		return
-
-	depths = [getDepth(line) for line in treeText]
-	nodes = [line.lstrip("|") for line in treeText]
-	children = [numChildren(depths,line) for line in range(len(treeText))]
-
-	# check for invalid depth increases
-	for line in range(len(treeText)-1):
-		if depths[line+1]-depths[line] > 1:
-			errors.append("depth increased by more than 1 between lines "+repr(line+1)+" and "+repr(line+2))
-	
-	# somewhat abusive way of breaking if we've already found errors
-	if [print(filename+": [ERROR] "+error) for error in errors]: return
-
-	for line in range(len(treeText)):
-		node = nodes[line]
-		numKids = children[line]
-		if isSensor(node): # sensor
-			if numKids != 0: # sensor has children but shouldn't
-				errors.append("sensor node "+repr(node)+" on line "+repr(line+1)+" has "+repr(numKids)+" more children than it should")
-		elif node in operators: # operators
-			if numKids != operators[node]: # defined operator has incorrect number of children
-				errors.append("operator node "+repr(node)+" on line "+repr(line+1)+" has "+repr(numKids)+" children but "+repr(operators[node])+" were expected")
-		else: # unknown node
-			print(filename+": [warning] unknown node "+repr(node)+" on line "+repr(line+1)+" has "+repr(numKids)+" children")
-
-	# print errors or pass
-	if not [print(filename+": [ERROR] "+error) for error in errors]: # still a little hack-ey
-		print(filename+": PASS")
-	return
+		for text in file:
+			text = text.rstrip() # remove tailing space from each line
+			if not text:
+				blankLines.append(lines)
+			else:
+				# blank lines followed by a node aren't tailing blank lines
+				for line in blankLines:
+					addLine(line, "")
+				blankLines = []
+				addLine(lines, text)
+			lines += 1
+
+	if lines == len(blankLines):
+		return [], ["is empty"]
+	if depthErrors:
+		return [], depthErrors
+
+	while stack:
+		checkNode(*stack.pop()[1:], errors, warnings)
+	return [warning for line, warning in sorted(warnings)], [error for line, error in sorted(errors)]
+
+'''
+desc:	Returns the files named by the arguments. Directories are searched recursively and glob
+		patterns are expanded, empty files found this way are placeholders and are skipped.
+'''
+def findFiles(paths):
+	files = []
+	for path in paths:
+		if os.path.isdir(path):
+			found = sorted(glob.glob(os.path.join(path, "**", "*.txt"), recursive=True))
+		elif glob.has_magic(path):
+			found = sorted(glob.glob(path, recursive=True))
+		else:
+			files.append(path)
+			continue
+		files += [filename for filename in found if os.path.isfile(filename) and os.path.getsize(filename)]
+	return files
+
+def checkFile(filename):
+	try:
+		warnings, errors = checkTree(filename)
+	except (OSError, UnicodeDecodeError) as e:
+		warnings, errors = [], [str(e)]
+	return filename, warnings, errors
 
 def main():
-	if len(sys.argv) < 2:
-		print("Please pass in a world file")
+	parser = argparse.ArgumentParser(description="Checks GPac tree files")
+	parser.add_argument("files", nargs="*", help="tree file paths, directories or glob patterns")
+	parser.add_argument("-j", "--jobs", type=int, default=1, help="number of files checked at once")
+	parser.add_argument("--json", action="store_true", help="print a JSON summary instead of a report per file")
+	args = parser.parse_args()
+
+	files = findFiles(args.files)
+	if not files:
+		print("Please pass in a tree file")
+		return 0
+
+	if args.jobs > 1:
+		pool = multiprocessing.Pool(min(args.jobs, len(files)))
+		results = pool.imap(checkFile, files, chunksize=16)
 	else:
-		for arg in range(1,len(sys.argv)):
-			checkTree(sys.argv[arg])
+		pool = None
+		results = map(checkFile, files)
+
+	summary = {"files": 0, "passed": 0, "failed": 0, "results": {}}
+	for filename, warnings, errors in results:
+		summary["files"] += 1
+		summary["failed" if errors else "passed"] += 1
+		if args.json:
+			summary["results"][filename] = {"status": "ERROR" if errors else "PASS", "warnings": warnings, "errors": errors}
+			continue
+
+		for warning in warnings:
+			print(filename+": [warning] "+warning)
+		for error in errors:
+			print(filename+": [ERROR] "+error)
+		if not errors:
+			print(filename+": PASS")
+
+	if pool:
+		pool.close()
+		pool.join()
+	if args.json:
+		print(json.dumps(summary, indent=4))
+	return 1 if summary["failed"] else 0
 
 if __name__ == '__main__':
-	main()
\ No newline at end of file
+	sys.exit(main())
@@ -1,5 +1,10 @@
-import matplotlib.pyplot as plt
 import re
+import matplotlib
+import report_cache
+
+# graphs are only saved, so use a backend that works in pool workers without a display
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # pylint: disable=wrong-import-position
 
 
 def to_graph(filename):
@@ -32,11 +37,20 @@ def to_graph(filename):
     plt.xlabel('fitness')
     plt.ylabel('eval')
     plt.title('evals versus fitness plot')
+    plt.savefig(graph_path(filename))
+    plt.close()
+
+
+def graph_path(filename):
     savefile = filename.split('_')[0].split('/')[-1]
-    plt.savefig(f"./doc/problem_{savefile}.png")
-    plt.show()
+    return f"./doc/problem_{savefile}.png"
+
+
+def main():
+    report_cache.render(__file__, [
+        report_cache.Job([graph_path(filename)], [filename], to_graph, (filename,))
+        for filename in ('./logs/1_run.log', './logs/2_run.log', './logs/3_run.log')])
 
 
-to_graph('./logs/1_run.log')
-to_graph('./logs/2_run.log')
-to_graph('./logs/3_run.log')
+if __name__ == '__main__':
+    main()
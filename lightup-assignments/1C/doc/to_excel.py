@@ -1,5 +1,6 @@
 import glob
 import xlsxwriter
+import report_cache
 
 
 def get_contents(filename, problem):
@@ -10,101 +11,114 @@ def get_contents(filename, problem):
 
 
 def main():
+    jobs = [workbook_job(problem, write_bc_workbook) for problem in problem_names('./problems/bc*')]
+    jobs += [workbook_job(problem, write_c_workbook) for problem in problem_names('./problems/c*')]
+    report_cache.render(__file__, jobs)
 
-    problems = glob.glob('./problems/bc*')
 
-    for file in sorted(problems):
+def problem_names(pattern):
+    return [file.split('/')[-1].split('.')[0] for file in sorted(glob.glob(pattern))]
 
-        problem = file.split('/')[-1].split('.')[0]
-        workbook = xlsxwriter.Workbook(f'./doc/green3_{problem}.xlsx')
 
-        # Vanilla v Penalty Constraint
-        worksheet = workbook.add_worksheet("Green 3.1")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen_1b.log"
-        col2 = problem + "_run_best_from_gen.log"
-        cur_row = dump_two_log(problem,
-                               'Vanilla EA', 'Penalty Constrain EA', col1, col2, worksheet, cur_row)
+def workbook_job(problem, function):
+    """ Job writing the workbook of a problem from its best-of-generation logs. """
 
-        # Vanilla Validity v Penalty Validity
-        worksheet = workbook.add_worksheet("Green 3.2 1B-1C")
-        cur_row = 0
-        col1 = problem + "_validity_run_best_from_gen_1b.log"
-        col2 = problem + "_validity_run_best_from_gen.log"
+    return report_cache.Job([f'./doc/green3_{problem}.xlsx'],
+                            sorted(glob.glob(f'./logs/{problem}/{problem}*best_from_gen*.log')),
+                            function, (problem,))
 
-        cur_row = dump_two_log(problem,
-                               'Vanilla Validity EA', 'Penalty Validity Ea', col1, col2, worksheet, cur_row)
 
-        # Vanilla v Vanilla Validity
-        worksheet = workbook.add_worksheet("Green 3.2 1B-1B")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen_1b.log"
-        col2 = problem + "_validity_run_best_from_gen_1b.log"
-        cur_row = dump_two_log(problem,
-                               'Vanilla EA', 'Vanilla Validity EA', col1, col2, worksheet, cur_row)
+def write_bc_workbook(problem):
+    # rows are written in order, so they can be streamed to disk
+    workbook = xlsxwriter.Workbook(f'./doc/green3_{problem}.xlsx', {'constant_memory': True})
 
-        workbook.close()
+    # Vanilla v Penalty Constraint
+    worksheet = workbook.add_worksheet("Green 3.1")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen_1b.log"
+    col2 = problem + "_run_best_from_gen.log"
+    cur_row = dump_two_log(problem,
+                           'Vanilla EA', 'Penalty Constrain EA', col1, col2, worksheet, cur_row)
 
-    problems = glob.glob('./problems/c*')
-    for file in sorted(problems):
-        problem = file.split('/')[-1].split('.')[0]
-        workbook = xlsxwriter.Workbook(f'./doc/green3_{problem}.xlsx')
+    # Vanilla Validity v Penalty Validity
+    worksheet = workbook.add_worksheet("Green 3.2 1B-1C")
+    cur_row = 0
+    col1 = problem + "_validity_run_best_from_gen_1b.log"
+    col2 = problem + "_validity_run_best_from_gen.log"
 
-        # Vanilla Validity v Penalty Validity
-        worksheet = workbook.add_worksheet("Green 3.2")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen.log"
-        col2 = problem + "_validity_run_best_from_gen.log"
+    cur_row = dump_two_log(problem,
+                           'Vanilla Validity EA', 'Penalty Validity Ea', col1, col2, worksheet, cur_row)
 
-        cur_row = dump_two_log(problem,
-                               'Vanilla Penalty EA', 'Penalty Validity Ea', col1, col2, worksheet, cur_row)
+    # Vanilla v Vanilla Validity
+    worksheet = workbook.add_worksheet("Green 3.2 1B-1B")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen_1b.log"
+    col2 = problem + "_validity_run_best_from_gen_1b.log"
+    cur_row = dump_two_log(problem,
+                           'Vanilla EA', 'Vanilla Validity EA', col1, col2, worksheet, cur_row)
 
-        # 5 Penalty Coef v 10 Penalty Coef
-        worksheet = workbook.add_worksheet("Green 3.3 5-10")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen.log"
-        col2 = problem + "_validity_5_run_best_from_gen.log"
+    workbook.close()
 
-        cur_row = dump_two_log(problem,
-                               '10 Coef', '5 Coef', col1, col2, worksheet, cur_row)
 
-        # 50 Penalty Coef v 10 Penalty Coef
-        worksheet = workbook.add_worksheet("Green 3.3 50-10")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen.log"
-        col2 = problem + "_validity_50_run_best_from_gen.log"
+def write_c_workbook(problem):
+    # rows are written in order, so they can be streamed to disk
+    workbook = xlsxwriter.Workbook(f'./doc/green3_{problem}.xlsx', {'constant_memory': True})
 
-        cur_row = dump_two_log(problem,
-                               '10 Coef', '50 Coef', col1, col2, worksheet, cur_row)
+    # Vanilla Validity v Penalty Validity
+    worksheet = workbook.add_worksheet("Green 3.2")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen.log"
+    col2 = problem + "_validity_run_best_from_gen.log"
 
-        # 50 Penalty Coef v 5 Penalty Coef
-        worksheet = workbook.add_worksheet("Green 3.3 50-5")
-        cur_row = 0
-        col1 = problem + "_validity_5_run_best_from_gen.log"
-        col2 = problem + "_validity_50_run_best_from_gen.log"
+    cur_row = dump_two_log(problem,
+                           'Vanilla Penalty EA', 'Penalty Validity Ea', col1, col2, worksheet, cur_row)
 
-        cur_row = dump_two_log(problem,
-                               '5 Coef', '50 Coef', col1, col2, worksheet, cur_row)
+    # 5 Penalty Coef v 10 Penalty Coef
+    worksheet = workbook.add_worksheet("Green 3.3 5-10")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen.log"
+    col2 = problem + "_validity_5_run_best_from_gen.log"
 
-        # Validity Forced v Adaptive Mutation Validity Forced
-        worksheet = workbook.add_worksheet("Yellow 1")
-        cur_row = 0
-        col1 = problem + "_validity_run_best_from_gen.log"
-        col2 = problem + "_self_mut_run_best_from_gen.log"
+    cur_row = dump_two_log(problem,
+                           '10 Coef', '5 Coef', col1, col2, worksheet, cur_row)
 
-        cur_row = dump_two_log(problem,
-                               'Base', 'self-adaptivity mutation', col1, col2, worksheet, cur_row)
+    # 50 Penalty Coef v 10 Penalty Coef
+    worksheet = workbook.add_worksheet("Green 3.3 50-10")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen.log"
+    col2 = problem + "_validity_50_run_best_from_gen.log"
 
-        # Validity Forced v Adaptive Penalty Validity Forced
-        worksheet = workbook.add_worksheet("Red 2")
-        cur_row = 0
-        col1 = problem + "_validity_run_best_from_gen.log"
-        col2 = problem + "_self_pen_run_best_from_gen.log"
+    cur_row = dump_two_log(problem,
+                           '10 Coef', '50 Coef', col1, col2, worksheet, cur_row)
 
-        cur_row = dump_two_log(problem,
-                               'Base', 'self-adaptivity penalty', col1, col2, worksheet, cur_row)
+    # 50 Penalty Coef v 5 Penalty Coef
+    worksheet = workbook.add_worksheet("Green 3.3 50-5")
+    cur_row = 0
+    col1 = problem + "_validity_5_run_best_from_gen.log"
+    col2 = problem + "_validity_50_run_best_from_gen.log"
 
-        workbook.close()
+    cur_row = dump_two_log(problem,
+                           '5 Coef', '50 Coef', col1, col2, worksheet, cur_row)
+
+    # Validity Forced v Adaptive Mutation Validity Forced
+    worksheet = workbook.add_worksheet("Yellow 1")
+    cur_row = 0
+    col1 = problem + "_validity_run_best_from_gen.log"
+    col2 = problem + "_self_mut_run_best_from_gen.log"
+
+    cur_row = dump_two_log(problem,
+                           'Base', 'self-adaptivity mutation', col1, col2, worksheet, cur_row)
+
+    # Validity Forced v Adaptive Penalty Validity Forced
+    worksheet = workbook.add_worksheet("Red 2")
+    cur_row = 0
+    col1 = problem + "_validity_run_best_from_gen.log"
+    col2 = problem + "_self_pen_run_best_from_gen.log"
+
+    cur_row = dump_two_log(problem,
+                           'Base', 'self-adaptivity penalty', col1, col2, worksheet, cur_row)
+
+    workbook.close()
 
 
 def dump_two_log(problem, column1_header, column2_header, column1, column2, worksheet, row, col=0, ):
@@ -139,4 +153,5 @@ def write_data(worksheet, column1_header, column2_header, column1_data, column2_
     return row
 
 
-main()
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,11 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+import matplotlib
 import re
+import report_cache
+
+# graphs are only saved, so use a backend that works in pool workers without a display
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # pylint: disable=wrong-import-position
+import matplotlib.patches as mpatches  # pylint: disable=wrong-import-position
 
 
 def to_graph(filename):
@@ -53,12 +58,21 @@ def to_graph(filename):
     red_patch = mpatches.Patch(color='red', label='Best')
     blue_patch = mpatches.Patch(color='blue', label='Average')
     plt.legend(handles=[red_patch, blue_patch], loc='lower right')
+    plt.savefig(graph_path(filename))
+    plt.close()
+
+
+def graph_path(filename):
     savefile = filename.split('/')[-1][:-4]
-    plt.savefig(f"./doc/problem_{savefile}.png")
-    plt.show()
+    return f"./doc/problem_{savefile}.png"
+
+
+def main():
+    report_cache.render(__file__, [
+        report_cache.Job([graph_path(filename)], [filename], to_graph, (filename,))
+        for filename in ('./logs/bc1/bc1_run.log', './logs/bc2/bc2_run.log',
+                         './logs/c1/c1_run.log', './logs/c2/c2_run.log')])
 
 
-to_graph('./logs/bc1/bc1_run.log')
-to_graph('./logs/bc2/bc2_run.log')
-to_graph('./logs/c1/c1_run.log')
-to_graph('./logs/c2/c2_run.log')
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import glob
 import xlsxwriter
+import report_cache
 
 
 def get_contents(filename, problem):
@@ -10,67 +11,79 @@ def get_contents(filename, problem):
 
 
 def main():
+    jobs = [workbook_job(problem, write_workbook) for problem in problem_names('./problems/d*')]
+    report_cache.render(__file__, jobs)
 
-    problems = glob.glob('./problems/d*')
 
-    for file in sorted(problems):
+def problem_names(pattern):
+    return [file.split('/')[-1].split('.')[0] for file in sorted(glob.glob(pattern))]
 
-        problem = file.split('/')[-1].split('.')[0]
-        workbook = xlsxwriter.Workbook(f'./doc/green3_{problem}.xlsx')
 
-        # Default vs NGSA
-        worksheet = workbook.add_worksheet("Default v NSGA")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen.log"
-        col2 = problem + "_nsga_run_best_from_gen.log"
-        cur_row = dump_two_log(problem,
-                               'Default', 'NSGA', col1, col2, worksheet, cur_row)
+def workbook_job(problem, function):
+    """ Job writing the workbook of a problem from its best-of-generation logs. """
 
-        # Default vs Uniform
-        worksheet = workbook.add_worksheet("Default v Uniform")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen.log"
-        col2 = problem + "_uniform_run_best_from_gen.log"
+    return report_cache.Job([f'./doc/green3_{problem}.xlsx'],
+                            sorted(glob.glob(f'./logs/{problem}/{problem}*best_from_gen*.log')),
+                            function, (problem,))
 
-        cur_row = dump_two_log(problem, 'Default', 'Uniform',
-                               col1, col2, worksheet, cur_row)
 
-        # Vanilla v Vanilla Validity
-        worksheet = workbook.add_worksheet("NSGA v Uniform")
-        cur_row = 0
-        col1 = problem + "_nsga_run_best_from_gen.log"
-        col2 = problem + "_uniform_run_best_from_gen.log"
-        cur_row = dump_two_log(problem,
-                               'NSGA', 'Uniform', col1, col2, worksheet, cur_row)
+def write_workbook(problem):
+    # rows are written in order, so they can be streamed to disk
+    workbook = xlsxwriter.Workbook(f'./doc/green3_{problem}.xlsx', {'constant_memory': True})
 
-        # Default v Crowding
-        worksheet = workbook.add_worksheet("Crowding")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen.log"
-        col2 = problem + "_crowding_run_best_from_gen.log"
+    # Default vs NGSA
+    worksheet = workbook.add_worksheet("Default v NSGA")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen.log"
+    col2 = problem + "_nsga_run_best_from_gen.log"
+    cur_row = dump_two_log(problem,
+                           'Default', 'NSGA', col1, col2, worksheet, cur_row)
 
-        cur_row = dump_two_log(problem,
-                               'Default', 'Crowding', col1, col2, worksheet, cur_row)
+    # Default vs Uniform
+    worksheet = workbook.add_worksheet("Default v Uniform")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen.log"
+    col2 = problem + "_uniform_run_best_from_gen.log"
 
-        # Default v Sharing
-        worksheet = workbook.add_worksheet("Fitness Sharing")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen.log"
-        col2 = problem + "_sharing_run_best_from_gen.log"
+    cur_row = dump_two_log(problem, 'Default', 'Uniform',
+                           col1, col2, worksheet, cur_row)
 
-        cur_row = dump_two_log(problem,
-                               'Default', 'Fitness Sharing', col1, col2, worksheet, cur_row)
+    # Vanilla v Vanilla Validity
+    worksheet = workbook.add_worksheet("NSGA v Uniform")
+    cur_row = 0
+    col1 = problem + "_nsga_run_best_from_gen.log"
+    col2 = problem + "_uniform_run_best_from_gen.log"
+    cur_row = dump_two_log(problem,
+                           'NSGA', 'Uniform', col1, col2, worksheet, cur_row)
 
-        # Default v 4 Obj
-        worksheet = workbook.add_worksheet("Minimize Bulbs")
-        cur_row = 0
-        col1 = problem + "_run_best_from_gen.log"
-        col2 = problem + "_bulb_run_best_from_gen.log"
+    # Default v Crowding
+    worksheet = workbook.add_worksheet("Crowding")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen.log"
+    col2 = problem + "_crowding_run_best_from_gen.log"
 
-        cur_row = dump_two_log(problem,
-                               'Default', 'Minimize Bulbs', col1, col2, worksheet, cur_row)
+    cur_row = dump_two_log(problem,
+                           'Default', 'Crowding', col1, col2, worksheet, cur_row)
 
-        workbook.close()
+    # Default v Sharing
+    worksheet = workbook.add_worksheet("Fitness Sharing")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen.log"
+    col2 = problem + "_sharing_run_best_from_gen.log"
+
+    cur_row = dump_two_log(problem,
+                           'Default', 'Fitness Sharing', col1, col2, worksheet, cur_row)
+
+    # Default v 4 Obj
+    worksheet = workbook.add_worksheet("Minimize Bulbs")
+    cur_row = 0
+    col1 = problem + "_run_best_from_gen.log"
+    col2 = problem + "_bulb_run_best_from_gen.log"
+
+    cur_row = dump_two_log(problem,
+                           'Default', 'Minimize Bulbs', col1, col2, worksheet, cur_row)
+
+    workbook.close()
 
 
 def dump_two_log(problem, column1_header, column2_header, column1, column2, worksheet, row, col=0, ):
@@ -105,4 +118,5 @@ def write_data(worksheet, column1_header, column2_header, column1_data, column2_
     return row
 
 
-main()
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
 from os import walk
 import os
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+import matplotlib
 import re
+import report_cache
+
+# graphs are only saved, so use a backend that works in pool workers without a display
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # pylint: disable=wrong-import-position
+import matplotlib.patches as mpatches  # pylint: disable=wrong-import-position
 
 
 def to_graph(filename):
@@ -109,12 +114,25 @@ def to_graph(filename):
 
     plt.legend(handles=[red_patch, red_dot_patch,
                         blue_patch, blue_dot_patch, green_patch, green_dot_patch], loc='best')
+    plt.savefig(graph_path(filename))
+    plt.close()
+
+
+def graph_path(filename):
     savefile = filename.split('/')[-1][:-4]
-    plt.savefig(f"./doc/problem_{savefile}.png")
-    plt.show()
+    return f"./doc/problem_{savefile}.png"
+
+
+def main():
+    jobs = []
+    for (dirpath, dirnames, filenames) in walk('./logs/'):
+        for filename in filenames:
+            if ('.log' in filename):
+                filename = os.path.join(dirpath, filename)
+                jobs.append(report_cache.Job([graph_path(filename)], [filename], to_graph,
+                                             (filename,)))
+    report_cache.render(__file__, jobs)
 
 
-for (dirpath, dirnames, filenames) in walk('./logs/'):
-    for filename in filenames:
-        if ('.log' in filename):
-            to_graph(os.path.join(dirpath, filename))
+if __name__ == '__main__':
+    main()